@@ -0,0 +1,345 @@
+"""
+Statistics for the site's "Voices & archetypes" section (see PLANNING.md):
+the recurring subjects headlines open with ("Area Man", "Nation", "Local
+Teen", ...), with each one's first appearance, peak years, dominant
+categories and total count. Run this after optimize.py.
+
+Subjects are found from the headlines' first MAX_WORDS words, lowercased
+and without punctuation or a possessive 's. A leading phrase of one to
+MAX_WORDS words is a subject when it opens at least --min-count headlines,
+neither starts nor ends with a function word ("to", "of", "says", ...), and,
+for two words or more, covers at least --min-share of the headlines its
+shorter prefix opens ("Local Teen" among "Local ..."). Each headline counts
+toward the longest subject it opens with, and subjects left with fewer than
+--min-count headlines are dropped. All of this is counted over integer word
+ids with numpy, never headline by headline.
+
+Output goes to web/public/archetypes/:
+
+manifest.json
+    Each subject by slug ("area-man"): name, total count, first appearance,
+    peak years, top categories and the hash of its file. One read gives the
+    whole section; one key lookup gives one subject.
+<slug>.json
+    The subject's year x category count matrix.
+
+Tokenizing is the only per-headline work, and its result is cached in
+data/archetypes.npz by headline hash, so a rerun tokenizes only headlines it
+hasn't seen. Counts are then recomputed from the cached word ids and
+current dates and tags (dates filled in by fetch_dates.py move headlines
+between years), and only subjects whose content changed are rewritten.
+
+Usage:
+    uv run python archetypes.py
+    uv run python archetypes.py --min-count 50 --min-share 0.2
+    uv run python archetypes.py --show "area man"
+    uv run python archetypes.py --force  # Tokenize everything and rewrite every file
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from export import MANIFEST_NAME, content_hash, encode, load_manifest, write_atomic
+from optimize import load_data
+from store import DEFAULT_PATHS, STORES, check_store
+
+OUTPUT_DIR = Path(__file__).parent / "web" / "public" / "archetypes"
+STATE_PATH = Path("data") / "archetypes.npz"
+STATE_VERSION = 1  # Bump when tokenization changes, to invalidate the cache
+
+MAX_WORDS = 3
+MIN_COUNT = 20
+MIN_SHARE = 0.1
+TOP_YEARS = 3
+TOP_TAGS = 3
+
+# Words a subject can't start or end with
+FUNCTION_WORDS = frozenset("""
+    a about after all an and are as at be before but by can could for from has
+    have if in into is it its just new no not now of off on or out over says
+    still than that the their this to up was will with would
+""".split())
+
+
+def leading_words(headlines: pd.Series) -> pd.DataFrame:
+    """The first MAX_WORDS normalized words of each headline ("" past its end)."""
+    words = (headlines.fillna("").str.lower()
+             .str.replace("’", "'", regex=False)
+             .str.replace(r"'s\b", "", regex=True)
+             .str.replace(r"['.]", "", regex=True)
+             .str.replace(r"[^a-z0-9]+", " ", regex=True)
+             .str.split(n=MAX_WORDS, expand=True))
+    return words.reindex(columns=range(MAX_WORDS)).fillna("")
+
+
+def empty_state() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # vocab[0] is always "", the id of a missing word
+    return (np.empty(0, dtype=np.uint64), np.empty((0, MAX_WORDS), dtype=np.int32),
+            np.array([""]))
+
+
+def load_state(path: Path) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(sorted headline hashes, their word ids, vocabulary), empty if missing or stale."""
+    if not path.exists():
+        return empty_state()
+    try:
+        with np.load(path, allow_pickle=False) as state:
+            if int(state["version"]) != STATE_VERSION:
+                return empty_state()
+            return state["ids"], state["words"], state["vocab"]
+    except (OSError, KeyError, ValueError):
+        print(f"  Warning: {path} is unreadable; tokenizing every headline")
+        return empty_state()
+
+
+def save_state(path: Path, ids: np.ndarray, words: np.ndarray, vocab: np.ndarray) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp.npz")
+    np.savez(tmp, version=STATE_VERSION, ids=ids, words=words, vocab=vocab)
+    tmp.replace(path)
+
+
+def word_ids(headlines: pd.Series, state_path: Path | None = STATE_PATH,
+             force: bool = False) -> tuple[np.ndarray, np.ndarray, int]:
+    """Word ids (rows x MAX_WORDS) of each headline, and the vocabulary.
+
+    Only headlines missing from the cache at `state_path` are tokenized.
+    Returns (word ids, vocabulary, number of headlines tokenized).
+    """
+    hashes = pd.util.hash_pandas_object(headlines.fillna(""), index=False).to_numpy()
+    ids, words, vocab = load_state(state_path) if state_path and not force else empty_state()
+    unique, first = np.unique(hashes, return_index=True)
+
+    known = np.zeros(len(unique), dtype=bool)
+    if len(ids):
+        at = np.minimum(np.searchsorted(ids, unique), len(ids) - 1)
+        known = ids[at] == unique
+    new = ~known
+    if new.any():
+        tokens = leading_words(headlines.iloc[first[new]]).to_numpy(dtype=str)
+        vocab = np.concatenate([vocab, np.setdiff1d(tokens.ravel(), vocab)])
+        lookup = pd.Index(vocab)
+        new_words = lookup.get_indexer(tokens.ravel()).reshape(tokens.shape).astype(np.int32)
+        ids = np.concatenate([ids, unique[new]])
+        words = np.concatenate([words, new_words])
+        order = np.argsort(ids, kind="stable")
+        ids, words = ids[order], words[order]
+
+    # Keep only headlines still in the archive, so the cache doesn't grow forever
+    at = np.searchsorted(ids, unique)
+    if state_path:
+        save_state(state_path, unique, words[at], vocab)
+    return words[at][np.searchsorted(unique, hashes)], vocab, int(new.sum())
+
+
+def assign_subjects(words: np.ndarray, vocab: np.ndarray, min_count: int = MIN_COUNT,
+                    min_share: float = MIN_SHARE) -> np.ndarray:
+    """Each headline's subject as a code (-1 for none); equal codes are the same subject.
+
+    Codes encode the subject's word ids, so decode_subject recovers its words.
+    """
+    n_words = np.int64(len(vocab))
+    function = np.isin(vocab, list(FUNCTION_WORDS)) | (vocab == "")
+    words = words.astype(np.int64)
+    subject = np.full(len(words), -1, dtype=np.int64)
+    gram = np.zeros(len(words), dtype=np.int64)
+    prefix_count = None
+    for n in range(MAX_WORDS):
+        gram = gram * n_words + words[:, n]
+        _, inverse, counts = np.unique(gram, return_inverse=True, return_counts=True)
+        count = counts[inverse]
+        ok = (count >= min_count) & ~function[words[:, 0]] & ~function[words[:, n]]
+        if prefix_count is not None:
+            ok &= count >= min_share * prefix_count
+        # Longer subjects win. Codes of different lengths can't collide, since
+        # a subject's first word id is never 0
+        subject[ok] = gram[ok]
+        prefix_count = count
+
+    # Drop subjects left with too few headlines once longer ones took theirs
+    _, inverse, counts = np.unique(subject, return_inverse=True, return_counts=True)
+    subject[(counts[inverse] < min_count)] = -1
+    return subject
+
+
+def decode_subject(code: int, vocab: np.ndarray) -> list[str]:
+    words = []
+    while code:
+        code, word = divmod(code, len(vocab))
+        words.append(str(vocab[word]))
+    return words[::-1]
+
+
+def subject_name(headline: str, length: int) -> str:
+    """The subject as written in a headline: "Area Man's Dream ..." -> "Area Man"."""
+    words = headline.split()[:length]
+    return re.sub(r"['’]s$|[^\w.]+$", "", " ".join(words))
+
+
+def to_frame(headlines: list[dict]) -> pd.DataFrame:
+    """Headline, url, tag, date and year (0 if undated) of each record."""
+    df = pd.DataFrame({
+        "headline": [h.get("headline") or "" for h in headlines],
+        "url": [h.get("url") or "" for h in headlines],
+        "tag": [h.get("tag") or "Uncategorized" for h in headlines],
+        "date": [h.get("date") or "" for h in headlines],
+    }, dtype=str)
+    df["year"] = pd.to_numeric(df["date"].str[:4], errors="coerce").fillna(0).astype(int)
+    return df
+
+
+def summarize(df: pd.DataFrame, subject: np.ndarray, vocab: np.ndarray) -> dict[str, dict]:
+    """Per subject slug: its manifest entry (without hash) and its matrix file's content."""
+    if not (subject >= 0).any():
+        return {}
+    df = df[subject >= 0]
+    codes, sid = np.unique(subject[subject >= 0], return_inverse=True)
+    tag_codes, tags = pd.factorize(df["tag"], sort=True)
+    years = df["year"].to_numpy()
+    n_tags = len(tags)
+
+    totals = np.bincount(sid, minlength=len(codes))
+    by_tag = np.bincount(sid * n_tags + tag_codes, minlength=len(codes) * n_tags).reshape(-1, n_tags)
+    # First appearance: the earliest dated headline, else the first one stored
+    order = np.lexsort((df["date"].str[:10].to_numpy(dtype=str), years == 0, sid))
+    first = order[np.r_[True, sid[order][1:] != sid[order][:-1]]]
+    # Year x tag cells of dated headlines, sorted by subject
+    dated = years > 0
+    cells, cell_counts = np.unique(
+        (sid[dated].astype(np.int64) * 10000 + years[dated]) * n_tags + tag_codes[dated],
+        return_counts=True)
+    bounds = np.searchsorted(cells // n_tags // 10000, np.arange(len(codes) + 1))
+
+    subjects = {}
+    for s in np.argsort(-totals, kind="stable"):
+        words = decode_subject(int(codes[s]), vocab)
+        row = df.iloc[first[s]]
+        cell = cells[bounds[s]:bounds[s + 1]]
+        year_values, year_index = np.unique(cell // n_tags % 10000, return_inverse=True)
+        tag_values, tag_index = np.unique(cell % n_tags, return_inverse=True)
+        matrix = np.zeros((len(year_values), len(tag_values)), dtype=np.int64)
+        matrix[year_index, tag_index] = cell_counts[bounds[s]:bounds[s + 1]]
+        peak = np.argsort(-matrix.sum(axis=1), kind="stable")[:TOP_YEARS]
+        top = np.argsort(-by_tag[s], kind="stable")[:TOP_TAGS]
+
+        entry = {
+            "name": subject_name(row["headline"], len(words)),
+            "count": int(totals[s]),
+            "first": {"date": row["date"][:10] or None, "headline": row["headline"],
+                      "url": row["url"]},
+            "peak_years": [int(year_values[i]) for i in peak],
+            "top_tags": [[tags[i], int(by_tag[s, i])] for i in top if by_tag[s, i]],
+        }
+        data = {
+            "name": entry["name"],
+            "count": entry["count"],
+            "undated": int(totals[s] - matrix.sum()),
+            "years": year_values.tolist(),
+            "tags": [tags[i] for i in tag_values],
+            "counts": matrix.tolist(),
+        }
+        subjects["-".join(words)] = {"entry": entry, "data": data}
+    return subjects
+
+
+def build_archetypes(headlines: list[dict], output_dir: Path = OUTPUT_DIR,
+                     state_path: Path | None = STATE_PATH, min_count: int = MIN_COUNT,
+                     min_share: float = MIN_SHARE, force: bool = False) -> dict:
+    """Write changed subject files and the manifest. Returns counts of what was done."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    previous = load_manifest(output_dir).get("archetypes", {})
+    df = to_frame(headlines)
+    words, vocab, tokenized = word_ids(df["headline"], state_path, force)
+    subjects = summarize(df, assign_subjects(words, vocab, min_count, min_share), vocab)
+
+    archetypes = {}
+    written = 0
+    for slug, subject in subjects.items():
+        data = encode(subject["data"])
+        digest = content_hash(data)
+        path = output_dir / f"{slug}.json"
+        if force or previous.get(slug, {}).get("hash") != digest or not path.exists():
+            write_atomic(path, data)
+            written += 1
+        archetypes[slug] = {**subject["entry"], "hash": digest}
+
+    removed = 0
+    for slug in previous.keys() - archetypes.keys():
+        (output_dir / f"{slug}.json").unlink(missing_ok=True)
+        removed += 1
+
+    manifest = {
+        "headlines": len(df),
+        "min_count": min_count,
+        "min_share": min_share,
+        "archetypes": archetypes,
+    }
+    write_atomic(output_dir / MANIFEST_NAME, encode(manifest))
+    return {"headlines": len(df), "tokenized": tokenized, "archetypes": len(archetypes),
+            "written": written, "removed": removed}
+
+
+def show(output_dir: Path, name: str) -> dict | None:
+    """A subject's manifest entry and matrix, by name or slug, from the built index."""
+    slug = "-".join(word for word in leading_words(pd.Series([name])).iloc[0] if word)
+    entry = load_manifest(output_dir).get("archetypes", {}).get(slug)
+    if entry is None:
+        return None
+    return {**entry, **json.loads((output_dir / f"{slug}.json").read_text(encoding="utf-8"))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the archetype statistics index")
+    parser.add_argument("--store", choices=STORES, default="json", help="Article store backend")
+    parser.add_argument("--path", type=Path, default=None,
+                        help="Store path (default: data/headlines.json, data/headlines.parquet "
+                             "or data/headlines.db)")
+    parser.add_argument("--output", type=Path, default=OUTPUT_DIR,
+                        help="Output directory (default: web/public/archetypes)")
+    parser.add_argument("--state", type=Path, default=STATE_PATH,
+                        help=f"Tokenization cache (default: {STATE_PATH})")
+    parser.add_argument("--min-count", type=int, default=MIN_COUNT,
+                        help=f"Headlines a subject must open (default: {MIN_COUNT})")
+    parser.add_argument("--min-share", type=float, default=MIN_SHARE,
+                        help="Share of its shorter prefix's headlines a longer subject "
+                             f"must cover (default: {MIN_SHARE})")
+    parser.add_argument("--force", action="store_true",
+                        help="Tokenize every headline and rewrite every file")
+    parser.add_argument("--show", metavar="NAME",
+                        help="Print one subject from the built index instead of building it")
+    args = parser.parse_args()
+
+    if args.show:
+        subject = show(args.output, args.show)
+        if subject is None:
+            parser.error(f"no archetype {args.show!r} in {args.output}")
+        print(json.dumps(subject, indent=2, ensure_ascii=False))
+        return
+
+    if args.min_count < 1:
+        parser.error("--min-count must be at least 1")
+    if not 0 <= args.min_share <= 1:
+        parser.error("--min-share must be between 0 and 1")
+    try:
+        check_store(args.store)
+    except ValueError as e:
+        parser.error(str(e))
+
+    headlines = load_data(args.store, args.path)
+    print(f"Loaded {len(headlines):,} headlines from {args.path or DEFAULT_PATHS[args.store]}")
+
+    stats = build_archetypes(headlines, args.output, args.state, args.min_count,
+                             args.min_share, args.force)
+    print(f"Tokenized {stats['tokenized']:,} new headlines; found {stats['archetypes']:,} archetypes")
+    print(f"Wrote {stats['written']} changed archetype files"
+          + (f", removed {stats['removed']}" if stats["removed"] else "")
+          + f" in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
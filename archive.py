@@ -0,0 +1,227 @@
+"""
+Compressed raw-HTML archive shared by fetch.py and fetch_dates.py.
+
+With --archive, every listing and article page the scrapers download is kept
+on disk, so extraction can be re-run offline (--from-archive) after
+parse_listing or the date extraction changes, instead of re-downloading
+everything.
+
+Layout (data/archive/ by default):
+    segment-00001.zst ...  Append-only segments of compressed pages. Each page
+                           is its own zstd frame (or gzip member), so it can be
+                           read back from its offset without touching the rest.
+    index.jsonl            One line per stored page, last line for a URL wins:
+        {"url": ..., "kind": "listing" | "article", "sha256": ...,
+         "segment": ..., "offset": ..., "length": ..., "codec": ...,
+         "encoding": ..., "section": ..., "page": ..., "fetched_at": ...}
+
+Pages are content-addressed by SHA-256: a page whose bytes are already in the
+archive gets an index line pointing at the existing copy rather than a
+second one.
+
+zstd is used when the zstandard package is installed (`uv sync --extra
+archive`); otherwise gzip.
+
+Usage:
+    uv run python archive.py stats
+    uv run python archive.py stats --archive path/to/archive
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import zstandard
+    HAVE_ZSTD = True
+except ImportError:
+    HAVE_ZSTD = False
+
+DEFAULT_PATH = Path('data') / 'archive'
+CODECS = ['zstd', 'gzip']
+DEFAULT_CODEC = 'zstd' if HAVE_ZSTD else 'gzip'
+SEGMENT_SUFFIX = {'zstd': '.zst', 'gzip': '.gz'}
+SEGMENT_SIZE = 256 * 1024 * 1024
+
+
+def compress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data, codec):
+    if codec == 'zstd':
+        if not HAVE_ZSTD:
+            raise RuntimeError("Archive holds zstd pages but zstandard is not installed "
+                               "(uv sync --extra archive)")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def read_bytes(entry, root=DEFAULT_PATH):
+    """Return the raw bytes of the page an index entry points at.
+
+    A plain function of the entry, so parse pool workers can read pages from
+    disk themselves instead of having the HTML sent to them.
+    """
+    with open(Path(root) / entry['segment'], 'rb') as f:
+        f.seek(entry['offset'])
+        return decompress(f.read(entry['length']), entry['codec'])
+
+
+def read_page(entry, root=DEFAULT_PATH):
+    """Return the decoded HTML for an index entry."""
+    return read_bytes(entry, root).decode(entry.get('encoding') or 'utf-8', errors='replace')
+
+
+class PageArchive:
+    """An append-only, content-addressed archive of fetched pages.
+
+    `put` is safe to call from several threads at once.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, codec=DEFAULT_CODEC, segment_size=SEGMENT_SIZE):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}. Choose from: {', '.join(CODECS)}")
+        if codec == 'zstd' and not HAVE_ZSTD:
+            raise ValueError("zstandard is not installed (uv sync --extra archive)")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.path / 'index.jsonl'
+        self.codec = codec
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+        self._entries = None   # url -> latest index entry
+        self._blobs = None     # sha256 -> entry holding its bytes
+        self._index = None
+        self._segment = None
+
+    # Reading
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries, self._blobs = {}, {}
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash mid-write
+                        continue
+                    self._entries[entry['url']] = entry
+                    self._blobs.setdefault(entry['sha256'], entry)
+
+    def entries(self, kind=None):
+        """Latest index entry for each archived URL, optionally of one kind."""
+        self._load()
+        return [e for e in self._entries.values() if kind is None or e['kind'] == kind]
+
+    def get(self, url):
+        """Return the archived HTML for a URL, or None."""
+        self._load()
+        entry = self._entries.get(url)
+        return read_page(entry, self.path) if entry else None
+
+    def __contains__(self, url):
+        self._load()
+        return url in self._entries
+
+    def __len__(self):
+        self._load()
+        return len(self._entries)
+
+    # Writing
+
+    def put(self, url, kind, content, encoding='utf-8', section=None, page=None):
+        """Archive a page. `content` is the HTML as str, or raw bytes in `encoding`."""
+        data = content.encode(encoding, errors='replace') if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._load()
+            blob = self._blobs.get(digest)
+            if blob is None:
+                blob = self._append_blob(compress(data, self.codec))
+            entry = {'url': url, 'kind': kind, 'sha256': digest,
+                     'segment': blob['segment'], 'offset': blob['offset'],
+                     'length': blob['length'], 'codec': blob['codec'], 'encoding': encoding,
+                     'section': section, 'page': page,
+                     'fetched_at': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+            entry = {k: v for k, v in entry.items() if v is not None}
+            self._entries[url] = entry
+            self._blobs.setdefault(digest, entry)
+            self._write_index(entry)
+
+    def flush(self):
+        """Flush segments and index to disk."""
+        with self._lock:
+            for f in (self._segment, self._index):
+                if f:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            for f in (self._segment, self._index):
+                if f:
+                    f.close()
+            self._segment = self._index = None
+
+    # Internals (called with the lock held)
+
+    def _segment_paths(self):
+        return sorted(p for p in self.path.glob('segment-*') if p.suffix in SEGMENT_SUFFIX.values())
+
+    def _append_blob(self, data):
+        if self._segment and self._segment.tell() + len(data) > self.segment_size:
+            self._segment.close()
+            self._segment = None
+        if self._segment is None:
+            segments = self._segment_paths()
+            last = segments[-1] if segments else None
+            if (last and last.suffix == SEGMENT_SUFFIX[self.codec]
+                    and last.stat().st_size + len(data) <= self.segment_size):
+                path = last
+            else:
+                number = int(last.stem.split('-')[1]) + 1 if last else 1
+                path = self.path / f"segment-{number:05d}{SEGMENT_SUFFIX[self.codec]}"
+            self._segment = open(path, 'ab')
+        offset = self._segment.tell()
+        self._segment.write(data)
+        return {'segment': Path(self._segment.name).name, 'offset': offset,
+                'length': len(data), 'codec': self.codec}
+
+    def _write_index(self, entry):
+        if self._index is None:
+            self._index = open(self.index_path, 'a', encoding='utf-8')
+        self._index.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect the raw-HTML page archive')
+    parser.add_argument('command', choices=['stats'])
+    parser.add_argument('--archive', type=Path, default=DEFAULT_PATH,
+                        help='Archive directory (default: data/archive)')
+    args = parser.parse_args()
+
+    archive = PageArchive(args.archive)
+    entries = archive.entries()
+    blobs = {e['sha256']: e['length'] for e in entries}
+    on_disk = sum(p.stat().st_size for p in archive._segment_paths())
+    print(f"{len(entries):,} pages "
+          f"({sum(1 for e in entries if e['kind'] == 'listing'):,} listing, "
+          f"{sum(1 for e in entries if e['kind'] == 'article'):,} article)")
+    print(f"{len(blobs):,} distinct pages, {sum(blobs.values()) / 1e6:,.1f} MB compressed "
+          f"({on_disk / 1e6:,.1f} MB in segments)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Throughput benchmarks for the scrapers against a local stand-in Onion server.
+
+The server serves synthetic section listing pages (the same markup
+scrape_page parses) and article pages with a <time datetime> tag, with
+configurable latency, jitter, error and 429 rates and page counts. Each
+suite runs in a fresh process so peak RSS is per suite, and results are
+saved as JSON so runs can be compared.
+
+Usage:
+    uv run python bench.py                                  # All suites
+    uv run python bench.py --suite fetch_dates --articles 2000
+    uv run python bench.py --latency 80 --jitter 40 --throttle-rate 0.02
+    uv run python bench.py --compare data/bench/20260101-120000.json
+    uv run python bench.py --serve                          # Just run the server
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+SUITES = ['scrape_section', 'scrape_all_sections', 'fetch_dates']
+RESULTS_DIR = Path('data') / 'bench'
+TAGS = ['Local', 'News', 'Politics', 'Science & Technology', 'Entertainment', 'American Voices']
+
+
+# Stand-in server
+
+class ServerConfig:
+    def __init__(self, pages=50, per_page=20, latency=20.0, jitter=10.0,
+                 error_rate=0.0, throttle_rate=0.0, retry_after=1, article_kb=120, seed=0):
+        self.pages = pages                  # listing pages per section
+        self.per_page = per_page            # articles per listing page
+        self.latency = latency / 1000       # base response delay (ms -> s)
+        self.jitter = jitter / 1000         # uniform extra delay (ms -> s)
+        self.error_rate = error_rate        # fraction of 500 responses
+        self.throttle_rate = throttle_rate  # fraction of 429 responses
+        self.retry_after = retry_after      # Retry-After seconds on 429s
+        self.article_kb = article_kb        # article page size
+        self.seed = seed
+
+
+def _digest(*parts):
+    return int.from_bytes(hashlib.blake2b('/'.join(map(str, parts)).encode(),
+                                          digest_size=8).digest(), 'big')
+
+
+def listing_html(base_url, section, page_num, config):
+    items = []
+    for i in range(config.per_page):
+        slug = f"{section}-{page_num}-{i}"
+        tag = TAGS[_digest(config.seed, slug) % len(TAGS)]
+        items.append(
+            '<li class="wp-block-post">'
+            f'<h3 class="wp-block-post-title"><a href="{base_url}/articles/{slug}/">'
+            f'Area Man Benchmarks Headline {slug}</a></h3>'
+            f'<div class="taxonomy-category"><a href="{base_url}/tag/x/">{tag}</a></div>'
+            '</li>')
+    return ('<html><head><title>Listing</title></head><body>'
+            f'<ul class="wp-block-post-template">{"".join(items)}</ul></body></html>')
+
+
+def article_html(slug, config):
+    published = datetime(1996, 1, 1, tzinfo=timezone(timedelta(hours=-6))) + \
+        timedelta(days=_digest(config.seed, slug) % 11000)
+    filler = '<p>' + 'Lorem ipsum dolor sit amet. ' * 36 + '</p>'
+    head = '<head>' + '<script>var x = 1;</script>' * 200 + '</head>'
+    body_kb = max(1, config.article_kb - len(head) // 1024)
+    body = filler * (body_kb + 1)
+    return (f'<html>{head}<body><article><h1>{slug}</h1>'
+            f'<time datetime="{published.isoformat()}">{published:%B %d, %Y}</time>'
+            f'{body}</article></body></html>')
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = ServerConfig()
+    stats = {}
+    stats_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        config = self.config
+        time.sleep(config.latency + random.random() * config.jitter)
+
+        roll = random.random()
+        if roll < config.throttle_rate:
+            self._count('status_429')
+            return self._send(429, headers={'Retry-After': str(config.retry_after)})
+        if roll < config.throttle_rate + config.error_rate:
+            self._count('status_500')
+            return self._send(500)
+
+        base_url = f"http://{self.headers.get('Host')}"
+        listing = re.fullmatch(r'/([\w-]+)/page/(\d+)/?', self.path)
+        article = re.fullmatch(r'/articles/([\w-]+)/?', self.path)
+        if listing:
+            self._count('listing')
+            page_num = int(listing.group(2))
+            if page_num > config.pages:
+                return self._send(404)
+            html = listing_html(base_url, listing.group(1), page_num, config)
+        elif article:
+            self._count('article')
+            html = article_html(article.group(1), config)
+        else:
+            return self._send(404)
+        self._send(200, html.encode('utf-8'))
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        # Streamed date extraction hangs up as soon as it has the date
+        if not issubclass(sys.exc_info()[0], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_server(config, port=0):
+    """Start the stand-in server on a background thread; returns (server, base_url)."""
+    handler = type('Handler', (StandInHandler,), {'config': config, 'stats': {}})
+    server = StandInServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# Client-side latency probe
+
+@contextlib.contextmanager
+def latency_probe():
+    """Record time-to-response-headers of every HTTP request made by the scrapers."""
+    import requests
+    import httpx
+
+    latencies = []
+    send, async_send = requests.Session.send, httpx.AsyncClient.send
+
+    def timed_send(self, request, **kwargs):
+        start = time.perf_counter()
+        try:
+            return send(self, request, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    async def timed_async_send(self, request, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await async_send(self, request, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    requests.Session.send, httpx.AsyncClient.send = timed_send, timed_async_send
+    try:
+        yield latencies
+    finally:
+        requests.Session.send, httpx.AsyncClient.send = send, async_send
+
+
+# Suites (each runs in its own process)
+
+def run_scrape_section(base_url, options, workdir):
+    import fetch
+    fetch.BASE_URL = base_url
+    articles, _, last_page = fetch.scrape_section(
+        'news', workers=options['workers'], rate=options['rate'])
+    return {'articles': len(articles), 'last_page': last_page}
+
+
+def run_scrape_all_sections(base_url, options, workdir):
+    import fetch
+    fetch.BASE_URL = base_url
+    output = Path(workdir) / 'headlines.json'
+    fetch.scrape_all_sections(
+        workers=options['workers'], rate=options['rate'], max_rate=options['rate'] * 4,
+        output_file=output, fresh=True, engine=options['engine'],
+        parse_workers=options['parse_workers'])
+    with open(output, encoding='utf-8') as f:
+        return {'articles': len(json.load(f))}
+
+
+def run_fetch_dates(base_url, options, workdir):
+    import fetch_dates
+    from store import save_articles
+
+    path = Path(workdir) / 'headlines.json'
+    save_articles([{'headline': f'Headline {i}', 'url': f'{base_url}/articles/bench-{i}/',
+                    'tag': 'News', 'section': 'news', 'page': 1}
+                   for i in range(options['articles'])], path)
+    fetch_dates.fetch_dates_for_articles(
+        path, workers=options['workers'], max_workers=options['workers'] * 5,
+        rate=options['rate'], max_rate=options['rate'] * 4,
+        parse_workers=options['parse_workers'])
+    with open(path, encoding='utf-8') as f:
+        return {'dates': sum(1 for a in json.load(f) if a.get('date'))}
+
+
+SUITE_FUNCTIONS = {
+    'scrape_section': run_scrape_section,
+    'scrape_all_sections': run_scrape_all_sections,
+    'fetch_dates': run_fetch_dates,
+}
+
+
+def _suite_process(name, base_url, options, results):
+    out = io.StringIO()
+    try:
+        with tempfile.TemporaryDirectory() as workdir, latency_probe() as latencies:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(out):
+                result = SUITE_FUNCTIONS[name](base_url, options, workdir)
+            result['seconds'] = time.perf_counter() - start
+    except BaseException:
+        print(out.getvalue())
+        results.put(None)
+        raise
+    result['requests'] = len(latencies)
+    if latencies:
+        result['latency_p50_ms'] = float(np.percentile(latencies, 50) * 1000)
+        result['latency_p99_ms'] = float(np.percentile(latencies, 99) * 1000)
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if options['verbose']:
+        print(out.getvalue())
+    results.put(result)
+
+
+def run_suite(name, base_url, options, server):
+    """Run one suite in a fresh process and return its metrics."""
+    server.RequestHandlerClass.stats.clear()
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(target=_suite_process, args=(name, base_url, options, results))
+    process.start()
+    result = results.get()
+    process.join()
+    if result is None:
+        raise RuntimeError(f"Suite {name} failed (exit code {process.exitcode})")
+
+    stats = dict(server.RequestHandlerClass.stats)
+    result['server'] = stats
+    seconds = result['seconds']
+    result['requests_per_sec'] = result['requests'] / seconds
+    if name == 'fetch_dates':
+        result['dates_per_sec'] = result['dates'] / seconds
+    else:
+        result['pages_per_sec'] = stats.get('listing', 0) / seconds
+        result['articles_per_sec'] = result['articles'] / seconds
+    return result
+
+
+# Reporting
+
+HEADLINE_METRICS = ['pages_per_sec', 'dates_per_sec', 'requests_per_sec',
+                    'latency_p50_ms', 'latency_p99_ms', 'peak_rss_mb', 'seconds']
+
+
+def print_result(name, result, baseline=None):
+    print(f"\n{name}")
+    for metric in HEADLINE_METRICS:
+        if metric not in result:
+            continue
+        line = f"  {metric:<18} {result[metric]:>10.1f}"
+        if baseline and metric in baseline and baseline[metric]:
+            change = (result[metric] - baseline[metric]) / baseline[metric] * 100
+            line += f"   ({change:+.1f}% vs baseline {baseline[metric]:.1f})"
+        print(line)
+    errors = {k: v for k, v in result['server'].items() if k.startswith('status_')}
+    if errors:
+        print(f"  server errors      {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scrapers against a local stand-in server')
+    parser.add_argument('--suite', choices=SUITES, action='append',
+                        help='Suite to run (repeatable; default: all)')
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads',
+                        help='fetch.py engine for scrape_all_sections (default: threads)')
+    parser.add_argument('--workers', type=int, default=8, help='Starting concurrency (default: 8)')
+    parser.add_argument('--rate', type=float, default=200.0,
+                        help='Starting request rate, req/s (default: 200)')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Parse processes for scrape_all_sections and fetch_dates '
+                             '(default: one per CPU core; 0 parses on the I/O threads)')
+    parser.add_argument('--articles', type=int, default=1000,
+                        help='Articles for the fetch_dates suite (default: 1000)')
+    parser.add_argument('--pages', type=int, default=50, help='Listing pages per section (default: 50)')
+    parser.add_argument('--per-page', type=int, default=20, help='Articles per listing page (default: 20)')
+    parser.add_argument('--latency', type=float, default=20.0, help='Server latency, ms (default: 20)')
+    parser.add_argument('--jitter', type=float, default=10.0, help='Extra random latency, ms (default: 10)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of 500 responses')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of 429 responses')
+    parser.add_argument('--article-kb', type=int, default=120, help='Article page size, KB (default: 120)')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Results file (default: data/bench/<timestamp>.json)')
+    parser.add_argument('--compare', type=Path, default=None, help='Earlier results file to compare against')
+    parser.add_argument('--serve', action='store_true', help='Only run the stand-in server')
+    parser.add_argument('--port', type=int, default=0, help='Server port (default: any free port)')
+    parser.add_argument('--verbose', action='store_true', help='Show scraper output')
+    args = parser.parse_args()
+
+    config = ServerConfig(pages=args.pages, per_page=args.per_page, latency=args.latency,
+                          jitter=args.jitter, error_rate=args.error_rate,
+                          throttle_rate=args.throttle_rate, article_kb=args.article_kb)
+    server, base_url = start_server(config, args.port)
+
+    if args.serve:
+        print(f"Serving stand-in Onion at {base_url} (Ctrl-C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            return
+
+    options = {'workers': args.workers, 'rate': args.rate, 'articles': args.articles,
+               'engine': args.engine, 'parse_workers': args.parse_workers,
+               'verbose': args.verbose}
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    for name in args.suite or SUITES:
+        print(f"Running {name}...")
+        results[name] = run_suite(name, base_url, options, server)
+        print_result(name, results[name], baseline.get(name))
+    server.shutdown()
+
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'),
+                   'server': vars(config), 'options': options, 'results': results}, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+
+if __name__ == "__main__":
+    main()
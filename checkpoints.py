@@ -0,0 +1,215 @@
+"""
+Crash-safe snapshots and crawl frontiers for the article stores.
+
+Everything lives under data/checkpoints/<store file name>/:
+
+manifest.json
+    The sha256 of the current snapshot (data/headlines.json, or .parquet)
+    and of the last KEEP_SNAPSHOTS snapshots before it.
+<stem>.<UTC time><suffix>
+    Those earlier snapshots. Each is a hard link to the file it replaced
+    (a copy where links aren't supported), so keeping them costs nothing
+    until the snapshot is next rewritten.
+frontier-listing.json, frontier-dates.json
+    Where an interrupted fetch.py or fetch_dates.py run stopped, saved with
+    each checkpoint and removed when a run finishes (see Frontier).
+
+A snapshot is written to a temporary file, fsynced, recorded in the
+manifest and only then renamed over the old one, so a crash at any point
+leaves either the old or the new snapshot in place, and either one matches
+a checksum in the manifest.
+
+A snapshot that doesn't parse is moved aside as <name>.damaged and the
+newest good backup is loaded instead; if there is none, loading fails with
+CorruptSnapshot instead of starting over with an empty archive. A snapshot
+that parses but matches no checksum was most likely changed on purpose (a
+hand edit, a git checkout, a copy restored from elsewhere), so it is loaded
+with a warning and its checksum recorded; the backups stay available.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+KEEP_SNAPSHOTS = 3
+CHECKPOINT_DIR = 'checkpoints'
+
+
+class CorruptSnapshot(Exception):
+    """The snapshot is damaged and no good backup of it is left."""
+
+
+def checkpoint_dir(store_path):
+    """Directory holding a store's manifest, backups and frontiers."""
+    store_path = Path(store_path)
+    return store_path.parent / CHECKPOINT_DIR / store_path.name
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fsync_file(path):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def fsync_dir(path):
+    """Make a rename in `path` durable (a no-op where directories can't be opened)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path, data):
+    """Write bytes to `path` through a synced temporary file and a rename."""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    fsync_dir(path.parent)
+
+
+def timestamp():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class Snapshots:
+    """Checksums and backups of one store's snapshot file."""
+
+    def __init__(self, path, keep=KEEP_SNAPSHOTS):
+        self.path = Path(path)
+        self.dir = checkpoint_dir(self.path)
+        self.manifest_path = self.dir / 'manifest.json'
+        self.keep = keep
+
+    def manifest(self):
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return {}
+
+    def commit(self, tmp):
+        """Make `tmp`, a fully written snapshot, the current one.
+
+        The snapshot being replaced becomes the newest backup, and backups
+        beyond `keep` are deleted.
+        """
+        tmp = Path(tmp)
+        fsync_file(tmp)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        manifest = self.manifest()
+        backups = manifest.get('backups', [])
+
+        if self.keep and self.path.exists():
+            current = manifest.get('current') or {'sha256': file_checksum(self.path),
+                                                   'written_at': timestamp()}
+            stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+            backup = self.dir / f'{self.path.stem}.{stamp}{self.path.suffix}'
+            try:
+                os.link(self.path, backup)
+            except OSError:
+                shutil.copy2(self.path, backup)
+            backups.insert(0, {**current, 'file': backup.name})
+        for old in backups[self.keep:]:
+            (self.dir / old['file']).unlink(missing_ok=True)
+
+        manifest = {
+            'current': {'sha256': file_checksum(tmp), 'written_at': timestamp()},
+            'backups': backups[:self.keep],
+        }
+        # The manifest is written before the rename, so a crash in between
+        # leaves the old snapshot, which matches the newest backup
+        write_atomic(self.manifest_path,
+                     json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8'))
+        os.replace(tmp, self.path)
+        fsync_dir(self.path.parent)
+
+    def verify(self):
+        """True if the snapshot matches a recorded checksum (or none were recorded yet)."""
+        manifest = self.manifest()
+        if not manifest.get('current'):
+            return True
+        known = {manifest['current']['sha256']}
+        known.update(b['sha256'] for b in manifest.get('backups', [])[:1])
+        return file_checksum(self.path) in known
+
+    def adopt(self):
+        """Record the snapshot's checksum as current, for a file changed outside the stores."""
+        manifest = self.manifest()
+        manifest['current'] = {'sha256': file_checksum(self.path), 'written_at': timestamp()}
+        write_atomic(self.manifest_path,
+                     json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8'))
+
+    def backups(self):
+        """(path, entry) for each backup whose checksum still matches, newest first."""
+        for entry in self.manifest().get('backups', []):
+            path = self.dir / entry['file']
+            if path.exists() and file_checksum(path) == entry['sha256']:
+                yield path, entry
+
+    def set_aside(self):
+        """Move a damaged snapshot out of the way, keeping it for inspection."""
+        damaged = self.path.with_name(self.path.name + '.damaged')
+        os.replace(self.path, damaged)
+        return damaged
+
+
+class Frontier:
+    """Where an interrupted crawl stopped, saved at each checkpoint.
+
+    `state` is any JSON-ready dict. It is stored with a checksum, and a file
+    that is unreadable or doesn't match it is ignored (with a warning), so
+    the next run falls back to resuming from the store alone.
+    """
+
+    def __init__(self, store_path, stage):
+        self.path = checkpoint_dir(store_path) / f'frontier-{stage}.json'
+        self.stage = stage
+
+    def load(self):
+        if not self.path.exists():
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved['checksum'] == self._checksum(saved['state']):
+                return saved['state']
+        except (json.JSONDecodeError, KeyError, OSError):
+            pass
+        print(f"  Warning: {self.path} is damaged; resuming from the store instead")
+        return None
+
+    def save(self, state):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        saved = {'stage': self.stage, 'saved_at': timestamp(),
+                 'checksum': self._checksum(state), 'state': state}
+        write_atomic(self.path, json.dumps(saved, ensure_ascii=False).encode('utf-8'))
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _checksum(state):
+        return hashlib.sha256(json.dumps(state, sort_keys=True, ensure_ascii=False)
+                              .encode('utf-8')).hexdigest()
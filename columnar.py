@@ -0,0 +1,150 @@
+"""
+Columnar (Parquet) format for the headline archive, used by `--store parquet`.
+
+data/headlines.json repeats every key, tag and section name on every record,
+and reading it means building a Python dict for each of them. The Parquet
+file stores each field as a column instead:
+
+    headline, url   strings
+    tag, section    dictionary-encoded (a few dozen distinct values)
+    page            int32
+    date            timestamp (UTC, ms), plus utc_offset in minutes so the
+                    original local time - and so the calendar day - survives
+
+Files are zstd-compressed, several times smaller than the JSON, and read
+memory-mapped; `read_table(path, columns)` only decodes the columns asked
+for.
+
+Dates are parsed with datetime.fromisoformat. Converting back gives the same
+ISO 8601 string for the site's own dates ("2009-11-14T00:00:00-06:00"); a
+date-only value comes back as "YYYY-MM-DD", and "Z" as "+00:00". A date that
+can't be parsed is dropped with a warning.
+
+pyarrow is optional (uv sync --extra parquet); it is only needed for the
+parquet store and for the conversions below.
+
+Usage:
+    uv run python store.py convert data/headlines.json data/headlines.parquet
+    uv run python store.py convert data/headlines.parquet data/headlines.json
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+COLUMNS = ['headline', 'url', 'tag', 'section', 'page', 'date']
+COMPRESSION = 'zstd'
+
+
+def schema():
+    return pa.schema([
+        ('headline', pa.string()),
+        ('url', pa.string()),
+        ('tag', pa.dictionary(pa.int32(), pa.string())),
+        ('section', pa.dictionary(pa.int32(), pa.string())),
+        ('page', pa.int32()),
+        ('date', pa.timestamp('ms', tz='UTC')),
+        ('utc_offset', pa.int16()),
+    ])
+
+
+def require_pyarrow():
+    if not HAVE_PYARROW:
+        raise ValueError("The parquet store needs pyarrow (uv sync --extra parquet)")
+
+
+def parse_timestamp(text):
+    """Split an ISO 8601 date into (UTC datetime, offset in minutes or None).
+
+    A date without an offset is kept as its wall-clock time with no offset.
+    Returns (None, None) if the text isn't a date.
+    """
+    try:
+        parsed = datetime.fromisoformat(text.strip())
+    except (AttributeError, ValueError):
+        return None, None
+    offset = parsed.utcoffset()
+    if offset is None:
+        return parsed.replace(tzinfo=timezone.utc), None
+    return parsed.astimezone(timezone.utc), int(offset.total_seconds() // 60)
+
+
+def format_timestamp(utc, offset):
+    """Inverse of parse_timestamp."""
+    if offset is None:
+        local = utc.replace(tzinfo=None)
+        if local.time() == datetime.min.time():
+            return local.date().isoformat()
+    else:
+        local = utc.astimezone(timezone(timedelta(minutes=offset)))
+    return local.isoformat(timespec='milliseconds' if local.microsecond else 'seconds')
+
+
+def to_table(articles):
+    """Build a Parquet-ready table from article dicts."""
+    require_pyarrow()
+    dates, offsets = [], []
+    unparsed = 0
+    for article in articles:
+        text = article.get('date')
+        utc, offset = parse_timestamp(text) if text else (None, None)
+        if text and utc is None:
+            unparsed += 1
+        dates.append(utc)
+        offsets.append(offset)
+    if unparsed:
+        print(f"  Warning: {unparsed:,} dates could not be parsed and were left empty")
+
+    columns = {field: [a.get(field) for a in articles] for field in COLUMNS if field != 'date'}
+    columns['date'] = dates
+    columns['utc_offset'] = offsets
+    return pa.Table.from_pydict(columns, schema=schema())
+
+
+def from_table(table):
+    """Article dicts from a table (as returned by read_table), without empty fields."""
+    columns = [c for c in table.column_names if c != 'utc_offset']
+    offsets = (table.column('utc_offset').to_pylist() if 'utc_offset' in table.column_names
+               else [None] * table.num_rows)
+    articles = []
+    for row, offset in zip(table.select(columns).to_pylist(), offsets):
+        if row.get('date') is not None:
+            row['date'] = format_timestamp(row['date'], offset)
+        articles.append({k: v for k, v in row.items() if v is not None})
+    return articles
+
+
+def read_table(path, columns=None):
+    """Read a Parquet archive, memory-mapped, decoding only `columns` if given.
+
+    Asking for 'date' brings its utc_offset along, so dates can be formatted.
+    """
+    require_pyarrow()
+    if columns is not None and 'date' in columns and 'utc_offset' not in columns:
+        columns = [*columns, 'utc_offset']
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def write_table(table, path):
+    """Write a Parquet archive, replacing the file atomically."""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    pq.write_table(table, tmp, compression=COMPRESSION)
+    os.replace(tmp, path)
+
+
+def read_articles(path, columns=None):
+    """Load article dicts from a Parquet archive."""
+    return from_table(read_table(path, columns))
+
+
+def write_articles(articles, path):
+    """Write article dicts as a Parquet archive."""
+    write_table(to_table(articles), path)
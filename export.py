@@ -0,0 +1,151 @@
+"""
+Export headlines for the web app as one small JSON file per calendar day.
+Run this after optimize.py.
+
+Headlines with a date are grouped by MM-DD, newest year first, into
+web/public/days/MM-DD.json (minified, the DayData shape in web/lib/types.ts).
+web/public/days/manifest.json lists each day's count, years and content
+hash, plus the archive-wide total and years. Pages load only the manifest and
+the day they show, instead of the whole archive.
+
+Days are listed in the manifest in the order they first appear in the
+archive, as the keys of the old by-day.json were. The random page numbers
+headlines day by day in that order, so share links (/random#slug-1234)
+keep pointing at the same headline.
+
+A day falls on the calendar date its timestamp was written with
+("2009-11-14T00:00:00-06:00" is November 14), whatever the timezone of the
+machine running the export.
+
+A shard is only rewritten when its content hash changes, so a nightly run
+that adds a few headlines touches a few files.
+
+Usage:
+    uv run python export.py
+    uv run python export.py --store parquet
+    uv run python export.py --force  # Rewrite every shard
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from optimize import load_data
+from store import DEFAULT_PATHS, STORES, check_store
+
+OUTPUT_DIR = Path(__file__).parent / "web" / "public" / "days"
+MANIFEST_NAME = "manifest.json"
+
+
+def to_day_frame(headlines: list[dict]) -> pd.DataFrame:
+    """Dated headlines with their MM-DD and year, newest year first within each day.
+
+    Days come in the order they first appear in `headlines`; within a day,
+    headlines of the same year keep their archive order.
+    """
+    df = pd.DataFrame({
+        "headline": [h.get("headline") or "" for h in headlines],
+        "url": [h.get("url") or "" for h in headlines],
+        "tag": [h.get("tag") or "Uncategorized" for h in headlines],
+        "date": [h.get("date") or "" for h in headlines],
+    })
+    parts = df["date"].str.extract(r"^(?P<year>\d{4})-(?P<day>\d{2}-\d{2})")
+    df = df.assign(day=parts["day"], year=pd.to_numeric(parts["year"])).dropna(subset=["day"])
+    df["year"] = df["year"].astype(int)
+    df["first_seen"], _ = pd.factorize(df["day"])
+    return df.sort_values(["first_seen", "year"], ascending=[True, False], kind="stable")
+
+
+def encode(data: dict) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def load_manifest(output_dir: Path) -> dict:
+    path = output_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return {}
+
+
+def export_days(headlines: list[dict], output_dir: Path = OUTPUT_DIR,
+                force: bool = False) -> dict:
+    """Write changed day shards and the manifest. Returns counts of what was done."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    previous = load_manifest(output_dir).get("days", {})
+    df = to_day_frame(headlines)
+
+    days = {}
+    written = 0
+    for day, group in df.groupby("day", sort=False):
+        years = sorted({int(y) for y in group["year"].unique()}, reverse=True)
+        data = encode({
+            "headlines": group[["headline", "url", "tag", "year"]].to_dict("records"),
+            "years": years,
+            "count": len(group),
+        })
+        digest = content_hash(data)
+        path = output_dir / f"{day}.json"
+        if force or previous.get(day, {}).get("hash") != digest or not path.exists():
+            write_atomic(path, data)
+            written += 1
+        days[day] = {"count": len(group), "years": years, "hash": digest}
+
+    removed = 0
+    for day in previous.keys() - days.keys():
+        (output_dir / f"{day}.json").unlink(missing_ok=True)
+        removed += 1
+
+    manifest = {
+        "total": len(df),
+        "years": sorted({int(y) for y in df["year"].unique()}),
+        "days": days,
+    }
+    write_atomic(output_dir / MANIFEST_NAME, encode(manifest))
+    return {"headlines": len(df), "days": len(days), "written": written, "removed": removed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export per-day headline files for the web app")
+    parser.add_argument("--store", choices=STORES, default="json", help="Article store backend")
+    parser.add_argument("--path", type=Path, default=None,
+                        help="Store path (default: data/headlines.json, data/headlines.parquet "
+                             "or data/headlines.db)")
+    parser.add_argument("--output", type=Path, default=OUTPUT_DIR,
+                        help="Output directory (default: web/public/days)")
+    parser.add_argument("--force", action="store_true", help="Rewrite every shard")
+    args = parser.parse_args()
+
+    try:
+        check_store(args.store)
+    except ValueError as e:
+        parser.error(str(e))
+
+    headlines = load_data(args.store, args.path)
+    print(f"Loaded {len(headlines):,} headlines from {args.path or DEFAULT_PATHS[args.store]}")
+
+    stats = export_days(headlines, args.output, args.force)
+    print(f"Headlines with dates: {stats['headlines']:,} on {stats['days']} days")
+    print(f"Wrote {stats['written']} changed day files"
+          + (f", removed {stats['removed']}" if stats["removed"] else "")
+          + f" in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
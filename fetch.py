@@ -1,69 +1,166 @@
 import requests
-from bs4 import BeautifulSoup
-import json
 import time
 import argparse
+from functools import partial
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
+import parsers
+from archive import DEFAULT_PATH as DEFAULT_ARCHIVE, PageArchive, read_page
+from checkpoints import Frontier
+from filters import excluded_path, load_excluded_urls
+from httpcache import DEFAULT_PATH as DEFAULT_HTTP_CACHE, HttpCache
+from metrics import (DEFAULT_DIR as DEFAULT_METRICS, DEFAULT_PROFILE_DIR, Metrics, MetricsWriter,
+                     profiled, queued, timed)
+from ratelimit import MAX_ATTEMPTS, FetchFailed, RateController, backoff_delay, is_retryable
+from shards import DEFAULT_BLOCK as DEFAULT_SHARD_BLOCK, PageShard, parse_shard, shard_path
+from store import DEFAULT_PATHS, STORES, JsonStore, check_store, open_store
+
+BASE_URL = 'https://theonion.com'
 SECTIONS = ['news', 'local', 'politics', 'latest']
 
 
-def scrape_page(section, page_num):
-    """Scrape a single page and return list of articles."""
-    url = f"https://theonion.com/{section}/page/{page_num}/"
+def listing_url(section, page_num):
+    """Return the URL of a section listing page."""
+    return f"{BASE_URL}/{section}/page/{page_num}/"
+
+
+def parse_listing(html, section, page_num):
+    """Extract articles from the HTML of a section listing page."""
+    soup = parsers.make_soup(html)
     
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+    articles = []
+    post_items = soup.find_all('li', class_='wp-block-post')
+    
+    for item in post_items:
+        article = {}
         
-        articles = []
-        post_items = soup.find_all('li', class_='wp-block-post')
+        title_elem = item.find('h3', class_='wp-block-post-title')
+        if title_elem:
+            link = title_elem.find('a')
+            if link:
+                article['headline'] = link.get_text(strip=True)
+                article['url'] = link.get('href', '')
         
-        for item in post_items:
-            article = {}
-            
-            title_elem = item.find('h3', class_='wp-block-post-title')
-            if title_elem:
-                link = title_elem.find('a')
-                if link:
-                    article['headline'] = link.get_text(strip=True)
-                    article['url'] = link.get('href', '')
-            
-            tag_elem = item.find('div', class_='taxonomy-category')
-            if tag_elem:
-                tag_link = tag_elem.find('a')
-                if tag_link:
-                    article['tag'] = tag_link.get_text(strip=True)
-            
-            article['section'] = section
-            article['page'] = page_num
-            
-            if article.get('headline') and article.get('url') and article.get('tag'):
-                articles.append(article)
+        tag_elem = item.find('div', class_='taxonomy-category')
+        if tag_elem:
+            tag_link = tag_elem.find('a')
+            if tag_link:
+                article['tag'] = tag_link.get_text(strip=True)
+        
+        article['section'] = section
+        article['page'] = page_num
         
-        return articles
+        if article.get('headline') and article.get('url') and article.get('tag'):
+            articles.append(article)
     
-    except requests.RequestException as e:
-        print(f"  Error fetching {section} page {page_num}: {e}")
+    return articles
+
+
+def parse_archived_listing(entry, root=DEFAULT_ARCHIVE):
+    """Parse a listing page from the archive (see archive.py), for --from-archive."""
+    try:
+        return parse_listing(read_page(entry, root), entry['section'], entry['page'])
+    except Exception as e:
+        print(f"  Error parsing {entry['url']}: {e}")
+        return []
+
+
+def scrape_page(section, page_num, controller=None, attempts=MAX_ATTEMPTS, archive=None,
+                cache=None, metrics=None):
+    """Scrape a single page and return list of articles.
+    
+    Downloads with fetch_listing and parses on the calling thread.
+    """
+    html = fetch_listing(section, page_num, controller, attempts, archive, cache, metrics)
+    if not html:
         return []
+    if isinstance(html, list):
+        return html
+    try:
+        with timed(metrics, 'parse_seconds', stage='listing', section=section):
+            articles = parse_listing(html, section, page_num)
     except Exception as e:
         print(f"  Error parsing {section} page {page_num}: {e}")
         return []
+    if cache and articles:
+        cache.set_result(listing_url(section, page_num), articles)
+    return articles
 
 
-def load_existing_articles(output_file):
-    """Load existing articles from JSON file if it exists."""
-    if output_file.exists():
+def fetch_listing(section, page_num, controller=None, attempts=MAX_ATTEMPTS, archive=None,
+                  cache=None, metrics=None):
+    """Download a section listing page and return its HTML.
+    
+    Returns None for a 404, which means the page is past the end of the
+    section. Timeouts, connection errors, 429s and 5xx responses are retried
+    with backoff; if the page still can't be fetched, FetchFailed is raised so
+    the failure isn't mistaken for an empty page.
+    
+    If a RateController is given, the response status and latency are
+    reported to it. If a PageArchive is given, the HTML is saved to it.
+    
+    With an HttpCache the request is conditional. On a 304 the articles
+    extracted last time are returned (a list, rather than HTML); on a 200 the
+    validators are stored, and the caller attaches the articles once parsed.
+    
+    Requests, status codes, bytes and retries are recorded in `metrics`
+    (a metrics.Metrics) if given.
+    """
+    url = listing_url(section, page_num)
+    
+    for attempt in range(1, attempts + 1):
+        status = retry_after = None
         try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                articles = json.load(f)
-            return articles
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Error loading existing file: {e}. Starting fresh.")
-            return []
-    return []
+            start = time.monotonic()
+            response = requests.get(url, timeout=10, headers=cache.headers(url) if cache else None)
+            status, retry_after = response.status_code, response.headers.get('Retry-After')
+            latency = time.monotonic() - start
+            if controller:
+                controller.on_response(status, latency, retry_after)
+            if metrics:
+                metrics.response('listing', section, status, latency, len(response.content))
+            if status == 404:
+                return None
+            if status == 304:
+                articles = cache.result(url) if cache else None
+                if articles is None:
+                    raise requests.HTTPError('304 Not Modified without a cached result',
+                                             response=response)
+                return articles
+            response.raise_for_status()
+            if cache:
+                cache.put(url, response.headers)
+            if archive is not None:
+                archive.put(url, 'listing', response.text, section=section, page=page_num)
+            return response.text
+        
+        except requests.RequestException as e:
+            if e.response is None:
+                if controller:
+                    controller.on_error()
+                if metrics:
+                    metrics.error('listing', section)
+            error = e
+        
+        if not is_retryable(status) or attempt == attempts:
+            print(f"  Error fetching {section} page {page_num}: {error}")
+            raise FetchFailed(url, error, attempt, status)
+        if metrics:
+            metrics.count('retries_total', stage='listing', section=section)
+        delay = backoff_delay(attempt, retry_after)
+        print(f"  Retrying {section} page {page_num} in {delay:.1f}s "
+              f"(attempt {attempt + 1}/{attempts}): {error}")
+        time.sleep(delay)
+
+
+def load_existing_articles(output_file):
+    """Load existing articles (snapshot plus change log) if they exist.
+    
+    Raises checkpoints.CorruptSnapshot rather than returning nothing if the
+    snapshot and all its backups are damaged.
+    """
+    return JsonStore(output_file).load()
 
 
 def get_last_scraped_page(articles, section=None):
@@ -83,182 +180,626 @@ def get_existing_urls(articles):
     return {article.get('url') for article in articles if article.get('url')}
 
 
-def save_articles(articles, output_file):
-    """Save articles to JSON file."""
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(articles, f, indent=2, ensure_ascii=False)
-
-
-def scrape_pages_batch(section, pages, workers=4):
-    """Scrape multiple pages in parallel, return all articles."""
-    all_results = []
+class SectionCrawl:
+    """Sliding-window crawl state for a single section.
     
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = {executor.submit(scrape_page, section, p): p for p in pages}
-        
-        for future in as_completed(futures):
-            page_num = futures[future]
-            try:
-                articles = future.result()
-                all_results.append((page_num, articles))
-            except Exception as e:
-                print(f"  Error on {section} page {page_num}: {e}")
-                all_results.append((page_num, []))
+    Pages are requested out of order (up to `window` at a time) but processed
+    strictly in page order, so duplicate filtering and the "3 empty pages ends
+    the section" rule behave the same as they did with fixed batches.
     
-    # Sort by page number to maintain order
-    all_results.sort(key=lambda x: x[0])
-    return all_results
-
-
-def scrape_section(section, start_page=1, max_pages=None, workers=4, batch_size=10, 
-                   batch_delay=2, existing_urls=None, verbose=False):
-    """Scrape a single section with parallel fetching.
+    Pages that failed after every retry are skipped and kept in `failures` for
+    the dead-letter queue; they don't count as empty. Three failed pages in a
+    row stop the section, since the site is most likely down.
     
-    Returns:
-        tuple: (new_articles, total_duplicates, last_page_scraped)
+    With `pages` (a shards.PageShard) only that shard's pages are requested,
+    and "in a row" means consecutive pages of the shard.
     """
-    if existing_urls is None:
-        existing_urls = set()
-    
-    new_articles = []
-    total_duplicates = 0
-    page_num = start_page
-    empty_pages = 0
-    
-    print(f"[{section}] Starting from page {start_page}")
     
-    while True:
-        # Determine batch range
-        if max_pages:
-            end_page = min(page_num + batch_size, max_pages + 1)
-        else:
-            end_page = page_num + batch_size
+    def __init__(self, section, start_page=1, max_pages=None, window=4,
+                 existing_urls=None, report_every=10, controller=None,
+                 stop_after_known=None, pages=None):
+        self.pages = pages
+        if pages is not None:
+            start_page = pages.first(start_page)
+        self.section = section
+        self.max_pages = max_pages
+        self.window = window
+        self.existing_urls = existing_urls if existing_urls is not None else set()
+        self.report_every = report_every
+        self.controller = controller
+        self.stop_after_known = stop_after_known
         
-        pages_to_fetch = list(range(page_num, end_page))
-        if not pages_to_fetch:
-            break
+        self.next_page = start_page        # next page to request
+        self.next_to_process = start_page  # next page to consume, in order
+        self.in_flight = 0
+        self.buffer = {}                   # page_num -> articles, waiting for earlier pages
+        self.empty_pages = 0
+        self.failed_pages = 0              # consecutive pages that failed
+        self.known_pages = 0               # consecutive pages with nothing new
+        self.last_valid_page = start_page - 1
+        self.stopped = bool(max_pages and start_page > max_pages)
         
-        # Fetch batch in parallel
-        results = scrape_pages_batch(section, pages_to_fetch, workers)
+        self.new_articles = []
+        self.duplicates = 0
+        self.failures = []                 # FetchFailed for each failed page
+        self._report_start = start_page
+        self._report_new = 0
         
-        batch_new = 0
-        batch_dupes = 0
-        last_valid_page = page_num - 1
+        shard = f" (shard {pages}, blocks of {pages.block} pages)" if pages is not None else ""
+        print(f"[{section}] Starting from page {start_page}{shard}")
+    
+    def can_launch(self):
+        if self.stopped or self.in_flight >= self.window:
+            return False
+        return not self.max_pages or self.next_page <= self.max_pages
+    
+    def launch(self):
+        """Reserve the next page number to request."""
+        page_num = self.next_page
+        self.next_page = self._after(page_num)
+        self.in_flight += 1
+        return page_num
+    
+    def fail(self, page_num, failure):
+        """Record a page that could not be fetched (a FetchFailed)."""
+        self.failures.append((page_num, failure))
+        return self.complete(page_num, None)
+    
+    def complete(self, page_num, articles):
+        """Record a fetched page and return the new articles it unblocked.
         
-        for pg, articles in results:
-            if not articles:
-                empty_pages += 1
-                if empty_pages >= 3:
-                    print(f"[{section}] No more pages after {last_valid_page}")
-                    return new_articles, total_duplicates, last_valid_page
-                continue
-            
-            empty_pages = 0
-            last_valid_page = pg
-            
-            # Filter duplicates
-            unique = [a for a in articles if a.get('url') not in existing_urls]
-            dupes = len(articles) - len(unique)
+        `articles` is None for a page that failed. Results for pages past the
+        end of the section are discarded.
+        """
+        self.in_flight -= 1
+        if self.stopped:
+            return []
+        self.buffer[page_num] = articles
+        
+        accepted = []
+        while not self.stopped and self.next_to_process in self.buffer:
+            pg = self.next_to_process
+            page_articles = self.buffer.pop(pg)
+            self.next_to_process = self._after(pg)
             
-            batch_dupes += dupes
-            batch_new += len(unique)
+            if page_articles is None:
+                self.failed_pages += 1
+                if self.failed_pages >= 3:
+                    self._report(pg)
+                    print(f"[{self.section}] Giving up after {self.failed_pages} failed "
+                          f"pages in a row (ending at page {pg})")
+                    self._stop()
+                    break
+            elif not page_articles:
+                self.failed_pages = 0
+                self.empty_pages += 1
+                if self.empty_pages >= 3:
+                    self._report(pg)
+                    print(f"[{self.section}] No more pages after {self.last_valid_page}")
+                    self._stop()
+                    break
+            else:
+                self.failed_pages = 0
+                self.empty_pages = 0
+                self.last_valid_page = pg
+                
+                page_new = 0
+                for a in page_articles:
+                    if a.get('url') in self.existing_urls:
+                        self.duplicates += 1
+                    else:
+                        self.existing_urls.add(a.get('url'))
+                        self.new_articles.append(a)
+                        accepted.append(a)
+                        page_new += 1
+                self._report_new += page_new
+                
+                self.known_pages = 0 if page_new else self.known_pages + 1
+                if self.stop_after_known and self.known_pages >= self.stop_after_known:
+                    self._report(pg)
+                    print(f"[{self.section}] Caught up: {self.known_pages} pages with "
+                          f"nothing new ending at page {pg}")
+                    self._stop()
+                    break
             
-            for a in unique:
-                existing_urls.add(a.get('url'))
-                new_articles.append(a)
-        
-        total_duplicates += batch_dupes
+            if self.max_pages and self.next_to_process > self.max_pages:
+                self._report(pg)
+                self._stop()
+            elif pg - self._report_start + 1 >= self.report_every:
+                self._report(pg)
         
-        # Compact progress output
-        total = len(new_articles)
-        print(f"[{section}] Pages {page_num}-{end_page - 1}: +{batch_new:,} articles (total: {total:,})")
+        return accepted
+    
+    def frontier(self):
+        """Where to resume this section: the next page to process and the stop counters."""
+        return {'next_page': self.next_to_process, 'empty_pages': self.empty_pages,
+                'failed_pages': self.failed_pages, 'known_pages': self.known_pages,
+                'last_valid_page': self.last_valid_page, 'done': self.stopped}
+    
+    def restore(self, state):
+        """Pick up the counters saved by frontier() in an interrupted run."""
+        self.empty_pages = state['empty_pages']
+        self.failed_pages = state['failed_pages']
+        self.known_pages = state['known_pages']
+        self.last_valid_page = state['last_valid_page']
+        print(f"[{self.section}] Resuming the interrupted run at page {self.next_page}")
+    
+    def _after(self, page_num):
+        """The next page to request after page_num."""
+        if self.pages is None:
+            return page_num + 1
+        return self.pages.first(page_num + 1)
+    
+    def _report(self, page_num):
+        """Print compact progress for pages processed since the last report."""
+        total = len(self.new_articles)
+        rate = f" [{self.controller.status()}]" if self.controller else ""
+        print(f"[{self.section}] Pages {self._report_start}-{page_num}: "
+              f"+{self._report_new:,} articles (total: {total:,}){rate}")
+        self._report_start = page_num + 1
+        self._report_new = 0
+    
+    def _stop(self):
+        self.stopped = True
+        self.buffer.clear()
+
+
+class WindowScheduler:
+    """Decide which section pages to request next under one global budget.
+    
+    Sections are served round-robin. Each section keeps at most its own
+    `window` pages in flight, and at most `workers` requests are in flight
+    across all sections. A RateController, if given, paces launches and may
+    hold concurrency below `workers`; callers release its slot when each
+    request completes.
+    """
+    
+    def __init__(self, crawls, workers=4, controller=None):
+        self.crawls = list(crawls)
+        self.workers = workers
+        self.controller = controller
+        self._next = 0
+    
+    def launches(self, in_flight):
+        """Return ([(crawl, page_num), ...], wait) for requests to start now.
         
-        # Check if we've hit max pages
-        if max_pages and end_page > max_pages:
-            break
+        `wait` is the number of seconds until the controller allows another
+        launch, or None if nothing is waiting on the clock.
+        """
+        ready = []
+        while in_flight + len(ready) < self.workers:
+            i = self._pick()
+            if i is None:
+                break
+            if self.controller:
+                ok, wait = self.controller.try_acquire()
+                if not ok:
+                    return ready, wait
+            crawl = self.crawls[i]
+            self._next = (i + 1) % len(self.crawls)
+            ready.append((crawl, crawl.launch()))
+        return ready, None
+    
+    def _pick(self):
+        n = len(self.crawls)
+        for i in range(n):
+            idx = (self._next + i) % n
+            if self.crawls[idx].can_launch():
+                return idx
+        return None
+
+
+def crawl_sections(crawls, workers=4, controller=None, parse_pool=None, archive=None,
+                   cache=None, metrics=None):
+    """Run section crawls concurrently on a shared thread pool.
+    
+    Yields (crawl, new_articles) each time a page completes; new_articles is
+    in page order and may be empty.
+    
+    With a parse_pool (see parsers.py), the threads only download pages and
+    the HTML is parsed in the pool. A page counts against `workers` until it
+    has been parsed, so downloads can't run far ahead of the parsers.
+    
+    Downloaded pages are saved to `archive` (a PageArchive) if given, and
+    requests are made conditional with `cache` (an HttpCache). With `metrics`,
+    request, queue wait and parse times are recorded.
+    """
+    scheduler = WindowScheduler(crawls, workers, controller)
+    pending = {}    # future -> (crawl, page_num), for downloads and parses
+    parsing = {}    # parse future -> time it was submitted
+    download = fetch_listing if parse_pool else scrape_page
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            ready, wait_for = scheduler.launches(len(pending))
+            for crawl, page_num in ready:
+                future = executor.submit(queued(metrics, download, 'listing', crawl.section),
+                                         crawl.section, page_num, controller,
+                                         archive=archive, cache=cache, metrics=metrics)
+                pending[future] = (crawl, page_num)
+            
+            if not pending:
+                if wait_for is None:
+                    break
+                time.sleep(wait_for)
+                continue
+            
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                crawl, page_num = pending.pop(future)
+                parsed = future in parsing
+                if parsed:
+                    submitted = parsing.pop(future)
+                    if metrics:
+                        metrics.observe('parse_seconds', time.monotonic() - submitted,
+                                        stage='listing', section=crawl.section)
+                elif controller:
+                    controller.release()
+                try:
+                    result = future.result()
+                except FetchFailed as e:
+                    yield crawl, crawl.fail(page_num, e)
+                    continue
+                except Exception as e:
+                    print(f"  Error on {crawl.section} page {page_num}: {e}")
+                    result = []
+                
+                if parse_pool and not parsed and not isinstance(result, list):
+                    if result and not crawl.stopped:
+                        # Downloaded HTML: parse it in the pool
+                        future = parse_pool.submit(parse_listing, result, crawl.section, page_num)
+                        pending[future] = (crawl, page_num)
+                        parsing[future] = time.monotonic()
+                        continue
+                    result = []
+                elif parsed and cache and result:
+                    cache.set_result(listing_url(crawl.section, page_num), result)
+                yield crawl, crawl.complete(page_num, result)
+
+
+def scrape_section(section, start_page=1, max_pages=None, workers=4, batch_size=10, 
+                   rate=5.0, existing_urls=None, verbose=False, window=None,
+                   controller=None, parse_pool=None, archive=None, cache=None):
+    """Scrape a single section with a sliding window of parallel fetches.
+    
+    Requests are paced by `controller`, or by a new RateController starting
+    at `rate` requests per second. Pages are parsed in `parse_pool`, saved
+    to `archive` and revalidated with `cache` if given.
+    
+    Returns:
+        tuple: (new_articles, total_duplicates, last_page_scraped)
+    """
+    if controller is None:
+        controller = RateController(rate=rate, concurrency=workers, max_concurrency=workers)
+    crawl = SectionCrawl(section, start_page, max_pages, window or workers,
+                         existing_urls, report_every=batch_size, controller=controller)
+    for _ in crawl_sections([crawl], workers, controller, parse_pool, archive, cache):
+        pass
+    return crawl.new_articles, crawl.duplicates, crawl.last_valid_page
+
+
+def section_crawls(store, sections, start_page=1, max_pages=None, window=4, existing_urls=None,
+                   batch_size=10, controller=None, fresh=False, since_last_run=False,
+                   known_pages=2, frontier=None, pages=None):
+    """Create a SectionCrawl per section, resuming after the last stored page.
+    
+    With `fresh` or `since_last_run` every section starts at start_page.
+    `frontier` maps sections to the SectionCrawl.frontier() states saved by
+    an interrupted run: those sections resume exactly where it stopped, and
+    the ones it finished are skipped. `pages` limits every crawl to one
+    shard's pages (see SectionCrawl).
+    """
+    crawls = []
+    frontier = frontier or {}
+    for section in sections:
+        saved = frontier.get(section)
+        if saved and saved['done']:
+            print(f"[{section}] Already finished by the interrupted run")
+            continue
         
-        # Check if we got empty results for all pages in batch
-        if batch_new == 0 and batch_dupes == 0:
-            print(f"[{section}] No more content found")
-            break
+        # Determine starting page for this section
+        if saved:
+            section_start = saved['next_page']
+        elif fresh or since_last_run:
+            section_start = start_page
+        else:
+            last_page = store.last_page(section)
+            section_start = max(start_page, last_page + 1) if last_page > 0 else start_page
         
-        page_num = end_page
-        time.sleep(batch_delay)
-    
-    return new_articles, total_duplicates, page_num - 1
+        crawl = SectionCrawl(section, section_start, max_pages, window,
+                             existing_urls, report_every=batch_size, controller=controller,
+                             stop_after_known=known_pages if since_last_run else None,
+                             pages=pages)
+        if saved:
+            crawl.restore(saved)
+        crawls.append(crawl)
+    return crawls
 
 
 def scrape_all_sections(sections=None, start_page=1, max_pages=None, workers=4, 
-                        batch_size=10, batch_delay=2, save_interval=1000, 
-                        output_file=None, fresh=False):
-    """Scrape multiple sections with parallel fetching and incremental saving.
+                        batch_size=10, rate=5.0, max_rate=20.0, max_workers=None,
+                        save_interval=1000, output_file=None, fresh=False,
+                        engine='threads', per_host=None, window=None, store_kind='json',
+                        since_last_run=False, known_pages=2, parse_workers=None,
+                        archive_dir=None, http_cache=None, metrics_dir=None,
+                        metrics_interval=30.0, shard=None, shard_block=DEFAULT_SHARD_BLOCK):
+    """Scrape multiple sections concurrently with incremental saving.
+    
+    All sections share one adaptive RateController, which starts at `workers`
+    concurrent requests and `rate` requests per second and adjusts both from
+    response latency and status codes. Each section keeps up to `window` of
+    its own pages in flight.
+    
+    Each checkpoint also saves the crawl frontier (see checkpoints.py), so
+    an interrupted run resumes where it stopped, redoing at most the pages
+    since the last checkpoint. A finished run removes it.
     
     Args:
+        max_workers: Ceiling for adaptive concurrency (default: 4 * workers)
+        max_rate: Ceiling for adaptive request rate, in requests per second
         sections: List of sections to scrape, or None for all
         save_interval: Save every N new articles (default: 1000)
         fresh: If True, ignore any existing file and start from scratch
+        engine: 'threads' (shared thread pool) or 'async' (one pooled
+            keep-alive client for the whole run)
+        per_host: Max concurrent requests per host for the async engine
+            (default: workers)
+        window: Max in-flight pages per section (default: workers)
+        store_kind: 'json' (default) or 'sqlite'; see store.py
+        since_last_run: Crawl every section from start_page (newest first) and
+            stop once `known_pages` consecutive pages hold only known URLs,
+            instead of resuming after the last scraped page
+        parse_workers: Processes for HTML parsing (default: one per CPU core;
+            0 parses on the download threads); see parsers.py
+        archive_dir: Save every downloaded listing page to this page archive
+            (see archive.py), for re-extraction with --from-archive
+        http_cache: Make listing requests conditional using the HttpCache at
+            this path (see httpcache.py)
+        metrics_dir: Record request, queue wait, parse and save metrics and
+            write them to this directory every `metrics_interval` seconds
+            (see metrics.py)
+        shard: (i, N) to crawl only shard i of N's pages, in blocks of
+            `shard_block` pages per section, into its own store (default:
+            data/headlines.shard-i-of-N.json); see shards.py
     """
     if sections is None:
         sections = SECTIONS
     
-    if output_file is None:
-        data_dir = Path('data')
-        data_dir.mkdir(exist_ok=True)
-        output_file = data_dir / 'headlines.json'
+    pages = None
+    if shard is not None:
+        pages = PageShard(*shard, block=shard_block)
+        output_file = output_file or shard_path(DEFAULT_PATHS[store_kind], shard)
+        print(f"Shard {pages}: pages in blocks of {shard_block}, saved to {output_file}")
+    store = open_store(store_kind, output_file)
     
-    # Load existing articles
+    # Load existing articles; a damaged archive raises CorruptSnapshot
+    # rather than being replaced by an empty one
+    frontier = Frontier(store.path, 'listing')
+    mode = 'since_last_run' if since_last_run else 'resume'
+    resumed = {}
     if fresh:
         print("Starting fresh fetch (ignoring any existing data)...")
-        all_articles = []
+        store.reset()
+        frontier.clear()
     else:
-        all_articles = load_existing_articles(output_file)
-        if all_articles:
-            print(f"Loaded {len(all_articles):,} existing articles")
+        if store.count():
+            print(f"Loaded {store.count():,} existing articles")
+        saved = frontier.load()
+        if saved and saved['mode'] == mode:
+            resumed = saved['sections']
     
-    existing_urls = get_existing_urls(all_articles)
-    initial_count = len(all_articles)
-    articles_since_save = 0
-    total_duplicates = 0
+    existing_urls = store.existing_urls()
+    # URLs the pipeline or optimize.py dropped count as seen, or every page
+    # listing one would look new to --since-last-run
+    for url in load_excluded_urls(excluded_path(store.path)):
+        existing_urls.add(url)
+    initial_count = store.count()
+    unsaved = []
     
-    for section in sections:
-        # Determine starting page for this section
-        if fresh:
-            section_start = start_page
+    max_workers = max_workers or workers * 4
+    controller = RateController(rate=rate, max_rate=max_rate,
+                                concurrency=workers, max_concurrency=max_workers)
+    
+    crawls = section_crawls(store, sections, start_page, max_pages, window or workers,
+                            existing_urls, batch_size, controller, fresh, since_last_run,
+                            known_pages, resumed, pages)
+    
+    def save_frontier():
+        # Called right after a checkpoint, when every processed page is stored
+        state = {**resumed, **{c.section: c.frontier() for c in crawls}}
+        if all(s['done'] for s in state.values()):
+            frontier.clear()
         else:
-            last_page = get_last_scraped_page(all_articles, section)
-            section_start = max(start_page, last_page + 1) if last_page > 0 else start_page
-        
-        new_articles, dupes, last_page = scrape_section(
-            section=section,
-            start_page=section_start,
-            max_pages=max_pages,
-            workers=workers,
-            batch_size=batch_size,
-            batch_delay=batch_delay,
-            existing_urls=existing_urls,
-        )
-        
-        total_duplicates += dupes
-        
-        if new_articles:
-            all_articles.extend(new_articles)
-            articles_since_save += len(new_articles)
+            frontier.save({'mode': mode, 'sections': state})
+    
+    def save_progress(articles):
+        with timed(metrics, 'save_seconds', stage='listing'):
+            store.add(articles)
+            store.checkpoint()
+            save_frontier()
+        if archive is not None:
+            archive.flush()
+        if cache:
+            cache.flush()
+    
+    parse_pool = parsers.parse_pool(parse_workers)
+    archive = PageArchive(archive_dir) if archive_dir else None
+    cache = HttpCache(http_cache) if http_cache else None
+    metrics = Metrics() if metrics_dir else None
+    writer = MetricsWriter(metrics, metrics_dir, 'fetch', metrics_interval) if metrics else None
+    if engine == 'async':
+        from fetch_async import AsyncEngine
+        crawler = AsyncEngine(per_host=per_host or max_workers)
+        events = crawler.crawl(crawls, max_workers, controller, parse_pool, archive, cache,
+                               metrics)
+    else:
+        crawler = None
+        events = crawl_sections(crawls, max_workers, controller, parse_pool, archive, cache,
+                                metrics)
+    
+    finished = set()
+    failed = 0
+    try:
+        for crawl, new_articles in events:
+            # Pages that failed after every retry go to the dead-letter queue
+            while crawl.failures:
+                page_num, failure = crawl.failures.pop(0)
+                store.record_failure('listing', failure.url, failure.error, failure.attempts,
+                                     section=crawl.section, page=page_num)
+                failed += 1
             
-            # Save periodically
-            if articles_since_save >= save_interval:
-                print(f"Saving progress ({len(all_articles):,} articles)...")
-                save_articles(all_articles, output_file)
-                articles_since_save = 0
-        
-        print(f"[{section}] Complete: {len(new_articles):,} new, {dupes:,} duplicates skipped\n")
+            if new_articles:
+                unsaved.extend(new_articles)
+                
+                # Save periodically (writes only the new articles)
+                if len(unsaved) >= save_interval:
+                    if crawler is not None:
+                        # Requests in flight keep going on the event loop meanwhile
+                        crawler.run_blocking(save_progress, unsaved)
+                    else:
+                        save_progress(unsaved)
+                    unsaved = []
+                    print(f"Saved progress ({store.count():,} articles)")
+            
+            if crawl.stopped and crawl.section not in finished:
+                finished.add(crawl.section)
+                print(f"[{crawl.section}] Complete: {len(crawl.new_articles):,} new, "
+                      f"{crawl.duplicates:,} duplicates skipped")
+    finally:
+        if crawler is not None:
+            crawler.close()
+        if parse_pool is not None:
+            parse_pool.shutdown(cancel_futures=True)
+        if archive is not None:
+            archive.close()
+        if cache is not None:
+            cache_stats = cache.stats()
+            cache.close()
+    
+    total_duplicates = sum(c.duplicates for c in crawls)
     
     # Final save
-    save_articles(all_articles, output_file)
+    with timed(metrics, 'save_seconds', stage='listing'):
+        store.add(unsaved)
+        total = store.count()
+        store.close()
+        save_frontier()
     
-    new_total = len(all_articles) - initial_count
-    print(f"Done! Added {new_total:,} new articles ({len(all_articles):,} total)")
+    new_total = total - initial_count
+    print(f"\nDone! Added {new_total:,} new articles ({total:,} total)")
     print(f"Skipped {total_duplicates:,} duplicates (sidebar/cross-section overlap)")
-    print(f"Saved to {output_file}")
+    if failed:
+        print(f"{failed:,} pages failed after retries; rerun with --retry-failed to fetch them")
+    print(f"Final rate: {controller.status()} "
+          f"({controller.throttled:,} throttled, {controller.errors:,} errors)")
+    if cache:
+        print(f"HTTP cache: {cache_stats['hits']:,} pages not modified")
+    print(f"Saved to {store.path}")
+    if writer is not None:
+        writer.close()
+
+
+def extract_from_archive(archive_dir=None, output_file=None, store_kind='json', parse_workers=None):
+    """Re-run listing extraction over archived pages, without the network.
+    
+    Pages are parsed in parallel in a parse pool and processed in section and
+    page order; the first listing a URL appears on wins, as in a crawl.
+    Stored articles are updated with the re-extracted fields (dates are kept)
+    and articles not yet stored are added.
+    """
+    archive = PageArchive(archive_dir or DEFAULT_ARCHIVE)
+    order = {section: i for i, section in enumerate(SECTIONS)}
+    entries = sorted(archive.entries('listing'),
+                     key=lambda e: (order.get(e['section'], len(order)), e['section'], e['page']))
+    if not entries:
+        print(f"No listing pages in {archive.path}")
+        return
+    print(f"Re-extracting {len(entries):,} listing pages from {archive.path}...")
+    
+    parse = partial(parse_archived_listing, root=archive.path)
+    parse_pool = parsers.parse_pool(parse_workers)
+    try:
+        if parse_pool is None:
+            pages = map(parse, entries)
+        else:
+            pages = parse_pool.map(parse, entries, chunksize=32)
+        extracted = {}
+        for page_articles in pages:
+            for a in page_articles:
+                extracted.setdefault(a['url'], a)
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown()
+    
+    store = open_store(store_kind, output_file)
+    articles = store.articles
+    by_url = {a.get('url'): a for a in articles}
+    added = updated = 0
+    for url, article in extracted.items():
+        existing = by_url.get(url)
+        if existing is None:
+            articles.append(article)
+            added += 1
+        elif any(existing.get(k) != v for k, v in article.items()):
+            existing.update(article)
+            updated += 1
+    store.replace_all(articles)
+    store.close()
+    
+    print(f"\nExtracted {len(extracted):,} articles: {added:,} new, {updated:,} updated")
+    print(f"Saved to {store.path}")
+
+
+def retry_failed_pages(workers=4, rate=5.0, max_rate=20.0, output_file=None, store_kind='json'):
+    """Re-fetch only the listing pages in the dead-letter queue.
+    
+    Pages that succeed are removed from the queue and their new articles
+    saved; pages that fail again stay queued with their attempts added up.
+    """
+    store = open_store(store_kind, output_file)
+    failures = store.failures('listing')
+    if not failures:
+        print("No failed pages to retry")
+        store.close()
+        return
+    
+    print(f"Retrying {len(failures):,} failed pages...")
+    existing_urls = store.existing_urls()
+    controller = RateController(rate=rate, max_rate=max_rate,
+                                concurrency=workers, max_concurrency=workers)
+    
+    def fetch(failure):
+        controller.acquire()
+        try:
+            return scrape_page(failure['section'], failure['page'], controller)
+        finally:
+            controller.release()
+    
+    recovered = added = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch, f): f for f in failures}
+        for future in futures:
+            failure = futures[future]
+            try:
+                articles = future.result()
+            except FetchFailed as e:
+                store.record_failure('listing', failure['url'], e.error, e.attempts,
+                                     section=failure['section'], page=failure['page'])
+                continue
+            
+            new_articles = [a for a in articles if a.get('url') not in existing_urls]
+            for a in new_articles:
+                existing_urls.add(a.get('url'))
+            store.add(new_articles)
+            store.resolve_failure('listing', failure['url'])
+            recovered += 1
+            added += len(new_articles)
+            print(f"[{failure['section']}] Page {failure['page']}: +{len(new_articles):,} articles")
+    
+    store.close()
+    print(f"\nRecovered {recovered:,}/{len(failures):,} pages, added {added:,} new articles")
+    if recovered < len(failures):
+        print(f"{len(failures) - recovered:,} pages still failing")
 
 
 if __name__ == "__main__":
@@ -267,20 +808,76 @@ if __name__ == "__main__":
                         help=f'Section to scrape: {", ".join(SECTIONS)}, or "all" (default: all)')
     parser.add_argument('--fresh', action='store_true', 
                         help='Start fresh, ignoring any existing data file')
+    parser.add_argument('--since-last-run', action='store_true',
+                        help='Catch up on new headlines: crawl from the first page and stop '
+                             'each section once it reaches pages that are already stored')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='Only re-fetch listing pages that failed after retries in '
+                             'earlier runs (the dead-letter queue)')
+    parser.add_argument('--known-pages', type=int, default=2,
+                        help='With --since-last-run, stop after this many consecutive pages '
+                             'with no new articles (default: 2)')
     parser.add_argument('--start-page', type=int, default=1, 
                         help='Starting page number (default: 1)')
     parser.add_argument('--max-pages', type=int, default=None, 
                         help='Maximum pages per section')
     parser.add_argument('--workers', type=int, default=4, 
-                        help='Number of parallel workers (default: 4)')
+                        help='Starting number of in-flight requests (default: 4)')
+    parser.add_argument('--max-workers', type=int, default=None,
+                        help='Ceiling for adaptive concurrency (default: 4x --workers)')
+    parser.add_argument('--rate', type=float, default=5.0,
+                        help='Starting request rate in requests/sec (default: 5)')
+    parser.add_argument('--max-rate', type=float, default=20.0,
+                        help='Ceiling for adaptive request rate (default: 20)')
+    parser.add_argument('--window', type=int, default=None,
+                        help='Max in-flight pages per section (default: same as --workers)')
     parser.add_argument('--batch-size', type=int, default=10, 
-                        help='Pages per batch (default: 10)')
-    parser.add_argument('--batch-delay', type=float, default=2, 
-                        help='Delay between batches in seconds (default: 2)')
+                        help='Pages per progress line (default: 10)')
     parser.add_argument('--save-interval', type=int, default=1000, 
                         help='Save every N new articles (default: 1000)')
     parser.add_argument('--output', type=str, default=None, 
-                        help='Output file path (default: data/headlines.json)')
+                        help='Output file path (default: data/headlines.json, '
+                             'data/headlines.parquet or data/headlines.db, by --store)')
+    parser.add_argument('--store', choices=STORES, default='json',
+                        help='Article store backend (default: json; parquet needs pyarrow)')
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads',
+                        help='Fetch engine: shared thread pool, or asyncio with one '
+                             'pooled keep-alive client (default: threads)')
+    parser.add_argument('--per-host', type=int, default=None,
+                        help='Max concurrent requests per host for --engine async '
+                             '(default: same as --workers)')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Processes for HTML parsing (default: one per CPU core; '
+                             '0 parses on the download threads)')
+    parser.add_argument('--parser', choices=parsers.PARSERS, default=parsers.DEFAULT_PARSER,
+                        help=f'BeautifulSoup backend (default: {parsers.DEFAULT_PARSER})')
+    parser.add_argument('--archive', type=Path, nargs='?', const=DEFAULT_ARCHIVE, default=None,
+                        help='Save downloaded listing pages to a compressed page archive '
+                             f'(default directory: {DEFAULT_ARCHIVE})')
+    parser.add_argument('--from-archive', type=Path, nargs='?', const=DEFAULT_ARCHIVE, default=None,
+                        help='Re-extract articles from archived listing pages instead of '
+                             f'fetching (default directory: {DEFAULT_ARCHIVE})')
+    parser.add_argument('--http-cache', type=Path, nargs='?', const=DEFAULT_HTTP_CACHE,
+                        default=None,
+                        help='Revalidate listing pages with ETag/Last-Modified and reuse '
+                             f'the stored articles on a 304 (default file: {DEFAULT_HTTP_CACHE})')
+    parser.add_argument('--metrics', type=Path, nargs='?', const=DEFAULT_METRICS, default=None,
+                        help='Record request latency, queue wait, parse and save times, status '
+                             'codes, retries and bytes, and write JSON and Prometheus snapshots '
+                             f'(default directory: {DEFAULT_METRICS})')
+    parser.add_argument('--metrics-interval', type=float, default=30.0,
+                        help='Seconds between metrics snapshots (default: 30)')
+    parser.add_argument('--profile', type=Path, nargs='?', const=DEFAULT_PROFILE_DIR,
+                        default=None,
+                        help='Run under cProfile and tracemalloc and write the reports '
+                             f'(default directory: {DEFAULT_PROFILE_DIR})')
+    parser.add_argument('--shard', type=str, default=None, metavar='I/N',
+                        help='Crawl only shard I of N\'s listing pages, into its own store '
+                             '(default: data/headlines.shard-I-of-N.json); combine the shards '
+                             'with main.py merge')
+    parser.add_argument('--shard-block', type=int, default=DEFAULT_SHARD_BLOCK,
+                        help='Consecutive pages per shard, dealt round-robin '
+                             f'(default: {DEFAULT_SHARD_BLOCK})')
     
     args = parser.parse_args()
     
@@ -292,16 +889,61 @@ if __name__ == "__main__":
     else:
         parser.error(f"Invalid section: {args.section}. Choose from: {', '.join(SECTIONS)}, or 'all'")
     
+    if args.fresh and args.since_last_run:
+        parser.error("--fresh and --since-last-run cannot be combined")
+    
     output_file = Path(args.output) if args.output else None
     
-    scrape_all_sections(
-        sections=sections,
-        start_page=args.start_page,
-        max_pages=args.max_pages,
-        workers=args.workers,
-        batch_size=args.batch_size,
-        batch_delay=args.batch_delay,
-        save_interval=args.save_interval,
-        output_file=output_file,
-        fresh=args.fresh
-    )
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.from_archive:
+            parser.error("--shard and --from-archive cannot be combined")
+        if args.shard_block < 1:
+            parser.error("--shard-block must be at least 1")
+        # The shard's dead-letter queue lives in its own store too
+        output_file = output_file or shard_path(DEFAULT_PATHS[args.store], shard)
+    
+    try:
+        parsers.use_parser(args.parser)
+        check_store(args.store)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    with profiled(args.profile, 'fetch'):
+        if args.from_archive:
+            extract_from_archive(args.from_archive, output_file=output_file,
+                                 store_kind=args.store, parse_workers=args.parse_workers)
+        elif args.retry_failed:
+            retry_failed_pages(workers=args.workers, rate=args.rate, max_rate=args.max_rate,
+                               output_file=output_file, store_kind=args.store)
+        else:
+            scrape_all_sections(
+                sections=sections,
+                start_page=args.start_page,
+                max_pages=args.max_pages,
+                workers=args.workers,
+                batch_size=args.batch_size,
+                rate=args.rate,
+                max_rate=args.max_rate,
+                max_workers=args.max_workers,
+                save_interval=args.save_interval,
+                output_file=output_file,
+                fresh=args.fresh,
+                engine=args.engine,
+                per_host=args.per_host,
+                window=args.window,
+                store_kind=args.store,
+                since_last_run=args.since_last_run,
+                known_pages=args.known_pages,
+                parse_workers=args.parse_workers,
+                archive_dir=args.archive,
+                http_cache=args.http_cache,
+                metrics_dir=args.metrics,
+                metrics_interval=args.metrics_interval,
+                shard=shard,
+                shard_block=args.shard_block,
+            )
@@ -0,0 +1,226 @@
+"""
+Asyncio fetch engine for fetch.py.
+
+One pooled httpx.AsyncClient is shared by every section in a run, so listing
+pages reuse keep-alive connections instead of opening a new TLS connection per
+request. Concurrency is capped per host.
+
+Usage:
+    uv run python fetch.py --engine async --per-host 8
+"""
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from fetch import WindowScheduler, listing_url, parse_listing
+from metrics import timed
+from ratelimit import MAX_ATTEMPTS, FetchFailed, backoff_delay, is_retryable
+
+
+class AsyncEngine:
+    """Owns an event loop and a pooled HTTP client for the length of a crawl.
+
+    `crawl` drives the same SectionCrawl/WindowScheduler state as
+    `fetch.crawl_sections`, so both engines produce identical articles.
+    """
+
+    def __init__(self, per_host=4, timeout=10):
+        self.per_host = per_host
+        self._runner = asyncio.Runner()
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=per_host * 4,
+                keepalive_expiry=30,
+            ),
+        )
+        self._host_slots = {}
+
+    def _slot(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self._host_slots[host]
+
+    async def scrape_page(self, section, page_num, controller=None, attempts=MAX_ATTEMPTS,
+                          archive=None, cache=None, metrics=None):
+        """Async equivalent of fetch.scrape_page: download, then parse in the loop."""
+        html = await self.fetch_listing(section, page_num, controller, attempts, archive, cache,
+                                        metrics)
+        if not html:
+            return []
+        if isinstance(html, list):
+            return html
+        try:
+            with timed(metrics, 'parse_seconds', stage='listing', section=section):
+                articles = parse_listing(html, section, page_num)
+        except Exception as e:
+            print(f"  Error parsing {section} page {page_num}: {e}")
+            return []
+        if cache and articles:
+            cache.set_result(listing_url(section, page_num), articles)
+        return articles
+
+    async def fetch_listing(self, section, page_num, controller=None, attempts=MAX_ATTEMPTS,
+                            archive=None, cache=None, metrics=None):
+        """Async equivalent of fetch.fetch_listing, with the same retries.
+
+        The queue wait recorded in `metrics` is the wait for a per-host slot.
+        """
+        url = listing_url(section, page_num)
+        for attempt in range(1, attempts + 1):
+            status = retry_after = None
+            try:
+                queued_at = time.monotonic()
+                async with self._slot(url):
+                    start = time.monotonic()
+                    if metrics:
+                        metrics.observe('queue_wait_seconds', start - queued_at,
+                                        stage='listing', section=section)
+                    response = await self._client.get(
+                        url, headers=cache.headers(url) if cache else None)
+                status, retry_after = response.status_code, response.headers.get('Retry-After')
+                latency = time.monotonic() - start
+                if controller:
+                    controller.on_response(status, latency, retry_after)
+                if metrics:
+                    metrics.response('listing', section, status, latency, len(response.content))
+                if status == 404:
+                    return None
+                if status == 304:
+                    articles = cache.result(url) if cache else None
+                    if articles is None:
+                        raise httpx.HTTPStatusError('304 Not Modified without a cached result',
+                                                    request=response.request, response=response)
+                    return articles
+                response.raise_for_status()
+                if cache:
+                    cache.put(url, response.headers)
+                if archive is not None:
+                    archive.put(url, 'listing', response.text, section=section, page=page_num)
+                return response.text
+            except httpx.HTTPStatusError as e:
+                error = e
+            except httpx.HTTPError as e:
+                if controller:
+                    controller.on_error()
+                if metrics:
+                    metrics.error('listing', section)
+                error = e
+
+            if not is_retryable(status) or attempt == attempts:
+                print(f"  Error fetching {section} page {page_num}: {error}")
+                raise FetchFailed(url, error, attempt, status)
+            if metrics:
+                metrics.count('retries_total', stage='listing', section=section)
+            delay = backoff_delay(attempt, retry_after)
+            print(f"  Retrying {section} page {page_num} in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{attempts}): {error}")
+            await asyncio.sleep(delay)
+
+    async def _crawl(self, crawls, workers, controller, parse_pool=None, archive=None,
+                     cache=None, metrics=None):
+        scheduler = WindowScheduler(crawls, workers, controller)
+        pending = {}  # task -> (crawl, page_num), for downloads and parses
+        parsing = {}  # parse task -> time it was submitted
+        download = self.fetch_listing if parse_pool else self.scrape_page
+
+        while True:
+            ready, wait_for = scheduler.launches(len(pending))
+            for crawl, page_num in ready:
+                task = asyncio.create_task(
+                    download(crawl.section, page_num, controller, archive=archive, cache=cache,
+                             metrics=metrics))
+                pending[task] = (crawl, page_num)
+
+            if not pending:
+                if wait_for is None:
+                    break
+                await asyncio.sleep(wait_for)
+                continue
+
+            done, _ = await asyncio.wait(pending, timeout=wait_for,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task not in pending:
+                    # Already discarded when its section stopped earlier in this batch
+                    if not task.cancelled():
+                        task.exception()  # so a FetchFailed isn't logged as unretrieved
+                    continue
+                crawl, page_num = pending.pop(task)
+                parsed = task in parsing
+                if parsed:
+                    submitted = parsing.pop(task)
+                    if metrics:
+                        metrics.observe('parse_seconds', time.monotonic() - submitted,
+                                        stage='listing', section=crawl.section)
+                elif controller:
+                    controller.release()
+                try:
+                    result = task.result()
+                except FetchFailed as e:
+                    yield crawl, crawl.fail(page_num, e)
+                    continue
+                except Exception as e:
+                    print(f"  Error on {crawl.section} page {page_num}: {e}")
+                    result = []
+
+                if parse_pool and not parsed and not isinstance(result, list):
+                    if result and not crawl.stopped:
+                        # Downloaded HTML: parse it in the pool
+                        task = asyncio.ensure_future(asyncio.wrap_future(
+                            parse_pool.submit(parse_listing, result, crawl.section, page_num)))
+                        pending[task] = (crawl, page_num)
+                        parsing[task] = time.monotonic()
+                        continue
+                    result = []
+                elif parsed and cache and result:
+                    cache.set_result(listing_url(crawl.section, page_num), result)
+                yield crawl, crawl.complete(page_num, result)
+                if crawl.stopped:
+                    # Pages past the end of the section are not needed
+                    for other, (c, p) in list(pending.items()):
+                        if c is crawl:
+                            other.cancel()
+                            del pending[other]
+                            if other in parsing:
+                                del parsing[other]
+                            elif controller:
+                                controller.release()
+                            c.complete(p, [])
+
+    def crawl(self, crawls, workers=4, controller=None, parse_pool=None, archive=None,
+              cache=None, metrics=None):
+        """Async counterpart of fetch.crawl_sections, usable from sync code.
+
+        Yields (crawl, new_articles) each time a page completes. With a
+        parse_pool, pages are parsed there instead of on the event loop;
+        with an archive, downloaded pages are saved to it; with a cache,
+        requests are conditional; with metrics, timings are recorded.
+        """
+        events = self._crawl(crawls, workers, controller, parse_pool, archive, cache, metrics)
+        try:
+            while True:
+                try:
+                    yield self._runner.run(events.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._runner.run(events.aclose())
+
+    def run_blocking(self, fn, *args):
+        """Call fn(*args) on a worker thread while the event loop keeps serving
+        the requests in flight, and return its result.
+
+        For work between `crawl` events, like saving the store: the crawl
+        itself is paused, so no pages are processed meanwhile.
+        """
+        return self._runner.run(asyncio.to_thread(fn, *args))
+
+    def close(self):
+        self._runner.run(self._client.aclose())
+        self._runner.close()
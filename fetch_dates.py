@@ -1,38 +1,201 @@
 import requests
-from bs4 import BeautifulSoup
-import json
 import time
+import re
+import html
+import argparse
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from itertools import islice
 from threading import Lock
 
-def extract_date_from_url(url):
-    """Extract date from an article URL."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    }
-    try:
-        response = requests.get(url, timeout=10, headers=headers)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+import parsers
+from archive import DEFAULT_PATH as DEFAULT_ARCHIVE, PageArchive, read_bytes
+from checkpoints import Frontier
+from httpcache import DEFAULT_PATH as DEFAULT_HTTP_CACHE, HttpCache
+from metrics import (DEFAULT_DIR as DEFAULT_METRICS, DEFAULT_PROFILE_DIR, Metrics, MetricsWriter,
+                     profiled, queued, timed)
+from sitemaps import DEFAULT_SITEMAP, discover_dates, url_key
+from ratelimit import MAX_ATTEMPTS, FetchFailed, RateController, backoff_delay, is_retryable
+from shards import parse_shard, shard_path, url_shard
+from store import STORES, check_store, open_store
+
+# First <time datetime="..."> tag, matched only once the whole tag has arrived
+TIME_TAG_RE = re.compile(
+    rb'<time\b[^>]*?\sdatetime\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))[^>]*>', re.I)
+META_TAG_RE = re.compile(rb'<meta\b[^>]*article:published_time[^>]*>', re.I)
+META_CONTENT_RE = re.compile(rb'\scontent\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.I)
+
+CHUNK_SIZE = 16 * 1024
+
+
+def _attr_value(match):
+    value = next(g for g in match.groups() if g is not None)
+    return html.unescape(value.decode('utf-8', errors='replace')).strip()
+
+
+def scan_for_date(chunks):
+    """Scan HTML chunks for the first <time datetime> tag, stopping as soon as it is found.
+    
+    An `article:published_time` meta tag is remembered along the way and used
+    if the page has no <time> tag.
+    
+    Returns:
+        tuple: (date or None, bytes read so far)
+    """
+    buffer = bytearray()
+    scan_from = 0
+    meta_date = None
+    
+    for chunk in chunks:
+        buffer += chunk
         
-        # Look for time element with datetime attribute
-        time_elem = soup.find('time', {'datetime': True})
-        if time_elem:
-            datetime_attr = time_elem.get('datetime', '')
-            return datetime_attr
+        if meta_date is None:
+            meta = META_TAG_RE.search(buffer, scan_from)
+            if meta:
+                content = META_CONTENT_RE.search(meta.group(0))
+                if content and _attr_value(content):
+                    meta_date = _attr_value(content)
         
-        return None
+        for match in TIME_TAG_RE.finditer(buffer, scan_from):
+            if _attr_value(match):
+                return _attr_value(match), bytes(buffer)
+        
+        # Complete tags have been checked; only a tag cut off by the end of
+        # this chunk needs to be scanned again
+        last_open = buffer.rfind(b'<', scan_from)
+        if last_open != -1 and buffer.find(b'>', last_open) == -1:
+            scan_from = last_open
+        else:
+            scan_from = len(buffer)
     
-    except requests.RequestException as e:
-        print(f"  Error fetching {url}: {e}")
-        return None
+    return meta_date, bytes(buffer)
+
+
+def parse_date(html_text):
+    """Extract the date from a fully downloaded article page."""
+    soup = parsers.make_soup(html_text)
+    
+    # Look for time element with datetime attribute
+    time_elem = soup.find('time', {'datetime': True})
+    if time_elem:
+        datetime_attr = time_elem.get('datetime', '')
+        return datetime_attr
+    
+    meta = soup.find('meta', {'property': 'article:published_time'})
+    if meta:
+        return meta.get('content') or None
+    
+    return None
+
+
+def date_from_html(body, encoding='utf-8'):
+    """Extract the date from a complete article page given as bytes."""
+    date, _ = scan_for_date([body])
+    if date:
+        return date
+    return parse_date(body.decode(encoding, errors='replace'))
+
+
+def date_from_archive(entry, root=DEFAULT_ARCHIVE):
+    """Extract the date from an archived article page (see archive.py), for --from-archive."""
+    try:
+        return date_from_html(read_bytes(entry, root), entry.get('encoding') or 'utf-8')
     except Exception as e:
-        print(f"  Error parsing {url}: {e}")
+        print(f"  Error parsing {entry['url']}: {e}")
         return None
 
-def process_article(article, url_to_index, lock, save_counter, save_interval, all_articles, output_file, found_counter):
-    """Process a single article to fetch its date."""
+
+def extract_date_from_url(url, controller=None, attempts=MAX_ATTEMPTS, parse_pool=None,
+                          archive=None, cache=None, metrics=None, section=None):
+    """Extract date from an article URL.
+    
+    The page is streamed and the connection closed as soon as a date tag has
+    been read; the full BeautifulSoup parse only runs when the scan misses.
+    With a parse_pool (see parsers.py) that parse runs in the pool, and the
+    calling thread waits for it without holding the GIL.
+    
+    With a PageArchive the whole page is downloaded and saved to it, so the
+    early stop is given up. With an HttpCache the request is conditional, and
+    a 304 returns the date found last time without reading the page.
+    
+    Timeouts, connection errors, 429s and 5xx responses are retried with
+    backoff. Raises FetchFailed if the page still can't be fetched (or
+    returns another error status); returns None if it has no date.
+    
+    If a RateController is given, the response status and latency are
+    reported to it. With `metrics`, requests (until the last byte read),
+    status codes, bytes, retries and the fallback parse are recorded under
+    the article's `section`.
+    """
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+    }
+    for attempt in range(1, attempts + 1):
+        status = retry_after = None
+        try:
+            start = time.monotonic()
+            request_headers = {**headers, **cache.headers(url)} if cache else headers
+            with requests.get(url, timeout=10, headers=request_headers, stream=True) as response:
+                status, retry_after = response.status_code, response.headers.get('Retry-After')
+                latency = time.monotonic() - start
+                if controller:
+                    controller.on_response(status, latency, retry_after)
+                if metrics and (status == 304 or not response.ok):
+                    metrics.response('date', section, status, latency, 0)
+                if status == 304:
+                    date = cache.result(url) if cache else None
+                    if date is None:
+                        raise requests.HTTPError('304 Not Modified without a cached result',
+                                                 response=response)
+                    return date
+                response.raise_for_status()
+                chunks = response.iter_content(CHUNK_SIZE)
+                date, body = scan_for_date(chunks)
+                encoding = response.encoding or 'utf-8'
+                if archive is not None:
+                    body += b''.join(chunks)
+                    archive.put(url, 'article', body, encoding)
+                if metrics:
+                    metrics.response('date', section, status, time.monotonic() - start, len(body))
+            
+            if not date:
+                text = body.decode(encoding, errors='replace')
+                with timed(metrics, 'parse_seconds', stage='date', section=section):
+                    if parse_pool:
+                        date = parse_pool.submit(parse_date, text).result()
+                    else:
+                        date = parse_date(text)
+            if cache and date:
+                cache.put(url, response.headers, date)
+            return date
+        
+        except requests.RequestException as e:
+            if e.response is None:
+                if controller:
+                    controller.on_error()
+                if metrics:
+                    metrics.error('date', section)
+            error = e
+        except Exception as e:
+            print(f"  Error parsing {url}: {e}")
+            return None
+        
+        if not is_retryable(status) or attempt == attempts:
+            print(f"  Error fetching {url}: {error}")
+            raise FetchFailed(url, error, attempt, status)
+        if metrics:
+            metrics.count('retries_total', stage='date', section=section)
+        time.sleep(backoff_delay(attempt, retry_after))
+
+def process_article(article, lock, save_counter, save_interval, store, found_counter, controller=None,
+                    parse_pool=None, archive=None, cache=None, metrics=None):
+    """Process a single article to fetch its date.
+    
+    Found dates are written to the store; every `save_interval` dates the
+    store is checkpointed. Articles whose page can't be fetched go to the
+    store's dead-letter queue.
+    """
     url = article.get('url')
     
     # Skip if already has a date
@@ -43,17 +206,21 @@ def process_article(article, url_to_index, lock, save_counter, save_interval, al
         print(f"  No URL for article")
         return None
     
-    date = extract_date_from_url(url)
+    try:
+        date = extract_date_from_url(url, controller, parse_pool=parse_pool, archive=archive,
+                                     cache=cache, metrics=metrics, section=article.get('section'))
+    except FetchFailed as e:
+        with lock:
+            store.record_failure('date', url, e.error, e.attempts)
+        return None
     
     if date:
         with lock:
-            # Update the article using index lookup (faster and thread-safe)
-            idx = url_to_index.get(url)
-            if idx is not None:
-                all_articles[idx]['date'] = date
-                print(f"  ✓ Found date for idx {idx}: {date[:10]}")
+            store.resolve_failure('date', url)
+            if store.set_date(url, date):
+                print(f"  ✓ Found date: {date[:10]} {url[:50]}")
             else:
-                print(f"  ✗ URL not in index: {url[:50]}")
+                print(f"  ✗ URL not in store: {url[:50]}")
             
             save_counter[0] += 1
             found_counter[0] += 1
@@ -61,7 +228,12 @@ def process_article(article, url_to_index, lock, save_counter, save_interval, al
             # Incremental save
             if save_counter[0] % save_interval == 0:
                 print(f"Saving progress ({save_counter[0]} dates fetched)...")
-                save_articles(all_articles, output_file)
+                with timed(metrics, 'save_seconds', stage='date'):
+                    store.checkpoint()
+                if archive is not None:
+                    archive.flush()
+                if cache:
+                    cache.flush()
         
         return date
     else:
@@ -69,118 +241,407 @@ def process_article(article, url_to_index, lock, save_counter, save_interval, al
     
     return None
 
-def save_articles(articles, output_file):
-    """Save articles to JSON file."""
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(articles, f, indent=2, ensure_ascii=False)
+def fill_dates_from_sitemaps(store, sources, workers=4, rate=5.0, max_rate=20.0,
+                             use_lastmod=False):
+    """Fill in dates for undated articles from sitemaps, in bulk (see sitemaps.py).
+    
+    Returns the number of dates filled; the remaining undated articles still
+    need their pages fetched.
+    """
+    undated = {url_key(a['url']): a['url'] for a in store.undated() if a.get('url')}
+    if not undated:
+        return 0
+    
+    print(f"Reading sitemaps for {len(undated):,} undated articles...")
+    controller = RateController(rate=rate, max_rate=max_rate,
+                                concurrency=workers, max_concurrency=workers)
+    dates = discover_dates(sources, workers, controller, wanted=set(undated),
+                           use_lastmod=use_lastmod)
+    for key, date in dates.items():
+        store.set_date(undated[key], date)
+        store.resolve_failure('date', undated[key])
+    store.checkpoint()
+    print(f"Filled {len(dates):,} dates from sitemaps; "
+          f"{len(undated) - len(dates):,} articles left to fetch")
+    return len(dates)
+
 
-def fetch_dates_for_articles(input_file=None, output_file=None, max_workers=10, save_interval=100, delay=0.1, max_articles=None):
+def fetch_dates_for_articles(input_file=None, output_file=None, workers=10, max_workers=50, save_interval=100,
+                             rate=20.0, max_rate=100.0, max_articles=None, store_kind='json',
+                             retry_failed=False, parse_workers=None, archive_dir=None,
+                             http_cache=None, sitemaps=None, use_lastmod=False,
+                             skip_urls=None, metrics_dir=None, metrics_interval=30.0,
+                             shard=None):
     """Fetch dates for all articles using concurrent requests.
     
+    Requests are paced by an adaptive RateController that starts at `workers`
+    concurrent requests and `rate` requests per second, and adjusts both from
+    response latency and status codes.
+    
+    Every `save_interval` articles the frontier is saved (see checkpoints.py):
+    the URLs in flight, and those tried in this run that are still undated
+    (no date on the page, or failed). An interrupted run skips the tried ones
+    when it is resumed and starts again with the ones that were in flight,
+    so at most one interval of work is redone. A finished run removes it.
+    
     Args:
-        input_file: Path to input JSON file (default: data/headlines.json)
-        output_file: Path to output JSON file (default: same as input_file)
-        max_workers: Number of concurrent requests
+        input_file: Path to input store (default: data/headlines.json,
+            data/headlines.parquet or data/headlines.db, by store_kind)
+        output_file: Path to output store (default: same as input_file)
+        workers: Starting number of concurrent requests
+        max_workers: Ceiling for adaptive concurrency
         save_interval: Save progress every N articles processed
-        delay: Delay between requests (seconds)
+        rate: Starting request rate (requests/sec)
+        max_rate: Ceiling for adaptive request rate (requests/sec)
         max_articles: Limit number of articles to process (for testing)
+        store_kind: 'json' (default) or 'sqlite'; see store.py
+        retry_failed: Only process articles in the dead-letter queue (pages
+            that failed after retries in earlier runs)
+        parse_workers: Processes for parsing pages the date scan misses
+            (default: one per CPU core; 0 parses on the download threads)
+        archive_dir: Save every downloaded article page to this page archive
+            (see archive.py), for re-extraction with --from-archive
+        http_cache: Make article requests conditional using the HttpCache at
+            this path (see httpcache.py)
+        sitemaps: Sitemap URLs or files to fill dates from in bulk first; only
+            articles they don't cover are fetched (see sitemaps.py)
+        use_lastmod: Fall back to a sitemap's <lastmod> for entries without
+            a <news:publication_date>
+        skip_urls: Leave undated articles with these URLs alone (main.py
+            update passes the ones no date was found for last time)
+        metrics_dir: Record request, queue wait, parse and save metrics and
+            write them to this directory every `metrics_interval` seconds
+            (see metrics.py)
+        shard: (i, N) to date only the undated articles whose URLs hash to
+            shard i of N, in a store of their own (output_file, default:
+            data/headlines.shard-i-of-N.json); the input store is only read.
+            See shards.py
     """
-    if input_file is None:
-        input_file = Path('data') / 'headlines.json'
-    else:
-        input_file = Path(input_file)
+    # Load articles (for json, snapshot plus any changes logged by an interrupted run)
+    store = open_store(store_kind, input_file)
+    print(f"Loading articles from {store.path}...")
     
-    if output_file is None:
-        output_file = input_file
-    else:
-        output_file = Path(output_file)
+    if shard is not None:
+        index, count = shard
+        shard_store = open_store(store_kind, output_file or shard_path(store.path, shard))
+        known = shard_store.existing_urls()
+        share = [a for a in store.undated()
+                 if a.get('url') not in known and url_shard(a.get('url') or '', count) == index]
+        shard_store.add(share)
+        shard_store.checkpoint()
+        print(f"Shard {index}/{count}: {len(share):,} undated articles copied to "
+              f"{shard_store.path} ({shard_store.count():,} in total)")
+        # Other shards may be reading the input store; closing a json or
+        # parquet store can rewrite its snapshot, so only sqlite is closed
+        if store.kind == 'sqlite':
+            store.close()
+        store = shard_store
+    elif output_file is not None and Path(output_file) != store.path:
+        # Dates are written to the output store, so it starts as a copy of the input
+        output_store = open_store(store_kind, output_file)
+        output_store.replace_all(store.articles)
+        store.close()
+        store = output_store
     
-    # Load articles
-    print(f"Loading articles from {input_file}...")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        articles = json.load(f)
+    if sitemaps:
+        fill_dates_from_sitemaps(store, sitemaps, workers, rate, max_rate, use_lastmod)
     
-    # Filter articles that need dates
-    articles_needing_dates = [a for a in articles if not a.get('date')]
+    frontier = None if retry_failed else Frontier(store.path, 'dates')
+    saved = frontier.load() if frontier else None
+    tried = set(saved['tried']) if saved else set()
+    if saved:
+        print(f"Resuming an interrupted run: {len(saved['in_flight']):,} articles were in "
+              f"flight, {len(tried):,} already tried are skipped")
+    
+    if retry_failed:
+        # Only articles whose pages failed in earlier runs
+        failures = store.failures('date')
+        articles_needing_dates = islice(({'url': f['url']} for f in failures), max_articles)
+        total_needing_dates = len(failures)
+        print(f"Retrying {total_needing_dates} articles that failed in earlier runs")
+    elif skip_urls or tried:
+        # Undated articles come in store order, so the ones in flight when
+        # the last run stopped are the first not skipped
+        skip = set(skip_urls or ()) | tried
+        articles_needing_dates = islice((a for a in store.undated()
+                                         if a.get('url') not in skip), max_articles)
+        total_needing_dates = sum(1 for a in store.undated() if a.get('url') not in skip)
+    else:
+        # Articles that need dates, read lazily from the store
+        articles_needing_dates = islice(store.undated(), max_articles)
+        total_needing_dates = store.count_undated()
     
     # Limit for testing if specified
     if max_articles:
-        articles_needing_dates = articles_needing_dates[:max_articles]
+        total_needing_dates = min(total_needing_dates, max_articles)
         print(f"TEST MODE: Processing only first {max_articles} articles")
     
-    total_needing_dates = len(articles_needing_dates)
-    total_articles = len(articles)
+    total_articles = store.count()
     
     print(f"Found {total_articles} total articles")
     print(f"{total_needing_dates} articles need dates")
     
     if total_needing_dates == 0:
-        print("All articles already have dates!")
+        print("No failed articles to retry" if retry_failed else "All articles already have dates!")
+        store.close()
+        if frontier:
+            frontier.clear()
         return
     
-    # Create URL to index mapping for fast lookup
-    url_to_index = {a.get('url'): i for i, a in enumerate(articles)}
-    
     # Thread-safe counters and lock
     save_counter = [0]
     found_counter = [0]
     lock = Lock()
+    controller = RateController(rate=rate, max_rate=max_rate,
+                                concurrency=workers, max_concurrency=max_workers)
     
-    print(f"Starting to fetch dates with {max_workers} concurrent workers...")
+    print(f"Starting to fetch dates with {workers} concurrent workers (up to {max_workers})...")
     print(f"Saving progress every {save_interval} articles...")
     
-    # Process articles concurrently
+    # Process articles concurrently. Articles are pulled from the store only
+    # when the controller grants a slot, so at most max_workers are in flight
+    # and memory stays flat however large the backlog is.
+    completed = 0
+    pending = set()
+    in_flight = {}  # future -> URL
+    exhausted = False
+    finished = False
+    parse_pool = parsers.parse_pool(parse_workers)
+    archive = PageArchive(archive_dir) if archive_dir else None
+    cache = HttpCache(http_cache) if http_cache else None
+    metrics = Metrics() if metrics_dir else None
+    writer = (MetricsWriter(metrics, metrics_dir, 'fetch_dates', metrics_interval)
+              if metrics else None)
     try:
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            
-            for article in articles_needing_dates:
-                future = executor.submit(
-                    process_article,
-                    article,
-                    url_to_index,
-                    lock,
-                    save_counter,
-                    save_interval,
-                    articles,
-                    output_file,
-                    found_counter
-                )
-                futures.append(future)
-                time.sleep(delay)  # Rate limiting
-            
-            # Process results as they complete
-            completed = 0
-            for future in as_completed(futures):
-                completed += 1
-                if completed % 50 == 0:
-                    print(f"Processed {completed}/{total_needing_dates} articles... (found {found_counter[0]} dates)")
+            while True:
+                wait_for = None
+                while not exhausted:
+                    ok, wait_for = controller.try_acquire()  # Rate limiting
+                    if not ok:
+                        break
+                    article = next(articles_needing_dates, None)
+                    if article is None:
+                        controller.release()
+                        exhausted = True
+                        break
+                    future = executor.submit(
+                        queued(metrics, process_article, 'date', article.get('section')),
+                        article,
+                        lock,
+                        save_counter,
+                        save_interval,
+                        store,
+                        found_counter,
+                        controller,
+                        parse_pool,
+                        archive,
+                        cache,
+                        metrics
+                    )
+                    pending.add(future)
+                    in_flight[future] = article.get('url')
+                
+                if not pending:
+                    if exhausted:
+                        break
+                    time.sleep(wait_for or 0.01)
+                    continue
+                
+                done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    controller.release()
+                    url = in_flight.pop(future)
+                    if url and future.exception() is None and future.result() is None:
+                        tried.add(url)
+                    completed += 1
+                    if completed % 50 == 0:
+                        print(f"Processed {completed}/{total_needing_dates} articles... "
+                              f"(found {found_counter[0]} dates) [{controller.status()}]")
+                    if frontier and completed % save_interval == 0:
+                        frontier.save({'in_flight': sorted(filter(None, in_flight.values())),
+                                       'tried': sorted(tried)})
+        finished = True
     except KeyboardInterrupt:
         print("\n\nInterrupted! Saving progress...")
     finally:
+        if parse_pool is not None:
+            parse_pool.shutdown(cancel_futures=True)
+        if archive is not None:
+            archive.close()
+        if cache is not None:
+            print(f"HTTP cache: {cache.stats()['hits']:,} pages not modified")
+            cache.close()
         # Always save on exit
         print("Saving results...")
-        save_articles(articles, output_file)
-        articles_with_dates = sum(1 for a in articles if a.get('date'))
-        print(f"Saved {articles_with_dates}/{total_articles} articles with dates to {output_file}")
+        with lock:
+            articles_with_dates = total_articles - store.count_undated()
+            failed = len(store.failures('date'))
+            with timed(metrics, 'save_seconds', stage='date'):
+                store.close()
+        if frontier and finished:
+            frontier.clear()
+        elif frontier:
+            frontier.save({'in_flight': sorted(filter(None, in_flight.values())),
+                           'tried': sorted(tried)})
+        print(f"Saved {articles_with_dates}/{total_articles} articles with dates to {store.path}")
+        if failed:
+            print(f"{failed} articles failed after retries; rerun with --retry-failed to fetch them")
+        print(f"Final rate: {controller.status()} "
+              f"({controller.throttled:,} throttled, {controller.errors:,} errors)")
+        if writer is not None:
+            writer.close()
+
+def extract_dates_from_archive(archive_dir=None, input_file=None, output_file=None,
+                               store_kind='json', parse_workers=None):
+    """Re-run date extraction over archived article pages, without the network.
+    
+    Every stored article with an archived page gets the date extracted from
+    it, replacing any date it already had. Pages are parsed in parallel in a
+    parse pool.
+    """
+    archive = PageArchive(archive_dir or DEFAULT_ARCHIVE)
+    entries = archive.entries('article')
+    if not entries:
+        print(f"No article pages in {archive.path}")
+        return
+    
+    store = open_store(store_kind, input_file)
+    if output_file is not None and Path(output_file) != store.path:
+        output_store = open_store(store_kind, output_file)
+        output_store.replace_all(store.articles)
+        store.close()
+        store = output_store
+    print(f"Re-extracting dates from {len(entries):,} archived pages in {archive.path}...")
+    
+    parse = partial(date_from_archive, root=archive.path)
+    parse_pool = parsers.parse_pool(parse_workers)
+    found = missing = unknown = 0
+    try:
+        if parse_pool is None:
+            dates = map(parse, entries)
+        else:
+            dates = parse_pool.map(parse, entries, chunksize=64)
+        for entry, date in zip(entries, dates):
+            if not date:
+                missing += 1
+            elif store.set_date(entry['url'], date):
+                found += 1
+            else:
+                unknown += 1
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown()
+        store.close()
+    
+    print(f"Set {found:,} dates; {missing:,} pages had no date, "
+          f"{unknown:,} URLs are not in the store")
+    print(f"Saved to {store.path}")
+
 
 if __name__ == "__main__":
-    import sys
-    
-    # Check for test mode
-    test_mode = '--test' in sys.argv
-    max_articles = 10 if test_mode else None
-    
-    if test_mode:
-        print("=" * 60)
-        print("TEST MODE: Processing only 10 articles")
-        print("Remove --test flag to process all articles")
-        print("=" * 60)
-        print()
-    
-    fetch_dates_for_articles(
-        max_workers=30,       # Reduced to avoid rate limiting
-        save_interval=100,   # Save every 100 dates fetched
-        delay=0,           # 200ms delay between requests
-        max_articles=max_articles
-    )
+    parser = argparse.ArgumentParser(description='Fetch publication dates for scraped headlines')
+    parser.add_argument('--test', action='store_true',
+                        help='Process only 10 articles')
+    parser.add_argument('--workers', type=int, default=10,
+                        help='Starting number of concurrent requests (default: 10)')
+    parser.add_argument('--max-workers', type=int, default=50,
+                        help='Ceiling for adaptive concurrency (default: 50)')
+    parser.add_argument('--rate', type=float, default=20.0,
+                        help='Starting request rate in requests/sec (default: 20)')
+    parser.add_argument('--max-rate', type=float, default=100.0,
+                        help='Ceiling for adaptive request rate (default: 100)')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='Only re-fetch articles that failed after retries in earlier runs')
+    parser.add_argument('--store', choices=STORES, default='json',
+                        help='Article store backend (default: json; parquet needs pyarrow)')
+    parser.add_argument('--input', type=str, default=None,
+                        help='Input store path (default: data/headlines.json, '
+                             'data/headlines.parquet or data/headlines.db, by --store)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output store path (default: same as --input, or the shard store '
+                             'next to it with --shard)')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Processes for parsing pages without a date tag (default: one '
+                             'per CPU core; 0 parses on the download threads)')
+    parser.add_argument('--parser', choices=parsers.PARSERS, default=parsers.DEFAULT_PARSER,
+                        help=f'BeautifulSoup backend (default: {parsers.DEFAULT_PARSER})')
+    parser.add_argument('--archive', type=Path, nargs='?', const=DEFAULT_ARCHIVE, default=None,
+                        help='Save downloaded article pages to a compressed page archive; '
+                             'pages are then read in full instead of stopping at the date '
+                             f'(default directory: {DEFAULT_ARCHIVE})')
+    parser.add_argument('--from-archive', type=Path, nargs='?', const=DEFAULT_ARCHIVE, default=None,
+                        help='Re-extract dates from archived article pages instead of '
+                             f'fetching (default directory: {DEFAULT_ARCHIVE})')
+    parser.add_argument('--sitemap', nargs='*', default=None, metavar='SOURCE',
+                        help='Fill dates from sitemap URLs or files first and only fetch pages '
+                             f'they don\'t cover (default source: {DEFAULT_SITEMAP})')
+    parser.add_argument('--sitemap-lastmod', action='store_true',
+                        help='Use a sitemap\'s <lastmod> for entries without a '
+                             '<news:publication_date> (it can be later than publication)')
+    parser.add_argument('--http-cache', type=Path, nargs='?', const=DEFAULT_HTTP_CACHE,
+                        default=None,
+                        help='Revalidate article pages with ETag/Last-Modified and reuse '
+                             f'the stored date on a 304 (default file: {DEFAULT_HTTP_CACHE})')
+    parser.add_argument('--metrics', type=Path, nargs='?', const=DEFAULT_METRICS, default=None,
+                        help='Record request latency, queue wait, parse and save times, status '
+                             'codes, retries and bytes, and write JSON and Prometheus snapshots '
+                             f'(default directory: {DEFAULT_METRICS})')
+    parser.add_argument('--metrics-interval', type=float, default=30.0,
+                        help='Seconds between metrics snapshots (default: 30)')
+    parser.add_argument('--profile', type=Path, nargs='?', const=DEFAULT_PROFILE_DIR,
+                        default=None,
+                        help='Run under cProfile and tracemalloc and write the reports '
+                             f'(default directory: {DEFAULT_PROFILE_DIR})')
+    parser.add_argument('--shard', type=str, default=None, metavar='I/N',
+                        help='Date only the undated articles whose URLs hash to shard I of N, '
+                             'in a store of their own (default: data/headlines.shard-I-of-N.json); '
+                             'combine the shards with main.py merge')
+    args = parser.parse_args()
+    
+    try:
+        parsers.use_parser(args.parser)
+        check_store(args.store)
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        parser.error(str(e))
+    if shard and args.from_archive:
+        parser.error("--shard and --from-archive cannot be combined")
+    
+    with profiled(args.profile, 'fetch_dates'):
+        if args.from_archive:
+            extract_dates_from_archive(args.from_archive, input_file=args.input,
+                                       output_file=args.output, store_kind=args.store,
+                                       parse_workers=args.parse_workers)
+        else:
+            # Check for test mode
+            test_mode = args.test
+            max_articles = 10 if test_mode else None
+    
+            if test_mode:
+                print("=" * 60)
+                print("TEST MODE: Processing only 10 articles")
+                print("Remove --test flag to process all articles")
+                print("=" * 60)
+                print()
+    
+            fetch_dates_for_articles(
+                input_file=args.input,
+                output_file=args.output,
+                workers=args.workers,
+                max_workers=args.max_workers,
+                save_interval=100,   # Save every 100 dates fetched
+                rate=args.rate,
+                max_rate=args.max_rate,
+                max_articles=max_articles,
+                store_kind=args.store,
+                retry_failed=args.retry_failed,
+                parse_workers=args.parse_workers,
+                archive_dir=args.archive,
+                http_cache=args.http_cache,
+                sitemaps=(args.sitemap or [DEFAULT_SITEMAP]) if args.sitemap is not None else None,
+                use_lastmod=args.sitemap_lastmod,
+                metrics_dir=args.metrics,
+                metrics_interval=args.metrics_interval,
+                shard=shard,
+            )
@@ -0,0 +1,88 @@
+"""
+Content filter rules shared by optimize.py and the fused pipeline (pipeline.py).
+
+Articles with an excluded tag, or whose headline contains an excluded
+pattern, are not headlines in the archive's sense (opinion columns, video,
+horoscopes, ...). optimize.py drops them from the stored archive; the
+pipeline drops them before their dates are fetched.
+
+The rules live in filters.toml next to this file, so they can be changed
+without touching code; `optimize.py --rules` reads another file.
+
+Excluded articles are appended to a JSONL side file next to the store
+(data/headlines.excluded.jsonl), with the reason in an "excluded" field.
+Its URLs count as already seen when crawling, so a page listing only
+excluded articles is still recognised as known by --since-last-run.
+"""
+
+import json
+import tomllib
+from collections.abc import Iterable
+from pathlib import Path
+
+RULES_PATH = Path(__file__).with_name("filters.toml")
+
+
+def load_rules(path: Path | None = None) -> tuple[set[str], list[str]]:
+    """Read (excluded tags, excluded patterns) from a rules file."""
+    with open(path or RULES_PATH, "rb") as f:
+        rules = tomllib.load(f).get("exclude", {})
+    return set(rules.get("tags", [])), list(rules.get("patterns", []))
+
+
+EXCLUDED_TAGS, EXCLUDED_PATTERNS = load_rules()
+
+
+def exclusion(article: dict, tags: set[str] | None = None,
+              patterns: list[str] | None = None) -> tuple[str, str] | None:
+    """Return why an article is excluded, as ("tag", tag) or ("pattern", pattern), or None."""
+    tags = EXCLUDED_TAGS if tags is None else tags
+    patterns = EXCLUDED_PATTERNS if patterns is None else patterns
+    tag = article.get("tag") or ""
+    if tag in tags:
+        return "tag", tag
+    headline = article.get("headline") or ""
+    for pattern in patterns:
+        if pattern in headline:
+            return "pattern", pattern
+    return None
+
+
+def excluded_path(store_path: Path) -> Path:
+    """The excluded-articles side file of a store: data/headlines.json -> data/headlines.excluded.jsonl."""
+    store_path = Path(store_path)
+    return store_path.with_name(f"{store_path.stem}.excluded.jsonl")
+
+
+def load_excluded_urls(path: Path | None) -> set[str]:
+    """URLs already in an excluded-articles side file."""
+    urls = set()
+    if path and Path(path).exists():
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    urls.add(json.loads(line)["url"])
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+    return urls
+
+
+def append_excluded(articles: Iterable[dict], path: Path) -> int:
+    """Append articles (each with an "excluded" reason) to a side file; returns how many."""
+    lines = [json.dumps(article, ensure_ascii=False) + "\n" for article in articles]
+    if lines:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+    return len(lines)
+
+
+def new_stats() -> dict:
+    """Empty removal counts, in the shape filter_headlines reports them."""
+    return {"by_tag": {}, "by_pattern": {}}
+
+
+def count_exclusion(removed: dict, reason: tuple[str, str]) -> None:
+    kind, rule = reason
+    counts = removed["by_tag"] if kind == "tag" else removed["by_pattern"]
+    counts[rule] = counts.get(rule, 0) + 1
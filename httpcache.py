@@ -0,0 +1,199 @@
+"""
+Conditional-request cache shared by fetch.py and fetch_dates.py.
+
+With --http-cache, the ETag and Last-Modified headers of every listing and
+article page are kept together with what was extracted from the page (the
+listing's articles, or the article's date). The next request for the URL
+sends If-None-Match / If-Modified-Since, and a 304 Not Modified reuses the
+stored result instead of downloading and parsing the page again.
+
+Entries live in a SQLite file (data/http_cache.db by default). The cache is
+bounded by the total size of the stored results; once it grows past
+`max_bytes`, the least recently used entries are evicted.
+
+Usage:
+    uv run python httpcache.py stats
+    uv run python httpcache.py clear
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_PATH = Path('data') / 'http_cache.db'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+EVICT_EVERY = 1000   # writes between eviction checks
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    result TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used);
+"""
+
+PUT = """
+INSERT INTO responses (url, etag, last_modified, result, size, last_used)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (url) DO UPDATE SET
+    etag = excluded.etag,
+    last_modified = excluded.last_modified,
+    result = excluded.result,
+    size = excluded.size,
+    last_used = excluded.last_used
+"""
+
+
+class HttpCache:
+    """Validators and extracted results per URL. Safe to share across threads.
+
+    Writes are committed by `flush()` (called at each checkpoint) and
+    `close()`.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode = WAL')
+        self._db.execute('PRAGMA synchronous = NORMAL')
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def headers(self, url):
+        """Conditional request headers for a URL with a stored result, else {}.
+
+        The entry is marked as just used, so it isn't evicted before a 304
+        for the request comes back.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT etag, last_modified FROM responses WHERE url = ? AND result IS NOT NULL',
+                (url,)).fetchone()
+            if row:
+                self._db.execute('UPDATE responses SET last_used = ? WHERE url = ?',
+                                 (time.time(), url))
+        if not row:
+            return {}
+        headers = {}
+        if row[0]:
+            headers['If-None-Match'] = row[0]
+        if row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def result(self, url):
+        """The stored result for a URL after a 304, or None if there isn't one."""
+        with self._lock:
+            row = self._db.execute('SELECT result FROM responses WHERE url = ?',
+                                   (url,)).fetchone()
+            if row is None or row[0] is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, url, headers, result=None):
+        """Record a 200 response's validators, and optionally what was extracted.
+
+        Responses without an ETag or Last-Modified are dropped, since they
+        can't be revalidated.
+        """
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        if not etag and not last_modified:
+            self.forget(url)
+            return
+        encoded = json.dumps(result, ensure_ascii=False) if result is not None else None
+        with self._lock:
+            self._db.execute(PUT, (url, etag, last_modified, encoded,
+                                   len(encoded or ''), time.time()))
+            self._wrote()
+
+    def set_result(self, url, result):
+        """Attach an extracted result to a URL whose validators were already `put`."""
+        encoded = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._db.execute('UPDATE responses SET result = ?, size = ?, last_used = ? '
+                             'WHERE url = ?', (encoded, len(encoded), time.time(), url))
+            self._wrote()
+
+    def forget(self, url):
+        with self._lock:
+            self._db.execute('DELETE FROM responses WHERE url = ?', (url,))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {'entries': entries, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
+
+    def evict(self):
+        """Drop least recently used entries until the results fit in max_bytes."""
+        with self._lock:
+            self._evict()
+
+    def flush(self):
+        with self._lock:
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self._db.commit()
+            self._db.close()
+
+    # Internals (called with the lock held)
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % EVICT_EVERY == 0:
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed = []
+        for url, size in self._db.execute('SELECT url, size FROM responses ORDER BY last_used'):
+            if excess <= 0:
+                break
+            doomed.append((url,))
+            excess -= size
+        self._db.executemany('DELETE FROM responses WHERE url = ?', doomed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or clear the conditional-request cache')
+    parser.add_argument('command', choices=['stats', 'clear'])
+    parser.add_argument('--path', type=Path, default=DEFAULT_PATH,
+                        help='Cache file (default: data/http_cache.db)')
+    args = parser.parse_args()
+
+    cache = HttpCache(args.path)
+    if args.command == 'clear':
+        cache.clear()
+        print(f"Cleared {cache.path}")
+    else:
+        stats = cache.stats()
+        print(f"{stats['entries']:,} entries, {stats['bytes'] / 1e6:,.1f} MB of results")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,152 @@
+"""
+Entry point for the data pipeline.
+
+Usage:
+    uv run python main.py run                       # Crawl, filter and fetch dates in one pass
+    uv run python main.py run --since-last-run      # Nightly catch-up
+    uv run python main.py run --excluded other.jsonl  # Excluded articles' side file
+    uv run python main.py update                    # Incremental fetch -> optimize -> dates -> neardup -> export -> archetypes
+    uv run python main.py update --stages optimize export
+    uv run python main.py merge                     # Fold data/headlines.shard-*.json into the store
+"""
+
+import argparse
+from pathlib import Path
+
+from fetch import SECTIONS
+from shards import merge_shards, shard_paths
+from stages import DEFAULT_MANIFEST, STAGES
+from store import DEFAULT_PATHS, STORES, check_store
+
+
 def main():
-    print("Hello from theonion!")
+    parser = argparse.ArgumentParser(description='Onion headlines data pipeline')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help='Crawl listings, filter excluded content and fetch '
+                                            'dates for what is left, in one pass')
+    run.add_argument('--section', choices=SECTIONS + ['all'], default='all',
+                     help='Section to scrape (default: all)')
+    run.add_argument('--since-last-run', action='store_true',
+                     help='Crawl from the first page and stop each section once it reaches '
+                          'pages that are already stored')
+    run.add_argument('--known-pages', type=int, default=2,
+                     help='With --since-last-run, stop after this many consecutive pages with '
+                          'no new articles (default: 2)')
+    run.add_argument('--max-pages', type=int, default=None, help='Maximum pages per section')
+    run.add_argument('--workers', type=int, default=4,
+                     help='Starting number of in-flight listing requests (default: 4)')
+    run.add_argument('--rate', type=float, default=5.0,
+                     help='Starting listing request rate in requests/sec (default: 5)')
+    run.add_argument('--max-rate', type=float, default=20.0,
+                     help='Ceiling for the listing request rate (default: 20)')
+    run.add_argument('--date-workers', type=int, default=10,
+                     help='Starting number of concurrent date requests (default: 10)')
+    run.add_argument('--date-rate', type=float, default=20.0,
+                     help='Starting date request rate in requests/sec (default: 20)')
+    run.add_argument('--max-date-rate', type=float, default=100.0,
+                     help='Ceiling for the date request rate (default: 100)')
+    run.add_argument('--excluded', type=Path, default=None,
+                     help='JSONL side file excluded articles are appended to; their URLs count '
+                          'as seen (default: next to the store, <store>.excluded.jsonl)')
+    run.add_argument('--parse-workers', type=int, default=None,
+                     help='Processes for HTML parsing (default: one per CPU core; '
+                          '0 parses on the download threads)')
+    run.add_argument('--store', choices=STORES, default='json',
+                     help='Article store backend (default: json; parquet needs pyarrow)')
+    run.add_argument('--output', type=Path, default=None,
+                     help='Store path (default: data/headlines.json, data/headlines.parquet '
+                          'or data/headlines.db, by --store)')
+
+    update = subparsers.add_parser('update', help='Run fetch.py, optimize.py, fetch_dates.py, '
+                                                  'the near-duplicate merge, export.py and '
+                                                  'archetypes.py as stages, '
+                                                  'skipping or narrowing each to what changed '
+                                                  'since the last run')
+    update.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES,
+                        help='Stages to run, in pipeline order (default: all)')
+    update.add_argument('--force', action='store_true',
+                        help='Ignore the manifest and run every stage in full')
+    update.add_argument('--manifest', type=Path, default=DEFAULT_MANIFEST,
+                        help=f'Stage manifest (default: {DEFAULT_MANIFEST})')
+    update.add_argument('--workers', type=int, default=4,
+                        help='Starting number of in-flight listing requests (default: 4)')
+    update.add_argument('--rate', type=float, default=5.0,
+                        help='Starting listing request rate in requests/sec (default: 5)')
+    update.add_argument('--date-workers', type=int, default=10,
+                        help='Starting number of concurrent date requests (default: 10)')
+    update.add_argument('--date-rate', type=float, default=20.0,
+                        help='Starting date request rate in requests/sec (default: 20)')
+    update.add_argument('--parse-workers', type=int, default=None,
+                        help='Processes for HTML parsing (default: one per CPU core; '
+                             '0 parses on the download threads)')
+    update.add_argument('--store', choices=STORES, default='json',
+                        help='Article store backend (default: json; parquet needs pyarrow)')
+    update.add_argument('--output', type=Path, default=None,
+                        help='Store path (default: data/headlines.json, data/headlines.parquet '
+                             'or data/headlines.db, by --store)')
+
+    merge = subparsers.add_parser('merge', help='Fold the stores written by fetch.py and '
+                                                'fetch_dates.py --shard into the main store')
+    merge.add_argument('shards', nargs='*', type=Path,
+                       help='Shard stores (default: every headlines.shard-*-of-* store next '
+                            'to the output store)')
+    merge.add_argument('--store', choices=STORES, default='json',
+                       help='Article store backend (default: json; parquet needs pyarrow)')
+    merge.add_argument('--output', type=Path, default=None,
+                       help='Store path (default: data/headlines.json, data/headlines.parquet '
+                            'or data/headlines.db, by --store)')
+    args = parser.parse_args()
+
+    try:
+        check_store(args.store)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.command == 'run':
+        from pipeline import run as run_pipeline
+        run_pipeline(
+            sections=SECTIONS if args.section == 'all' else [args.section],
+            max_pages=args.max_pages,
+            workers=args.workers,
+            rate=args.rate,
+            max_rate=args.max_rate,
+            date_workers=args.date_workers,
+            date_rate=args.date_rate,
+            max_date_rate=args.max_date_rate,
+            output_file=args.output,
+            store_kind=args.store,
+            since_last_run=args.since_last_run,
+            known_pages=args.known_pages,
+            excluded_file=args.excluded,
+            parse_workers=args.parse_workers,
+        )
+    elif args.command == 'update':
+        from stages import update as run_update
+        run_update(
+            stages=args.stages,
+            force=args.force,
+            store_kind=args.store,
+            output_file=args.output,
+            manifest_file=args.manifest,
+            workers=args.workers,
+            rate=args.rate,
+            date_workers=args.date_workers,
+            date_rate=args.date_rate,
+            parse_workers=args.parse_workers,
+        )
+    elif args.command == 'merge':
+        output = args.output or DEFAULT_PATHS[args.store]
+        shards = args.shards or shard_paths(output)
+        if not shards:
+            parser.error(f"No shard stores found next to {output}")
+        for path in shards:
+            if not path.exists():
+                parser.error(f"Shard store not found: {path}")
+        print(f"Merging {len(shards)} shard stores into {output}...")
+        stats = merge_shards(shards, output, args.store, SECTIONS)
+        print(f"Added {stats['added']:,} articles, dated {stats['dated']:,}, carried "
+              f"{stats['failures']:,} failures ({stats['total']:,} articles in {stats['path']})")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,332 @@
+"""
+Crawl metrics for fetch.py and fetch_dates.py: where the time goes.
+
+With --metrics, each request records, per stage ('listing' or 'date') and
+section:
+
+    request_seconds     histogram  HTTP request, from sending it to the last byte read
+    queue_wait_seconds  histogram  time between being queued and a worker picking it up
+    parse_seconds       histogram  HTML parsing, including the wait for a parse process
+    save_seconds        histogram  store saves and checkpoints
+    responses_total     counter    responses by status code ("error": no response)
+    retries_total       counter    attempts that were retried
+    bytes_total         counter    response bytes read
+
+Histograms have fixed buckets, so recording one value is a lock and a
+bisect, and memory stays flat however long the run. Percentiles in the JSON
+snapshots are interpolated within buckets.
+
+A background thread appends a JSON snapshot to DIR/<script>.jsonl every
+--metrics-interval seconds and at the end of the run, and replaces
+DIR/<script>.prom, in the Prometheus text format, for node_exporter's
+textfile collector.
+
+--profile runs the script under cProfile and tracemalloc and writes
+DIR/<script>.pstats and DIR/<script>.profile.txt (the functions with the
+most cumulative time, and the top allocation sites). cProfile follows the
+main thread only: scheduling, saves and, with --engine async, every request
+on the event loop. tracemalloc sees every thread.
+
+Usage:
+    uv run python fetch.py --metrics
+    uv run python fetch_dates.py --metrics data/metrics --metrics-interval 10
+    uv run python fetch.py --max-pages 20 --profile
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_DIR = Path('data') / 'metrics'
+DEFAULT_PROFILE_DIR = Path('data') / 'profile'
+
+PREFIX = 'onion_'
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.9, 0.99)
+HELP = {
+    'request_seconds': 'HTTP request time, to the last byte read',
+    'queue_wait_seconds': 'Time a request waited for a worker',
+    'parse_seconds': 'HTML parse time, including the wait for a parse process',
+    'save_seconds': 'Store save and checkpoint time',
+    'responses_total': 'HTTP responses by status code ("error" for no response)',
+    'retries_total': 'Request attempts that were retried',
+    'bytes_total': 'Response bytes read',
+}
+
+
+class Histogram:
+    """Counts of values per bucket (upper bounds in BUCKETS, plus +Inf)."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate the q-quantile by interpolating within its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            if n and cumulative + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                if i == len(BUCKETS):
+                    return lower
+                return lower + (BUCKETS[i] - lower) * (rank - cumulative) / n
+            cumulative += n
+        return BUCKETS[-1]
+
+
+class Metrics:
+    """Thread-safe counters and histograms, keyed by name and labels."""
+
+    def __init__(self):
+        self.started = datetime.now(timezone.utc)
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> Histogram
+
+    def count(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def response(self, stage, section, status, seconds, size):
+        """Record one HTTP response."""
+        self.observe('request_seconds', seconds, stage=stage, section=section)
+        self.count('responses_total', stage=stage, section=section, status=status)
+        self.count('bytes_total', size, stage=stage, section=section)
+
+    def error(self, stage, section):
+        """Record a request that got no response (timeout, connection error)."""
+        self.count('responses_total', stage=stage, section=section, status='error')
+
+    def snapshot(self):
+        """Current values as a JSON-ready dict."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = [(key, h.count, h.sum, [h.quantile(q) for q in QUANTILES])
+                          for key, h in sorted(self._histograms.items())]
+        return {
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'started': self.started.isoformat(timespec='seconds'),
+            'elapsed': round(time.monotonic() - self._start, 3),
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in counters],
+            'histograms': [{'name': name, 'labels': dict(labels), 'count': count,
+                            'sum': round(total, 6),
+                            **{f'p{round(q * 100)}': _round(v) for q, v in zip(QUANTILES, values)}}
+                           for (name, labels), count, total, values in histograms],
+        }
+
+    def prometheus(self):
+        """Current values in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = [(key, list(h.counts), h.sum, h.count)
+                          for key, h in sorted(self._histograms.items())]
+        lines = []
+        last = None
+        for (name, labels), value in counters:
+            if name != last:
+                lines += _header(name, 'counter')
+                last = name
+            lines.append(f'{PREFIX}{name}{_format_labels(labels)} {value}')
+        for (name, labels), counts, total, count in histograms:
+            if name != last:
+                lines += _header(name, 'histogram')
+                last = name
+            cumulative = 0
+            for bound, n in zip([*BUCKETS, '+Inf'], counts):
+                cumulative += n
+                lines.append(f'{PREFIX}{name}_bucket'
+                             f'{_format_labels(labels + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{PREFIX}{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{PREFIX}{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """A few lines for the end of a run: latency, parse, wait and save per stage."""
+        snapshot = self.snapshot()
+        stages = {}
+        for h in snapshot['histograms']:
+            stage = stages.setdefault(h['labels'].get('stage', ''), {})
+            merged = stage.setdefault(h['name'], [0, 0.0])
+            merged[0] += h['count']
+            merged[1] += h['sum']
+        for c in snapshot['counters']:
+            stage = stages.setdefault(c['labels'].get('stage', ''), {})
+            if c['name'] == 'responses_total':
+                status = c['labels'].get('status')
+                stage.setdefault('statuses', {})
+                stage['statuses'][status] = stage['statuses'].get(status, 0) + c['value']
+            else:
+                stage[c['name']] = stage.get(c['name'], 0) + c['value']
+
+        lines = []
+        for name, stage in sorted(stages.items()):
+            parts = []
+            for metric, label in (('request_seconds', 'request'), ('parse_seconds', 'parse'),
+                                  ('queue_wait_seconds', 'queue wait'), ('save_seconds', 'save')):
+                if metric in stage and stage[metric][0]:
+                    count, total = stage[metric]
+                    parts.append(f"{label} {total:,.1f}s ({total / count * 1000:,.1f} ms avg)")
+            statuses = ', '.join(f"{s}: {n:,}" for s, n in sorted(stage.get('statuses', {}).items()))
+            if statuses:
+                parts.append(f"statuses {statuses}")
+            if stage.get('retries_total'):
+                parts.append(f"{stage['retries_total']:,} retries")
+            if stage.get('bytes_total'):
+                parts.append(f"{stage['bytes_total'] / 1e6:,.1f} MB")
+            lines.append(f"  {name or 'other'}: " + '; '.join(parts))
+        return lines
+
+
+class MetricsWriter:
+    """Writes snapshots of `metrics` every `interval` seconds, on a daemon thread.
+
+    Each snapshot is appended to DIR/<name>.jsonl, and DIR/<name>.prom is
+    replaced atomically. `close` stops the thread, writes a last snapshot and
+    prints a summary.
+    """
+
+    def __init__(self, metrics, directory=DEFAULT_DIR, name='fetch', interval=30.0):
+        self.metrics = metrics
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.json_path = self.directory / f'{name}.jsonl'
+        self.prom_path = self.directory / f'{name}.prom'
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        with open(self.json_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.metrics.snapshot(), ensure_ascii=False) + '\n')
+        tmp = self.prom_path.with_name(self.prom_path.name + '.tmp')
+        tmp.write_text(self.metrics.prometheus(), encoding='utf-8')
+        os.replace(tmp, self.prom_path)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.write()
+        print("Metrics:")
+        for line in self.metrics.summary():
+            print(line)
+        print(f"Metrics written to {self.json_path} and {self.prom_path}")
+
+
+def timed(metrics, name, **labels):
+    """Context manager recording its duration in histogram `name`, if metrics is set."""
+    if metrics is None:
+        return nullcontext()
+    return _timer(metrics, name, labels)
+
+
+def queued(metrics, fn, stage, section=None):
+    """Wrap fn, about to be submitted to an executor, to record its queue wait."""
+    if metrics is None:
+        return fn
+    submitted = time.monotonic()
+
+    def run(*args, **kwargs):
+        metrics.observe('queue_wait_seconds', time.monotonic() - submitted,
+                        stage=stage, section=section)
+        return fn(*args, **kwargs)
+    return run
+
+
+@contextmanager
+def profiled(directory, name):
+    """Run the block under cProfile and tracemalloc, then write the reports."""
+    if directory is None:
+        yield
+        return
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats_path = directory / f'{name}.pstats'
+        report_path = directory / f'{name}.profile.txt'
+        profiler.dump_stats(stats_path)
+        report = io.StringIO()
+        report.write("cProfile (main thread), by cumulative time\n\n")
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(40)
+        report.write(f"tracemalloc: peak {peak / 1e6:,.1f} MB traced; top allocation sites\n\n")
+        for stat in snapshot.statistics('lineno')[:25]:
+            report.write(f"{stat}\n")
+        report_path.write_text(report.getvalue(), encoding='utf-8')
+        print(f"Profile written to {report_path} and {stats_path}")
+
+
+@contextmanager
+def _timer(metrics, name, labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe(name, time.perf_counter() - start, **labels)
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+def _header(name, kind):
+    return [f'# HELP {PREFIX}{name} {HELP.get(name, name)}', f'# TYPE {PREFIX}{name} {kind}']
+
+
+def _round(value):
+    return None if value is None else round(value, 6)
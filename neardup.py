@@ -0,0 +1,244 @@
+"""
+Near-duplicate headline detection for optimize.py.
+
+The same headline turns up under URL variants (http/https, www., trailing
+slashes, query strings) and as reposts with a new slug, in more than one
+section. URL variants are caught by deduplicating on `canonical_url`.
+Reposts are caught by comparing the headlines themselves:
+
+1. Headlines are normalized (lowercase, punctuation and extra spaces
+   removed) and only distinct texts go further.
+2. Each text becomes the set of its word pairs (a one-word headline, its
+   word), and a MinHash signature of `num_perm` values estimates the
+   Jaccard similarity of any two sets. All shingles of all headlines are
+   hashed at once with numpy, one permutation at a time.
+3. Locality-sensitive hashing splits signatures into bands; headlines that
+   agree on a whole band become candidates. Candidates are confirmed when
+   their estimated similarity reaches the threshold, and confirmed pairs
+   are joined into clusters. No step compares all pairs, so the cost grows
+   with the number of headlines, not its square.
+
+Word pairs rather than character shingles, because headlines are short and
+formulaic: "Area Man Wins Lottery" and "Area Man Loses Lottery" share most
+of their characters but are different articles. Changing one word of a
+ten-word headline changes two of its nine pairs (similarity 0.64), while a
+repost differs in punctuation or case, which normalization removes, or at
+most by a word added or dropped at either end (about 0.9 for ten words).
+Merging two different articles loses one, while missing a repost only
+leaves a duplicate, so the default threshold of 0.9 is on the strict side:
+a headline that differs only in its last word has to be 20 words long to
+be merged. tests/test_neardup.py checks it against real headlines.
+
+In a cluster, the records dated on the same day are one article and the
+earliest of them is kept. Dated records on different days are all kept:
+the site reruns some headlines on purpose ("'No Way To Prevent This,' Says
+Only Nation Where This Regularly Happens"). Undated records are never
+dropped, since a rerun fetched tonight has no date until its page is
+read; the update pipeline merges near duplicates after the dates stage.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_NUM_PERM = 128
+SHINGLE = 2  # Words per shingle
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+CHUNK = 1 << 22  # Shingles hashed at a time, to bound memory
+
+URL_PREFIX_RE = re.compile(r"^(?:https?:)?//(?:www\.)?", re.I)
+
+
+def canonical_url(url: str) -> str:
+    """One spelling per page: https, no www., query, fragment or trailing slash, lowercase."""
+    url = url.strip().split("#", 1)[0].split("?", 1)[0]
+    return URL_PREFIX_RE.sub("https://", url).rstrip("/").lower()
+
+
+def canonical_urls(urls: pd.Series) -> pd.Series:
+    """Vectorized canonical_url."""
+    return (urls.str.strip()
+            .str.replace(r"[?#].*$", "", regex=True)
+            .str.replace(URL_PREFIX_RE, "https://", regex=True)
+            .str.rstrip("/")
+            .str.lower())
+
+
+def normalize(headlines: pd.Series) -> pd.Series:
+    """Lowercase words separated by single spaces, without punctuation.
+
+    Apostrophes are dropped ("Nation's" is one word); other punctuation
+    separates words ("Follow-Up" is two).
+    """
+    return (headlines.fillna("").str.lower()
+            .str.replace("['\u2019]", "", regex=True)
+            .str.replace(r"[^\w\s]", " ", regex=True)
+            .str.replace(r"\s+", " ", regex=True)
+            .str.strip())
+
+
+def lsh_params(threshold: float, num_perm: int) -> tuple[int, int]:
+    """(bands, rows per band) whose candidate threshold is the closest one below `threshold`.
+
+    Two signatures share a band with probability 1 - (1 - s**rows)**bands,
+    which rises steeply around s = (1 / bands) ** (1 / rows).
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+def word_hash(word: str) -> int:
+    """A 64-bit hash of a word, the same in every process (unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def shingle_hashes(texts: list[str], size: int = SHINGLE) -> tuple[np.ndarray, np.ndarray]:
+    """32-bit hashes of every run of `size` consecutive words, and the text each belongs to.
+
+    Texts with fewer than `size` words have one shingle, all their words;
+    empty texts have none. Shingles come grouped by text, in text order.
+    """
+    words = pd.Series(texts, dtype=object).str.split().explode().dropna()
+    owners = words.index.to_numpy(dtype=np.int64)
+    codes, uniques = pd.factorize(words)
+    hashed = np.array([word_hash(w) for w in uniques], dtype=np.uint64)[codes]
+
+    lengths = np.bincount(owners, minlength=len(texts))
+    first = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    position = np.arange(len(owners)) - first[owners]
+    # A shingle starts at each word with size - 1 more after it in its text,
+    # and at the first word of a shorter text
+    width = np.minimum(lengths[owners], size)
+    starts = np.flatnonzero(position + width <= lengths[owners])
+
+    packed = np.zeros(len(starts), dtype=np.uint64)
+    for k in range(size):
+        present = k < width[starts]
+        step = packed * GOLDEN + hashed[np.where(present, starts + k, starts)]
+        packed = np.where(present, step, packed)
+    return (packed * GOLDEN) >> np.uint64(32), owners[starts]
+
+
+def signatures(texts: list[str], num_perm: int = DEFAULT_NUM_PERM,
+               seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """MinHash signatures (texts x num_perm), and a mask of texts that have shingles."""
+    hashes, owners = shingle_hashes(texts)
+    has_shingles = np.zeros(len(texts), dtype=bool)
+    has_shingles[owners] = True
+    # Where each text's shingles start; blocks of about CHUNK shingles end on these
+    starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]]) if len(owners) else owners
+    bounds = np.unique(np.r_[np.searchsorted(starts, np.arange(0, len(hashes), CHUNK)), len(starts)])
+
+    # Multiply-shift hashing, the high 32 bits of a * x + b in 64-bit
+    # arithmetic, stands in for each random permutation
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) << np.uint64(1) | np.uint64(1)
+    b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+    rows = np.empty((len(starts), num_perm), dtype=np.uint32)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        first, end = starts[lo], starts[hi] if hi < len(starts) else len(hashes)
+        block = hashes[first:end]
+        values = np.empty_like(block)
+        for i in range(num_perm):
+            np.multiply(block, a[i], out=values)
+            np.add(values, b[i], out=values)
+            # The shift keeps order, so it can wait until after the minimum
+            rows[lo:hi, i] = np.minimum.reduceat(values, starts[lo:hi] - first) >> np.uint64(32)
+
+    result = np.full((len(texts), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    result[has_shingles] = rows
+    return result, has_shingles
+
+
+def candidate_pairs(sig: np.ndarray, bands: int, rows: int) -> tuple[np.ndarray, np.ndarray]:
+    """Pairs of rows that agree on a whole band, neighbours within each bucket."""
+    n = len(sig)
+    mix = np.random.default_rng(1).integers(1, 1 << 63, rows, dtype=np.uint64) | np.uint64(1)
+    found = []
+    for band in range(bands):
+        keys = (sig[:, band * rows:(band + 1) * rows].astype(np.uint64) * mix).sum(
+            axis=1, dtype=np.uint64)
+        order = np.argsort(keys, kind="stable")
+        same = keys[order][1:] == keys[order][:-1]
+        found.append(order[:-1][same] * n + order[1:][same])
+    if not found:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    pairs = np.unique(np.concatenate(found))
+    return pairs // n, pairs % n
+
+
+def clusters(n: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Connected components of n items joined by (left, right) pairs, as labels."""
+    parent = list(range(n))
+
+    def root(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for x, y in zip(left.tolist(), right.tolist()):
+        rx, ry = root(x), root(y)
+        if rx != ry:
+            parent[max(rx, ry)] = min(rx, ry)
+    return np.array([root(x) for x in range(n)], dtype=np.int64)
+
+
+def find_near_duplicates(headlines: pd.Series, days: np.ndarray,
+                         threshold: float = DEFAULT_THRESHOLD,
+                         num_perm: int = DEFAULT_NUM_PERM) -> tuple[np.ndarray, np.ndarray]:
+    """Cluster near-duplicate headlines and choose which records to keep.
+
+    `days` holds each record's publication day as an integer (-1 if
+    undated). Returns (keep mask, cluster label per record); records that
+    aren't in a cluster of two or more get label -1.
+    """
+    codes, texts = pd.factorize(normalize(pd.Series(headlines).reset_index(drop=True)))
+    sig, has_shingles = signatures(list(texts), num_perm)
+    left, right = candidate_pairs(sig, *lsh_params(threshold, num_perm))
+    similar = (sig[left] == sig[right]).mean(axis=1) >= threshold
+    valid = has_shingles[left] & has_shingles[right] & similar
+    labels = clusters(len(texts), left[valid], right[valid])[codes]
+
+    df = pd.DataFrame({"label": labels, "day": np.asarray(days), "position": np.arange(len(labels))})
+    size = df.groupby("label")["label"].transform("size").to_numpy()
+    df = df[size > 1]
+    # Earliest dated record per (cluster, day); undated records always stay
+    dated = df[df["day"] >= 0].sort_values(["label", "day", "position"])
+    repeat = dated.duplicated(["label", "day"]).to_numpy()
+
+    keep = np.ones(len(labels), dtype=bool)
+    keep[dated["position"].to_numpy()[repeat]] = False
+    result = np.full(len(labels), -1, dtype=np.int64)
+    result[df["position"].to_numpy()] = df["label"].to_numpy()
+    return keep, result
+
+
+def cluster_report(records: list[dict], keep: np.ndarray, labels: np.ndarray,
+                   limit: int = 20) -> list[str]:
+    """Lines describing the largest clusters, one per record; kept records are marked "+".
+
+    `records`, `keep` and `labels` are aligned (as returned by
+    find_near_duplicates, or any subset of them).
+    """
+    sizes = pd.Series(labels[labels >= 0]).value_counts()
+    lines = [f"{len(sizes):,} clusters, {int((~keep).sum()):,} records merged away"]
+    for label in sizes.index[:limit]:
+        lines.append("")
+        for i in np.flatnonzero(labels == label):
+            record = records[i]
+            mark = "+" if keep[i] else "-"
+            lines.append(f"  {mark} {(record.get('date') or 'undated')[:10]:10}  {record.get('headline')}")
+            lines.append(f"      {record.get('url')}")
+    if len(sizes) > limit:
+        lines.append(f"\n... and {len(sizes) - limit:,} more clusters")
+    return lines
@@ -2,52 +2,166 @@
 Clean and optimize headlines data for the web app.
 Run this before the web preprocessing step.
 
+Deduplication and filtering run as vectorized pandas operations: all
+exclusion patterns are compiled into one regex and tags are matched as a
+categorical, so the cost stays low as the archive and the rule set grow.
+The original per-record loops are kept as `--engine python` for comparison.
+Rules are read from filters.toml (see filters.py).
+
+With `--store parquet` the vectorized engine works on the Arrow table
+directly: only the columns it filters on are converted to pandas, and the
+kept rows are written back without building a dict per article.
+
+URLs are compared in canonical form (https, no www., query string or
+trailing slash), and after filtering, headlines reposted under another URL
+are merged with MinHash/LSH (see neardup.py). `--similarity` sets the
+estimated Jaccard similarity of two headlines' word pairs at which they
+count as one; 0 turns the pass off. `--dry-run` lists the largest clusters.
+Undated records are never merged away, so run this after fetch_dates.py.
+
+Every record dropped (duplicate, excluded or merged) is appended to the
+store's excluded side file (data/headlines.excluded.jsonl, see filters.py),
+so the next `fetch.py --since-last-run` counts its URL as already seen.
+
 Usage:
     uv run python optimize.py
     uv run python optimize.py --dry-run  # Preview changes without saving
+    uv run python optimize.py --dry-run --report 50 --similarity 0.8
+    uv run python optimize.py --rules my-rules.toml
+    uv run python optimize.py --store parquet
 """
 
-import json
 import argparse
+import re
+import time
 from pathlib import Path
 
-DATA_PATH = Path("data/headlines.json")
+import numpy as np
+import pandas as pd
+
+import columnar
+from filters import (EXCLUDED_PATTERNS, EXCLUDED_TAGS, append_excluded, count_exclusion,
+                     excluded_path, exclusion, load_rules, new_stats)
+from neardup import (DEFAULT_NUM_PERM, DEFAULT_THRESHOLD, canonical_url, canonical_urls,
+                     cluster_report, find_near_duplicates)
+from store import DEFAULT_PATHS, STORES, check_store, open_store
+
+DATA_PATH = DEFAULT_PATHS["json"]
+ENGINES = ["vectorized", "python"]
+
+
+def load_data(store_kind: str = "json", path: Path | None = None) -> list[dict]:
+    store = open_store(store_kind, path or DEFAULT_PATHS[store_kind])
+    headlines = store.articles
+    store.close()
+    return headlines
+
+
+def save_data(headlines: list[dict], store_kind: str = "json", path: Path | None = None) -> None:
+    store = open_store(store_kind, path or DEFAULT_PATHS[store_kind])
+    store.replace_all(headlines)
+    store.close()
+
+
+def load_table(path: Path | None = None) -> "columnar.pa.Table":
+    """Read the parquet store as an Arrow table, folding in its change log first.
+
+    A damaged snapshot is replaced by its newest good backup the same way.
+    """
+    store = open_store("parquet", path or DEFAULT_PATHS["parquet"])
+    if store.log_path.exists() or not store.snapshots.verify():
+        store.compact()
+    store.close()
+    return columnar.read_table(store.path)
 
-# Filters to apply
-EXCLUDED_TAGS = {
-    "American Voices",
-    "Cartoons",
-    "Commentary",
-    "Video",
-    "Sports",
-    "Infographic",
-}
 
-EXCLUDED_PATTERNS = [
-    "Horoscope",
-    "Artist Profile",
-    "Editorial Cartoon",
-]
+def to_frame(headlines: list[dict]) -> pd.DataFrame:
+    """The columns filtering needs, one row per record, indexed by list position."""
+    return pd.DataFrame({
+        "url": [h.get("url") or "" for h in headlines],
+        "headline": [h.get("headline") or "" for h in headlines],
+        "tag": pd.Categorical([h.get("tag") or "" for h in headlines]),
+        "dated": [bool(h.get("date")) for h in headlines],
+    })
 
 
-def load_data() -> list[dict]:
-    with open(DATA_PATH) as f:
-        return json.load(f)
+def table_to_frame(table: "columnar.pa.Table") -> pd.DataFrame:
+    """to_frame for an Arrow table, indexed by row number.
 
+    tag stays dictionary-encoded, so it arrives as a categorical.
+    """
+    return pd.DataFrame({
+        "url": table.column("url").to_pandas().fillna(""),
+        "headline": table.column("headline").to_pandas().fillna(""),
+        "tag": table.column("tag").to_pandas(),
+        "dated": table.column("date").is_valid().to_numpy(zero_copy_only=False),
+    })
 
-def save_data(headlines: list[dict]) -> None:
-    with open(DATA_PATH, "w") as f:
-        json.dump(headlines, f, indent=2)
+
+def deduplicate_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Vectorized deduplicate_headlines: one row per canonical URL, preferring rows with dates.
+
+    Rows keep the position of the URL's first occurrence; rows without a
+    URL are dropped.
+    """
+    df = df[df["url"] != ""]
+    # factorize numbers URLs in order of first appearance, so sorting by
+    # (URL number, undated, position) and keeping each URL's first row picks
+    # the first dated row, in first-seen order
+    codes, _ = pd.factorize(canonical_urls(df["url"]))
+    order = np.lexsort((np.arange(len(df)), ~df["dated"].to_numpy(), codes))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = codes[order][1:] != codes[order][:-1]
+    return df.iloc[order[first]]
+
+
+def pattern_regex(patterns: list[str]) -> re.Pattern | None:
+    """All patterns compiled into one alternation, or None if there are none."""
+    if not patterns:
+        return None
+    return re.compile("|".join(re.escape(p) for p in patterns))
+
+
+def filter_frame(df: pd.DataFrame, tags: set[str] | None = None,
+                 patterns: list[str] | None = None) -> tuple[pd.DataFrame, dict]:
+    """Vectorized filter_headlines: returns (kept rows, removed stats)."""
+    tags = EXCLUDED_TAGS if tags is None else tags
+    patterns = EXCLUDED_PATTERNS if patterns is None else patterns
+    removed = new_stats()
+
+    tag = df["tag"].astype("category")
+    by_tag = tag.isin(tags)
+    for name, count in tag[by_tag].value_counts(sort=False).items():
+        if count:
+            removed["by_tag"][name] = int(count)
+
+    by_pattern = pd.Series(False, index=df.index)
+    regex = pattern_regex(patterns)
+    if regex is not None:
+        rest = df.loc[~by_tag, "headline"]
+        by_pattern.loc[rest.index] = rest.str.contains(regex)
+        # Credit each match to the first pattern listed, as filter_headlines does
+        matched = rest[by_pattern.loc[rest.index]]
+        for pattern in patterns:
+            if matched.empty:
+                break
+            hits = matched.str.contains(pattern, regex=False)
+            if hits.any():
+                removed["by_pattern"][pattern] = int(hits.sum())
+                matched = matched[~hits]
+
+    return df[~(by_tag | by_pattern)], removed
 
 
 def deduplicate_headlines(headlines: list[dict]) -> tuple[list[dict], int]:
     """Remove duplicate URLs, preferring entries with dates."""
-    seen = {}  # url -> article
+    seen = {}  # canonical url -> article
     
     for h in headlines:
         url = h.get("url", "")
         if not url:
             continue
+        url = canonical_url(url)
             
         if url not in seen:
             seen[url] = h
@@ -61,48 +175,165 @@ def deduplicate_headlines(headlines: list[dict]) -> tuple[list[dict], int]:
     return list(seen.values()), duplicates_removed
 
 
-def filter_headlines(headlines: list[dict]) -> tuple[list[dict], dict]:
+def filter_headlines(headlines: list[dict], tags: set[str] | None = None,
+                     patterns: list[str] | None = None) -> tuple[list[dict], dict]:
     """Filter headlines and return (kept, stats)."""
     kept = []
-    removed = {"by_tag": {}, "by_pattern": {}}
+    removed = new_stats()
 
     for h in headlines:
-        tag = h.get("tag", "")
-        headline = h.get("headline", "")
+        # Tag exclusions first, then pattern exclusions (see filters.py)
+        reason = exclusion(h, tags, patterns)
+        if reason:
+            count_exclusion(removed, reason)
+        else:
+            kept.append(h)
 
-        # Check tag exclusions
-        if tag in EXCLUDED_TAGS:
-            removed["by_tag"][tag] = removed["by_tag"].get(tag, 0) + 1
+    return kept, removed
+
+
+def clean_headlines(headlines: list[dict], engine: str = "vectorized", tags: set[str] | None = None,
+                    patterns: list[str] | None = None) -> tuple[list[dict], int, dict]:
+    """Deduplicate, then filter. Returns (kept, duplicates removed, removed stats)."""
+    if engine == "python":
+        deduped, dup_count = deduplicate_headlines(headlines)
+        filtered, removed = filter_headlines(deduped, tags, patterns)
+        return filtered, dup_count, removed
+
+    df = deduplicate_frame(to_frame(headlines))
+    dup_count = len(headlines) - len(df)
+    df, removed = filter_frame(df, tags, patterns)
+    return [headlines[i] for i in df.index], dup_count, removed
+
+
+def clean_table(table: "columnar.pa.Table", tags: set[str] | None = None,
+                patterns: list[str] | None = None) -> tuple["columnar.pa.Table", int, dict]:
+    """clean_headlines for an Arrow table (vectorized engine only)."""
+    df = deduplicate_frame(table_to_frame(table))
+    dup_count = table.num_rows - len(df)
+    df, removed = filter_frame(df, tags, patterns)
+    return table.take(df.index.to_numpy()), dup_count, removed
+
+
+def record_dropped(headlines: list[dict], kept_urls: set[str], path: Path,
+                   tags: set[str] | None = None, patterns: list[str] | None = None) -> int:
+    """Append the records whose URL isn't in kept_urls to an excluded side file, with why.
+
+    Returns how many were appended.
+    """
+    canonical = {canonical_url(url) for url in kept_urls if url}
+    dropped = []
+    for h in headlines:
+        url = h.get("url")
+        if not url or url in kept_urls:
             continue
+        reason = exclusion(h, tags, patterns)
+        if reason:
+            why = ":".join(reason)
+        elif canonical_url(url) in canonical:
+            why = "duplicate"
+        else:
+            why = "near-duplicate"
+        dropped.append({**h, "excluded": why})
+    return append_excluded(dropped, path)
 
-        # Check pattern exclusions
-        excluded = False
-        for pattern in EXCLUDED_PATTERNS:
-            if pattern in headline:
-                removed["by_pattern"][pattern] = removed["by_pattern"].get(pattern, 0) + 1
-                excluded = True
-                break
 
-        if not excluded:
-            kept.append(h)
+def headline_days(headlines: list[dict]) -> np.ndarray:
+    """Each record's publication day (its local date) as days since 1970-01-01, -1 if undated."""
+    dates = pd.to_datetime(pd.Series([(h.get("date") or "")[:10] for h in headlines], dtype=object),
+                           format="%Y-%m-%d", errors="coerce")
+    return (dates - pd.Timestamp("1970-01-01")).dt.days.fillna(-1).to_numpy(dtype=np.int64)
 
-    return kept, removed
+
+def table_days(table: "columnar.pa.Table") -> np.ndarray:
+    """headline_days for an Arrow table: UTC timestamps shifted by their utc_offset."""
+    dates = table.column("date").to_pandas()
+    offsets = table.column("utc_offset").to_pandas().fillna(0)
+    local = dates + pd.to_timedelta(offsets.to_numpy(dtype=np.int64), unit="min")
+    return (local - pd.Timestamp(0, tz="UTC")).dt.days.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def merge_near_duplicates(headlines: list[dict], threshold: float = DEFAULT_THRESHOLD,
+                          num_perm: int = DEFAULT_NUM_PERM) -> tuple[list[dict], np.ndarray, np.ndarray]:
+    """Drop reposts of the same headline (see neardup.py). Returns (kept, keep mask, cluster labels)."""
+    keep, labels = find_near_duplicates(pd.Series([h.get("headline") or "" for h in headlines]),
+                                        headline_days(headlines), threshold, num_perm)
+    return [h for h, k in zip(headlines, keep) if k], keep, labels
+
+
+def merge_table(table: "columnar.pa.Table", threshold: float = DEFAULT_THRESHOLD,
+                num_perm: int = DEFAULT_NUM_PERM) -> tuple["columnar.pa.Table", np.ndarray, np.ndarray]:
+    """merge_near_duplicates for an Arrow table."""
+    keep, labels = find_near_duplicates(table.column("headline").to_pandas().fillna(""),
+                                        table_days(table), threshold, num_perm)
+    return table.filter(keep), keep, labels
 
 
 def main():
     parser = argparse.ArgumentParser(description="Clean headlines data")
     parser.add_argument("--dry-run", action="store_true", help="Preview without saving")
+    parser.add_argument("--store", choices=STORES, default="json", help="Article store backend")
+    parser.add_argument("--path", type=Path, default=None,
+                        help="Store path (default: data/headlines.json, data/headlines.parquet "
+                             "or data/headlines.db)")
+    parser.add_argument("--rules", type=Path, default=None,
+                        help="Filter rules file (default: filters.toml)")
+    parser.add_argument("--engine", choices=ENGINES, default="vectorized",
+                        help="Filter engine (default: vectorized)")
+    parser.add_argument("--similarity", type=float, default=DEFAULT_THRESHOLD,
+                        help="Headline similarity (0-1) at which records are merged as "
+                             f"near duplicates; 0 disables (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM,
+                        help=f"MinHash permutations per headline (default: {DEFAULT_NUM_PERM})")
+    parser.add_argument("--report", type=int, default=20, metavar="N",
+                        help="Near-duplicate clusters to list with --dry-run (default: 20)")
     args = parser.parse_args()
 
-    headlines = load_data()
-    print(f"Loaded {len(headlines):,} headlines")
+    if not 0 <= args.similarity <= 1:
+        parser.error("--similarity must be between 0 and 1")
+    if args.num_perm < 1:
+        parser.error("--num-perm must be at least 1")
 
-    # Deduplicate first
-    deduped, dup_count = deduplicate_headlines(headlines)
-    print(f"Removed {dup_count:,} duplicate URLs")
+    tags, patterns = load_rules(args.rules)
+
+    try:
+        check_store(args.store)
+    except ValueError as e:
+        parser.error(str(e))
 
-    # Then filter
-    filtered, removed = filter_headlines(deduped)
+    # Deduplicate first, then filter, then merge near duplicates
+    report = []
+    if args.store == "parquet" and args.engine == "vectorized":
+        table = load_table(args.path)
+        total = table.num_rows
+        print(f"Loaded {total:,} headlines")
+        start = time.perf_counter()
+        filtered, dup_count, removed = clean_table(table, tags, patterns)
+        cleaned = filtered.num_rows
+        if args.similarity:
+            merged, keep, labels = merge_table(filtered, args.similarity, args.num_perm)
+            if args.dry_run:
+                clustered = np.flatnonzero(labels >= 0)
+                report = cluster_report(columnar.from_table(filtered.take(clustered)),
+                                        keep[clustered], labels[clustered], args.report)
+            filtered = merged
+        kept = filtered.num_rows
+    else:
+        headlines = load_data(args.store, args.path)
+        total = len(headlines)
+        print(f"Loaded {total:,} headlines")
+        start = time.perf_counter()
+        filtered, dup_count, removed = clean_headlines(headlines, args.engine, tags, patterns)
+        cleaned = len(filtered)
+        if args.similarity:
+            merged, keep, labels = merge_near_duplicates(filtered, args.similarity, args.num_perm)
+            if args.dry_run:
+                report = cluster_report(filtered, keep, labels, args.report)
+            filtered = merged
+        kept = len(filtered)
+    elapsed = time.perf_counter() - start
+    near_count = cleaned - kept
+    print(f"Removed {dup_count:,} duplicate URLs")
 
     print(f"\nRemoved by tag:")
     for tag, count in sorted(removed["by_tag"].items(), key=lambda x: -x[1]):
@@ -112,14 +343,35 @@ def main():
     for pattern, count in sorted(removed["by_pattern"].items(), key=lambda x: -x[1]):
         print(f"  {pattern}: {count:,}")
 
+    if args.similarity:
+        print(f"\nMerged {near_count:,} near-duplicate headlines (similarity ≥ {args.similarity})")
+        for line in report:
+            print(line)
+
     total_removed = sum(removed["by_tag"].values()) + sum(removed["by_pattern"].values())
-    print(f"\nTotal: {len(headlines):,} → {len(filtered):,} ({dup_count + total_removed:,} removed)")
+    print(f"\nTotal: {total:,} → {kept:,} ({dup_count + total_removed + near_count:,} removed) "
+          f"in {elapsed:.2f}s")
 
     if args.dry_run:
         print("\n[Dry run — no changes saved]")
     else:
-        save_data(filtered)
-        print(f"\nSaved to {DATA_PATH}")
+        path = args.path or DEFAULT_PATHS[args.store]
+        if isinstance(filtered, list):
+            kept_urls = {h.get("url") for h in filtered}
+            dropped = record_dropped(headlines, kept_urls, excluded_path(path), tags, patterns)
+            save_data(filtered, args.store, args.path)
+        else:
+            kept_urls = set(filtered.column("url").to_pylist())
+            urls = table.column("url").to_pandas()
+            dropped_rows = np.flatnonzero(~urls.isin(kept_urls).to_numpy())
+            dropped = record_dropped(columnar.from_table(table.take(dropped_rows)), kept_urls,
+                                     excluded_path(path), tags, patterns)
+            store = open_store("parquet", path)
+            store.replace_table(filtered)
+            store.close()
+        print(f"\nSaved to {path}")
+        if dropped:
+            print(f"Recorded {dropped:,} dropped URLs in {excluded_path(path)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+"""
+HTML parser backend and parse worker pool shared by fetch.py and fetch_dates.py.
+
+BeautifulSoup builds its tree in Python whichever backend it uses, so
+parsing on the threads that do network I/O caps throughput at one core. The
+scrapers instead download on their I/O threads and hand the HTML to a
+ProcessPoolExecutor, so parsing scales with CPU cores.
+
+lxml is used when installed (`uv sync --extra fast`); otherwise the standard
+library's html.parser.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+PARSERS = ['lxml', 'html.parser']
+DEFAULT_PARSER = 'lxml' if HAVE_LXML else 'html.parser'
+
+parser = DEFAULT_PARSER
+
+
+def use_parser(name):
+    """Select the BeautifulSoup backend for this process."""
+    global parser
+    if name not in PARSERS:
+        raise ValueError(f"Unknown parser: {name}. Choose from: {', '.join(PARSERS)}")
+    if name == 'lxml' and not HAVE_LXML:
+        raise ValueError("lxml is not installed (uv sync --extra fast)")
+    parser = name
+
+
+def make_soup(html):
+    return BeautifulSoup(html, parser)
+
+
+def parse_pool(workers=None):
+    """Return a process pool for parsing, or None to parse on the I/O threads.
+
+    workers: pool size (default: number of CPU cores; 0 disables the pool)
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 0:
+        return None
+    # Workers get the parser selected in this process
+    return ProcessPoolExecutor(max_workers=workers, initializer=use_parser, initargs=(parser,))
@@ -0,0 +1,195 @@
+"""
+Fused fetch -> filter -> date pipeline (`main.py run`).
+
+Run separately, fetch.py stores every listed article, fetch_dates.py fetches
+a date for each of them, and optimize.py only then drops the excluded
+content (American Voices, Video, Horoscopes, ...; see filters.py). Here
+listing extraction, dedupe and filtering happen in one pass: articles are
+deduplicated against the store, excluded ones are dropped (and written to
+the side file next to the store, see filters.py), and only the survivors
+are stored and queued for date fetching, while the crawl is still running.
+
+Listings and dates are paced by separate RateControllers, as when the two
+scripts run on their own. When date fetching falls behind, the crawl waits
+for a date slot, so the queue of undated articles stays bounded.
+
+Usage:
+    uv run python main.py run
+    uv run python main.py run --since-last-run --excluded data/excluded.jsonl
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+
+import parsers
+from fetch import SECTIONS, crawl_sections, section_crawls
+from fetch_dates import process_article
+from filters import (append_excluded, count_exclusion, excluded_path, exclusion,
+                     load_excluded_urls, new_stats)
+from ratelimit import RateController
+from store import open_store
+
+
+class DateQueue:
+    """Fetches dates for articles as they are queued, on a thread pool.
+
+    `put` blocks until the date RateController grants a slot, which is what
+    holds the crawl back when date fetching can't keep up.
+    """
+
+    def __init__(self, store, lock, workers=10, max_workers=50, rate=20.0, max_rate=100.0,
+                 save_interval=100, parse_pool=None):
+        self.store = store
+        self.lock = lock
+        self.save_interval = save_interval
+        self.parse_pool = parse_pool
+        self.controller = RateController(rate=rate, max_rate=max_rate,
+                                         concurrency=workers, max_concurrency=max_workers)
+        self.queued = set()
+        self.completed = 0
+        self._done_lock = Lock()
+        self._save_counter = [0]
+        self._found_counter = [0]
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    @property
+    def found(self):
+        return self._found_counter[0]
+
+    def put(self, article):
+        url = article.get('url')
+        if article.get('date') or url in self.queued:
+            return
+        self.queued.add(url)
+        self.controller.acquire()
+        future = self._executor.submit(process_article, article, self.lock, self._save_counter,
+                                       self.save_interval, self.store, self._found_counter,
+                                       self.controller, self.parse_pool)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self.controller.release()
+        with self._done_lock:
+            self.completed += 1
+            completed = self.completed
+        if completed % 50 == 0:
+            print(f"Dates: {completed:,}/{len(self.queued):,} processed "
+                  f"(found {self.found:,}) [{self.controller.status()}]")
+
+    def close(self, cancel=False):
+        self._executor.shutdown(wait=True, cancel_futures=cancel)
+
+
+def run(sections=None, start_page=1, max_pages=None, workers=4, max_workers=None, rate=5.0,
+        max_rate=20.0, window=None, batch_size=10, save_interval=1000, date_workers=10,
+        max_date_workers=50, date_rate=20.0, max_date_rate=100.0, output_file=None,
+        store_kind='json', since_last_run=False, known_pages=2, excluded_file=None,
+        parse_workers=None):
+    """Crawl listings, filter, and fetch dates for the surviving articles in one pass.
+
+    Args:
+        workers, max_workers, rate, max_rate, window, batch_size, save_interval:
+            Listing crawl settings, as for fetch.scrape_all_sections
+        date_workers, max_date_workers, date_rate, max_date_rate: Date fetch
+            settings, as for fetch_dates.fetch_dates_for_articles
+        since_last_run: Stop each section once it reaches known pages (see fetch.py)
+        excluded_file: Append excluded articles to this JSONL file (default:
+            the side file next to the store). URLs already in it count as
+            seen, so they aren't reported again and pages listing only
+            excluded articles still count as known.
+        parse_workers: Processes for HTML parsing (see parsers.py)
+
+    Stored articles that are still undated and pass the filters are queued
+    for dates too, once the crawl is done.
+    """
+    if sections is None:
+        sections = SECTIONS
+
+    store = open_store(store_kind, output_file)
+    if store.count():
+        print(f"Loaded {store.count():,} existing articles")
+    excluded_file = Path(excluded_file) if excluded_file else excluded_path(store.path)
+    existing_urls = store.existing_urls()
+    for url in load_excluded_urls(excluded_file):
+        existing_urls.add(url)
+    initial_count = store.count()
+
+    max_workers = max_workers or workers * 4
+    controller = RateController(rate=rate, max_rate=max_rate,
+                                concurrency=workers, max_concurrency=max_workers)
+    crawls = section_crawls(store, sections, start_page, max_pages, window or workers,
+                            existing_urls, batch_size, controller,
+                            since_last_run=since_last_run, known_pages=known_pages)
+
+    lock = Lock()
+    parse_pool = parsers.parse_pool(parse_workers)
+    dates = DateQueue(store, lock, date_workers, max_date_workers, date_rate, max_date_rate,
+                      parse_pool=parse_pool)
+    removed = new_stats()
+    failed = unsaved = 0
+    interrupted = False
+
+    start = time.monotonic()
+    try:
+        for crawl, new_articles in crawl_sections(crawls, max_workers, controller, parse_pool):
+            survivors, dropped = [], []
+            for article in new_articles:
+                reason = exclusion(article)
+                if reason is None:
+                    survivors.append(article)
+                    continue
+                count_exclusion(removed, reason)
+                dropped.append({**article, 'excluded': ':'.join(reason)})
+            append_excluded(dropped, excluded_file)
+
+            with lock:
+                while crawl.failures:
+                    page_num, failure = crawl.failures.pop(0)
+                    store.record_failure('listing', failure.url, failure.error,
+                                         failure.attempts, section=crawl.section, page=page_num)
+                    failed += 1
+                # Stored before its date is queued, so set_date finds it
+                store.add(survivors)
+                unsaved += len(survivors)
+                if unsaved >= save_interval:
+                    store.checkpoint()
+                    unsaved = 0
+
+            for article in survivors:
+                dates.put(article)
+
+        # Articles stored by earlier runs that still need a date
+        with lock:
+            backlog = [a for a in store.undated()
+                       if a.get('url') not in dates.queued and exclusion(a) is None]
+        if backlog:
+            print(f"Queueing {len(backlog):,} stored articles that still need dates")
+        for article in backlog:
+            dates.put(article)
+    except KeyboardInterrupt:
+        interrupted = True
+        print("\n\nInterrupted! Saving progress...")
+    finally:
+        dates.close(cancel=interrupted)
+        if parse_pool is not None:
+            parse_pool.shutdown(cancel_futures=True)
+        with lock:
+            total = store.count()
+            undated = store.count_undated()
+            store.close()
+
+    excluded = sum(removed['by_tag'].values()) + sum(removed['by_pattern'].values())
+    print(f"\nDone in {time.monotonic() - start:,.0f}s! Added {total - initial_count:,} new "
+          f"articles ({total:,} total), excluded {excluded:,} before date fetching")
+    for kind in ('by_tag', 'by_pattern'):
+        for rule, count in sorted(removed[kind].items(), key=lambda x: -x[1]):
+            print(f"  {rule}: {count:,}")
+    print(f"Dates: {dates.found:,} found for {dates.completed:,} articles; "
+          f"{undated:,} articles still undated")
+    if failed:
+        print(f"{failed:,} pages failed after retries; rerun fetch.py --retry-failed to fetch them")
+    print(f"Saved to {store.path}")
+    if excluded:
+        print(f"Excluded articles appended to {excluded_file}")
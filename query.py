@@ -0,0 +1,307 @@
+"""
+In-memory query engine over the headline archive.
+
+The archive is loaded once into column arrays (year, month-day, tag and
+section codes) with an index for each lookup the site's features need:
+
+- month-day, tag, section: row numbers per value
+- year: row numbers per year, and rows sorted by year, so a range of
+  years is one slice
+- headline words: an inverted index of (row, position) postings per word,
+  and a forward index of each headline's word ids. Word ids follow the
+  sorted vocabulary, so a prefix ("Area Ma") is a range of ids.
+
+A phrase ("Area Man") starts from the postings of its rarest word and
+checks the neighbouring positions against the forward index. Combined
+filters start from the smallest row set and check the other filters
+against the candidates' column values. So the cost of a query follows the
+size of its most selective part, not the archive. Sampling is seeded, so
+the same seed gives the same headlines.
+
+A headline's month-day and year are the calendar date written in its
+timestamp, as in export.py.
+
+Usage:
+    uv run python query.py --day 11-14
+    uv run python query.py --text "area man" --year 1996-1999 --tag Local
+    uv run python query.py --text "area ma" --prefix --count
+    uv run python query.py --tag Politics --sample 5 --seed 7
+"""
+
+import argparse
+import re
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+import numpy as np
+
+from optimize import load_data
+from store import DEFAULT_PATHS, STORES, check_store
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+DATE_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+POS_BITS = 8  # postings are row << POS_BITS | word position
+MAX_TOKENS = 1 << POS_BITS  # words indexed per headline
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower().replace("’", "'"))
+
+
+def parse_month_day(value: str) -> int:
+    """'11-14' -> 1114."""
+    month, _, day = value.partition("-")
+    return int(month) * 100 + int(day)
+
+
+def unique_sorted(values: np.ndarray) -> np.ndarray:
+    """np.unique for an already sorted array, without sorting it again."""
+    if len(values) < 2:
+        return values
+    keep = np.empty(len(values), dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+def contains_sorted(haystack: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Mask of which values are in the sorted array haystack."""
+    if not len(haystack):
+        return np.zeros(len(values), dtype=bool)
+    idx = np.minimum(np.searchsorted(haystack, values), len(haystack) - 1)
+    return haystack[idx] == values
+
+
+def group_rows(codes: np.ndarray) -> dict[int, np.ndarray]:
+    """Sorted row numbers for each distinct code."""
+    order = np.argsort(codes, kind="stable")
+    values, starts = np.unique(codes[order], return_index=True)
+    bounds = np.append(starts, len(order))
+    return {int(v): order[bounds[i]:bounds[i + 1]] for i, v in enumerate(values)}
+
+
+class Archive:
+    """Column arrays and indexes over a list of articles. Read-only once built."""
+
+    def __init__(self, articles: list[dict]):
+        self.articles = articles
+        n = len(articles)
+        self.year = np.zeros(n, dtype=np.int16)
+        self.month_day = np.zeros(n, dtype=np.int16)
+        self.tags, self.tag_codes = self._encode([a.get("tag") or "" for a in articles])
+        self.sections, self.section_codes = self._encode(
+            [a.get("section") or "" for a in articles])
+
+        token_rows = []
+        for row, article in enumerate(articles):
+            match = DATE_RE.match(article.get("date") or "")
+            if match:
+                self.year[row] = int(match[1])
+                self.month_day[row] = int(match[2]) * 100 + int(match[3])
+            token_rows.append(tokenize(article.get("headline") or "")[:MAX_TOKENS])
+
+        self._by_day = group_rows(self.month_day)
+        self._by_tag = group_rows(self.tag_codes)
+        self._by_section = group_rows(self.section_codes)
+        self._by_year = group_rows(self.year)
+        self._year_order = np.argsort(self.year, kind="stable")
+        self._years_sorted = self.year[self._year_order]
+        self._build_token_index(token_rows)
+
+    @classmethod
+    def load(cls, store_kind: str = "json", path: Path | None = None) -> "Archive":
+        return cls(load_data(store_kind, path))
+
+    def __len__(self) -> int:
+        return len(self.articles)
+
+    @staticmethod
+    def _encode(values: list[str]) -> tuple[list[str], np.ndarray]:
+        names = sorted(set(values))
+        lookup = {name: i for i, name in enumerate(names)}
+        return names, np.fromiter((lookup[v] for v in values), dtype=np.int16, count=len(values))
+
+    def _build_token_index(self, token_rows: list[list[str]]) -> None:
+        # Word ids follow sorted order, so a prefix is a contiguous id range
+        self.vocab = sorted({t for tokens in token_rows for t in tokens})
+        ids = {t: i for i, t in enumerate(self.vocab)}
+        lengths = np.fromiter((len(t) for t in token_rows), dtype=np.int64, count=len(token_rows))
+        # Forward index: the word ids of row r are _words[_starts[r]:_starts[r] + _lengths[r]]
+        self._lengths = lengths
+        self._starts = np.cumsum(lengths) - lengths
+        self._words = np.fromiter((ids[t] for tokens in token_rows for t in tokens),
+                                  dtype=np.int32, count=int(lengths.sum()))
+        # Inverted index: postings of word id w are _postings[_offsets[w]:_offsets[w + 1]]
+        rows = np.repeat(np.arange(len(token_rows), dtype=np.int64), lengths)
+        positions = np.arange(len(self._words), dtype=np.int64) - np.repeat(self._starts, lengths)
+        order = np.argsort(self._words, kind="stable")
+        self._postings = (rows << POS_BITS | positions)[order]
+        self._offsets = np.searchsorted(self._words[order], np.arange(len(self.vocab) + 1))
+
+    def _word_ids(self, token: str, prefix: bool = False) -> tuple[int, int]:
+        """The [lo, hi) range of word ids matching a token."""
+        lo = bisect_left(self.vocab, token)
+        if prefix:
+            return lo, bisect_left(self.vocab, token + "\x7f", lo)
+        return lo, lo + (lo < len(self.vocab) and self.vocab[lo] == token)
+
+    # Queries: each returns sorted row numbers
+
+    def search(self, phrase: str, prefix: bool = False) -> np.ndarray:
+        """Rows whose headline contains the phrase's words in order.
+
+        With prefix=True the last word only has to start the headline word,
+        so "area ma" matches "Area Man" and "Area Mayor".
+        """
+        tokens = tokenize(phrase)
+        if not tokens:
+            return EMPTY
+        ranges = [self._word_ids(t, prefix and i == len(tokens) - 1) for i, t in enumerate(tokens)]
+        counts = [self._offsets[hi] - self._offsets[lo] for lo, hi in ranges]
+        anchor = int(np.argmin(counts))
+        if counts[anchor] == 0:
+            return EMPTY
+
+        lo, hi = ranges[anchor]
+        keys = self._postings[self._offsets[lo]:self._offsets[hi]]
+        if hi - lo > 1:
+            # Postings of several words (a prefix); each is sorted on its own
+            keys = np.sort(keys)
+        rows = keys >> POS_BITS
+        start = (keys & (MAX_TOKENS - 1)) - anchor  # where the phrase would begin
+        fits = (start >= 0) & (start + len(tokens) <= self._lengths[rows])
+        rows = rows[fits]
+        begin = self._starts[rows] + start[fits]  # phrase start in _words
+        for i, (lo, hi) in enumerate(ranges):
+            if i == anchor:
+                continue
+            words = self._words[begin + i]
+            match = (words >= lo) & (words < hi)
+            rows, begin = rows[match], begin[match]
+        return unique_sorted(rows)
+
+    def years(self, start: int, end: int | None = None) -> np.ndarray:
+        """Rows dated in [start, end] (end defaults to start)."""
+        if end is None or end == start:
+            return self._by_year.get(start, EMPTY)
+        lo = np.searchsorted(self._years_sorted, start, side="left")
+        hi = np.searchsorted(self._years_sorted, start if end is None else end, side="right")
+        return np.sort(self._year_order[lo:hi])
+
+    def select(self, month_day: str | None = None, year: int | tuple[int, int] | None = None,
+               tag: str | None = None, section: str | None = None, text: str | None = None,
+               prefix: bool = False) -> np.ndarray:
+        """Rows matching every given filter."""
+        # (matching rows, rows or None if not built yet, column, low, high)
+        filters = []
+        if month_day is not None:
+            code = parse_month_day(month_day)
+            rows = self._by_day.get(code, EMPTY)
+            filters.append((len(rows), rows, self.month_day, code, code))
+        if year is not None:
+            start, end = year if isinstance(year, tuple) else (year, year)
+            count = (np.searchsorted(self._years_sorted, end, side="right")
+                     - np.searchsorted(self._years_sorted, start, side="left"))
+            filters.append((count, None, self.year, start, end))
+        if tag is not None:
+            code = self._code(self.tags, tag)
+            rows = self._by_tag.get(code, EMPTY)
+            filters.append((len(rows), rows, self.tag_codes, code, code))
+        if section is not None:
+            code = self._code(self.sections, section)
+            rows = self._by_section.get(code, EMPTY)
+            filters.append((len(rows), rows, self.section_codes, code, code))
+        if text:
+            rows = self.search(text, prefix)
+            filters.append((len(rows), rows, None, 0, 0))
+        if not filters:
+            return np.arange(len(self))
+
+        # Start from the most selective filter and check the rest per candidate
+        filters.sort(key=lambda f: f[0])
+        _, rows, column, low, high = filters[0]
+        if rows is None:
+            rows = self.years(low, high)
+        for _, other, column, low, high in filters[1:]:
+            if not len(rows):
+                break
+            if column is None:
+                rows = rows[contains_sorted(other, rows)]
+            else:
+                values = column[rows]
+                rows = rows[(values >= low) & (values <= high)]
+        return rows
+
+    def sample(self, n: int = 1, seed: int | None = None, **filters) -> np.ndarray:
+        """Up to n distinct random rows matching the filters (see select)."""
+        rows = self.select(**filters)
+        rng = np.random.default_rng(seed)
+        return rng.choice(rows, size=min(n, len(rows)), replace=False) if len(rows) else rows
+
+    def rows(self, rows: np.ndarray) -> list[dict]:
+        return [self.articles[i] for i in rows]
+
+    @staticmethod
+    def _code(names: list[str], name: str) -> int:
+        i = bisect_left(names, name)
+        return i if i < len(names) and names[i] == name else -1
+
+
+def parse_years(value: str) -> int | tuple[int, int]:
+    """'1996' or '1996-1999'."""
+    start, _, end = value.partition("-")
+    return (int(start), int(end)) if end else int(start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the headline archive")
+    parser.add_argument("--day", help="Month and day, MM-DD")
+    parser.add_argument("--year", type=parse_years, help="Year, or a range like 1996-1999")
+    parser.add_argument("--tag", help="Exact tag, e.g. Local")
+    parser.add_argument("--section", help="Section the headline was listed in")
+    parser.add_argument("--text", help="Words that must appear in order, e.g. \"area man\"")
+    parser.add_argument("--prefix", action="store_true",
+                        help="Let the last word of --text match as a prefix")
+    parser.add_argument("--sample", type=int, default=None, help="Pick N random matches")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for --sample")
+    parser.add_argument("--count", action="store_true", help="Only print the number of matches")
+    parser.add_argument("--limit", type=int, default=20, help="Matches to print (default: 20)")
+    parser.add_argument("--store", choices=STORES, default="json", help="Article store backend")
+    parser.add_argument("--path", type=Path, default=None,
+                        help="Store path (default: data/headlines.json, data/headlines.parquet "
+                             "or data/headlines.db)")
+    args = parser.parse_args()
+
+    try:
+        check_store(args.store)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    archive = Archive.load(args.store, args.path)
+    print(f"Indexed {len(archive):,} headlines from {args.path or DEFAULT_PATHS[args.store]} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    filters = {"month_day": args.day, "year": args.year, "tag": args.tag,
+               "section": args.section, "text": args.text, "prefix": args.prefix}
+    start = time.perf_counter()
+    if args.sample:
+        rows = archive.sample(args.sample, args.seed, **filters)
+    else:
+        rows = archive.select(**filters)
+    elapsed = time.perf_counter() - start
+    print(f"{len(rows):,} matches in {elapsed * 1e6:,.0f} µs\n")
+
+    if args.count:
+        return
+    for article in archive.rows(rows[:args.limit]):
+        year = (article.get("date") or "")[:4] or "????"
+        print(f"{year}  {article.get('tag', ''):<20}  {article.get('headline', '')}")
+    if len(rows) > args.limit:
+        print(f"... and {len(rows) - args.limit:,} more")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Adaptive rate and concurrency control shared by fetch.py and fetch_dates.py.
+
+Requests are paced with a token bucket and capped by an AIMD concurrency
+limit: both grow slowly while responses are fast and healthy, and halve on
+429s, 5xx responses, timeouts or a sharp rise in latency. A Retry-After
+header pauses all requests for the time the server asked for.
+
+Individual requests that fail transiently (timeouts, connection errors, 429s
+and 5xx responses) are retried with exponential backoff and jitter; once the
+attempts run out the caller gets a FetchFailed to record in the store's
+dead-letter queue.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value):
+    """Return a Retry-After header value in seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+
+class FetchFailed(Exception):
+    """A request that still failed after every attempt, or failed permanently."""
+
+    def __init__(self, url, error, attempts, status=None):
+        super().__init__(f"{error} (after {attempts} attempt{'s' if attempts != 1 else ''})")
+        self.url = url
+        self.error = str(error)
+        self.attempts = attempts
+        self.status = status
+
+
+def is_retryable(status):
+    """Whether a response status is worth retrying. None means no response."""
+    return status is None or status in (408, 429) or status >= 500
+
+
+def backoff_delay(attempt, retry_after=None, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Seconds to wait before retry number `attempt` (1 for the first retry).
+
+    Exponential with "equal jitter": half the step is fixed and half random,
+    so retries from concurrent requests spread out instead of arriving together.
+    A Retry-After from the server is a lower bound.
+    """
+    step = min(cap, base * 2 ** (attempt - 1))
+    delay = step / 2 + random.uniform(0, step / 2)
+    server_wait = parse_retry_after(retry_after)
+    return max(delay, server_wait) if server_wait else delay
+
+
+class RateController:
+    """Token-bucket pacing plus AIMD concurrency. Safe to share across threads.
+
+    Callers take a slot with `acquire()` (blocking) or `try_acquire()`
+    (non-blocking, for schedulers), report the outcome with `on_response()`
+    or `on_error()`, and give the slot back with `release()`.
+    """
+
+    def __init__(self, rate=5.0, min_rate=0.5, max_rate=50.0, rate_step=0.1,
+                 concurrency=4, min_concurrency=1, max_concurrency=32,
+                 latency_factor=3.0, cooldown=2.0):
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.rate_step = rate_step
+        self.limit = float(concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max(max_concurrency, concurrency)
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+
+        self.in_flight = 0
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = float('-inf')
+        self._base_latency = None
+        self._avg_latency = None
+        self._cond = threading.Condition()
+
+    # Slots
+
+    def try_acquire(self):
+        """Take a slot without blocking.
+
+        Returns (True, None) on success. Otherwise returns (False, wait), where
+        wait is the number of seconds until pacing allows another request, or
+        None if the concurrency limit is full and a release is needed first.
+        """
+        with self._cond:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return False, self._paused_until - now
+            if self.in_flight >= int(self.limit):
+                return False, None
+            self._refill(now)
+            if self._tokens < 1.0:
+                return False, (1.0 - self._tokens) / self.rate
+            self._tokens -= 1.0
+            self.in_flight += 1
+            return True, None
+
+    def acquire(self):
+        """Block until a slot is available."""
+        while True:
+            ok, wait = self.try_acquire()
+            if ok:
+                return
+            with self._cond:
+                self._cond.wait(timeout=wait if wait is not None else 1.0)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    # Feedback
+
+    def on_response(self, status, latency, retry_after=None):
+        """Record a completed HTTP response."""
+        with self._cond:
+            if status == 429 or status >= 500:
+                self.throttled += 1
+                self._decrease(parse_retry_after(retry_after))
+                return
+
+            self.successes += 1
+            if self._base_latency is None or latency < self._base_latency:
+                self._base_latency = latency
+            if self._avg_latency is None:
+                self._avg_latency = latency
+            else:
+                self._avg_latency = 0.8 * self._avg_latency + 0.2 * latency
+
+            if self._avg_latency > self._base_latency * self.latency_factor + 0.05:
+                self._decrease()
+            else:
+                self._increase()
+
+    def on_error(self):
+        """Record a timeout or connection error."""
+        with self._cond:
+            self.errors += 1
+            self._decrease()
+
+    def status(self):
+        """Short description of the current limits, for progress output."""
+        return f"{self.rate:.1f} req/s, {int(self.limit)} concurrent"
+
+    # Internals (called with the lock held)
+
+    def _refill(self, now):
+        burst = max(1.0, self.rate)
+        self._tokens = min(burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _increase(self):
+        self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+        self.rate = min(self.max_rate, self.rate + self.rate_step)
+
+    def _decrease(self, retry_after=None):
+        now = time.monotonic()
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+        # Only back off once per cooldown, so one burst of failures from
+        # requests that were already in flight counts as a single signal.
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._refill(now)
+        self.limit = max(self.min_concurrency, self.limit / 2)
+        self.rate = max(self.min_rate, self.rate / 2)
+        # A slower average after backing off is the new normal, not congestion
+        self._avg_latency = None
+        self._cond.notify_all()
@@ -0,0 +1,175 @@
+"""
+Sharded crawls: one backfill split across processes, machines or IPs.
+
+`--shard i/N` (1 <= i <= N) makes fetch.py or fetch_dates.py do one
+shard's part of the work and write it to a store of its own, next to the
+main one (data/headlines.shard-2-of-4.json for --shard 2/4):
+
+fetch.py
+    Each section's pages are dealt out in blocks of --shard-block pages,
+    round-robin: with blocks of 25 and 4 shards, shard 1 crawls pages 1-25,
+    101-125, ..., shard 2 pages 26-50, 126-150, and so on. A shard stops a
+    section after three of its own pages in a row come back empty, so every
+    shard finds the end of the section without knowing it in advance.
+fetch_dates.py
+    Undated articles are split by a stable hash of their URL (the same on
+    every machine and Python version). A shard copies its share of the
+    undated articles from the main store into its own and fetches dates
+    there; the main store is only read.
+
+Shard stores are ordinary stores, with their own frontier and dead-letter
+queue, so an interrupted shard resumes like any other run.
+
+`main.py merge` folds shard stores into the main store, deterministically:
+
+- Articles already in the main store keep their place. A date found by a
+  shard fills in an undated one.
+- New articles are deduplicated by URL, preferring a dated record, then
+  the lowest shard; they are appended in section, page and shard order,
+  so the result doesn't depend on which shard finished first or the
+  order the files are given in.
+- Dead-letter entries are carried over, except date failures for
+  articles a shard has since dated and entries the main store already has.
+
+Merging the same shards again changes nothing.
+
+Usage:
+    uv run python fetch.py --shard 1/4 &  uv run python fetch.py --shard 2/4 &  ...
+    uv run python fetch_dates.py --shard 3/4
+    uv run python main.py merge                     # Every data/headlines.shard-*.json
+    uv run python main.py merge data/headlines.shard-1-of-2.json data/headlines.shard-2-of-2.json
+"""
+
+import hashlib
+import re
+from pathlib import Path
+
+from store import open_store, store_kind
+
+DEFAULT_BLOCK = 25
+SHARD_RE = re.compile(r'\.shard-(\d+)-of-(\d+)$')
+
+
+def parse_shard(value):
+    """'2/4' -> (2, 4). Raises ValueError unless 1 <= i <= N."""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', value or '')
+    if not match:
+        raise ValueError(f"Invalid shard: {value!r}; expected i/N, like 1/4")
+    index, count = int(match[1]), int(match[2])
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard: {value!r}; i must be between 1 and N")
+    return index, count
+
+
+def shard_path(path, shard):
+    """Store path for a shard: data/headlines.json -> data/headlines.shard-2-of-4.json."""
+    path = Path(path)
+    index, count = shard
+    return path.with_name(f'{path.stem}.shard-{index}-of-{count}{path.suffix}')
+
+
+def shard_paths(path):
+    """Shard stores next to the store at `path`, in shard order."""
+    path = Path(path)
+    found = [p for p in path.parent.glob(f'{path.stem}.shard-*-of-*{path.suffix}')
+             if SHARD_RE.search(p.stem)]
+    return sorted(found, key=shard_order)
+
+
+def shard_order(path):
+    """Sort key: (N, i) for shard stores, and other stores after them by name."""
+    match = SHARD_RE.search(Path(path).stem)
+    if match:
+        return (0, int(match[2]), int(match[1]), '')
+    return (1, 0, 0, str(path))
+
+
+def url_shard(url, count):
+    """The shard (1..count) a URL belongs to, by a hash stable across processes."""
+    digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count + 1
+
+
+class PageShard:
+    """The listing pages owned by one shard: blocks of `block` pages, dealt round-robin."""
+
+    def __init__(self, index, count, block=DEFAULT_BLOCK):
+        self.index = index
+        self.count = count
+        self.block = block
+
+    def owns(self, page):
+        return (page - 1) // self.block % self.count == self.index - 1
+
+    def first(self, page):
+        """The first page at or after `page` that this shard owns."""
+        block = (page - 1) // self.block
+        offset = (self.index - 1 - block) % self.count
+        if offset == 0:
+            return page
+        return (block + offset) * self.block + 1
+
+    def __str__(self):
+        return f'{self.index}/{self.count}'
+
+
+def merge_shards(shards, output_file, kind=None, sections=()):
+    """Fold shard stores into the store at `output_file` (see the module docstring).
+
+    `kind` is the output store's kind (default: from its file name).
+    `sections` gives the order new articles are appended in; sections not
+    in it follow, by name. Returns counts of what was merged.
+    """
+    dest = open_store(kind or store_kind(output_file), output_file)
+    existing = {a.get('url'): a for a in dest.articles}
+    rank = {section: i for i, section in enumerate(sections)}
+
+    chosen = {}  # url -> (sort key, article)
+    dated = {}   # url -> date, for articles already in dest
+    failures = []
+    for shard_rank, path in enumerate(sorted(shards, key=shard_order)):
+        source = open_store(store_kind(path), path)
+        for position, article in enumerate(source.articles):
+            url = article.get('url')
+            if not url:
+                continue
+            if url in existing:
+                if article.get('date') and not existing[url].get('date'):
+                    dated.setdefault(url, article['date'])
+                continue
+            previous = chosen.get(url)
+            if previous is None or (article.get('date') and not previous[1].get('date')):
+                section = article.get('section') or ''
+                key = (rank.get(section, len(rank)), section, article.get('page') or 0,
+                       shard_rank, position)
+                chosen[url] = (key, article)
+        failures.extend(source.failures())
+        source.close()
+
+    for url, date in dated.items():
+        dest.set_date(url, date)
+    new = [article for _, article in sorted(chosen.values(), key=lambda item: item[0])]
+    dest.add(new)
+
+    # Date failures are moot once any record of the article has a date
+    has_date = set(dated) | {a['url'] for a in new if a.get('date')}
+    for failure in dest.failures('date'):
+        if failure['url'] in has_date:
+            dest.resolve_failure('date', failure['url'])
+    # Entries already queued were carried by an earlier merge of the same shards
+    queued = {(f['stage'], f['url']) for f in dest.failures()}
+    carried = 0
+    for failure in failures:
+        key = (failure['stage'], failure['url'])
+        if key in queued or (failure['stage'] == 'date' and failure['url'] in has_date):
+            continue
+        queued.add(key)
+        dest.record_failure(failure['stage'], failure['url'], failure.get('error'),
+                            failure['attempts'], section=failure.get('section'),
+                            page=failure.get('page'))
+        carried += 1
+
+    total = dest.count()
+    dest.close()
+    return {'added': len(new), 'dated': len(dated), 'failures': carried, 'total': total,
+            'path': dest.path}
@@ -0,0 +1,244 @@
+"""
+Sitemap-driven date discovery for fetch_dates.py.
+
+The site's XML sitemaps list article URLs with a <lastmod> date, and news
+sitemaps add a <news:publication_date>. Reading a few hundred sitemaps fills
+in most dates in bulk, so only the articles they don't cover need their own
+page fetched.
+
+Sitemaps are parsed as a stream (iterparse), so a large sitemap is never
+held in memory as a whole. A sitemap index is followed to its child
+sitemaps. Sources can be URLs or local files, and gzipped sitemaps
+(`.xml.gz`) are decompressed on the fly.
+
+Only <news:publication_date> is taken as a publication date by default.
+<lastmod> is when the page was last modified, which is often later than
+when it was published (a fixed typo, a new related-links box); pass
+use_lastmod=True (--sitemap-lastmod) to fall back to it for entries
+without a publication date.
+
+Usage:
+    uv run python fetch_dates.py --sitemap
+    uv run python fetch_dates.py --sitemap path/to/sitemap_index.xml
+    uv run python fetch_dates.py --sitemap --sitemap-lastmod
+    uv run python sitemaps.py https://theonion.com/sitemap_index.xml
+"""
+
+import argparse
+import gzip
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+
+from ratelimit import MAX_ATTEMPTS, FetchFailed, RateController, backoff_delay, is_retryable
+
+DEFAULT_SITEMAP = 'https://theonion.com/sitemap_index.xml'
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def url_key(url):
+    """Normalise an article URL for matching sitemap entries to stored articles."""
+    parts = urlsplit(url.strip())
+    return f"{parts.netloc.lower().removeprefix('www.')}{parts.path.rstrip('/')}"
+
+
+def _local(name):
+    return name.rsplit('}', 1)[-1]
+
+
+def parse_sitemap(stream, use_lastmod=False):
+    """Stream a sitemap or sitemap index.
+
+    Yields ('sitemap', loc, None) for each child of an index, and
+    ('url', loc, date) for each page; date is None if the entry has no
+    <news:publication_date> (or, with use_lastmod, no <lastmod> either).
+    """
+    for _, elem in ET.iterparse(stream, events=('end',)):
+        kind = _local(elem.tag)
+        if kind not in ('url', 'sitemap'):
+            continue
+        loc = lastmod = published = None
+        for child in elem.iter():
+            name = _local(child.tag)
+            text = (child.text or '').strip()
+            if name == 'loc' and loc is None:
+                loc = text
+            elif name == 'lastmod':
+                lastmod = text
+            elif name == 'publication_date':
+                published = text
+        elem.clear()
+        if not loc:
+            continue
+        if kind == 'sitemap':
+            yield 'sitemap', loc, None
+        else:
+            yield 'url', loc, published or (lastmod if use_lastmod else None)
+
+
+class _Gunzip:
+    """File-like wrapper that gunzips a stream if it starts with the gzip magic."""
+
+    def __init__(self, raw):
+        head = raw.read(2)
+        if head == GZIP_MAGIC:
+            self._stream = gzip.GzipFile(fileobj=_Prefixed(head, raw))
+        else:
+            self._stream = _Prefixed(head, raw)
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+
+class _Prefixed:
+    """A stream with some already-read bytes put back in front."""
+
+    def __init__(self, prefix, raw):
+        self._prefix = prefix
+        self._raw = raw
+
+    def read(self, size=-1):
+        if not self._prefix:
+            return self._raw.read(size)
+        if size is None or size < 0:
+            data, self._prefix = self._prefix + self._raw.read(), b''
+            return data
+        data, self._prefix = self._prefix[:size], self._prefix[size:]
+        if len(data) < size:
+            data += self._raw.read(size - len(data))
+        return data
+
+
+@contextmanager
+def open_sitemap(source, controller=None, attempts=MAX_ATTEMPTS):
+    """Open a sitemap URL or local file as a (decompressed) binary stream.
+
+    HTTP requests are retried like page fetches; FetchFailed is raised if the
+    sitemap still can't be fetched.
+    """
+    if not urlsplit(str(source)).scheme.startswith('http'):
+        with open(source, 'rb') as f:
+            yield _Gunzip(f)
+        return
+
+    for attempt in range(1, attempts + 1):
+        status = retry_after = None
+        try:
+            start = time.monotonic()
+            response = requests.get(source, timeout=30, stream=True)
+            status, retry_after = response.status_code, response.headers.get('Retry-After')
+            if controller:
+                controller.on_response(status, time.monotonic() - start, retry_after)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if controller and e.response is None:
+                controller.on_error()
+            error = e
+        else:
+            with response:
+                # Undo Content-Encoding; a .xml.gz file is gunzipped by _Gunzip
+                response.raw.decode_content = True
+                yield _Gunzip(response.raw)
+            return
+
+        if not is_retryable(status) or attempt == attempts:
+            raise FetchFailed(source, error, attempt, status)
+        time.sleep(backoff_delay(attempt, retry_after))
+
+
+def read_sitemap(source, controller=None, wanted=None, use_lastmod=False):
+    """Read one sitemap. Returns (child sitemaps, {url_key: date}).
+
+    If `wanted` (a set of url_keys) is given, only those URLs are kept.
+    """
+    children, dates = [], {}
+    with open_sitemap(source, controller) as stream:
+        for kind, loc, date in parse_sitemap(stream, use_lastmod):
+            if kind == 'sitemap':
+                children.append(loc)
+            elif date:
+                key = url_key(loc)
+                if wanted is None or key in wanted:
+                    dates[key] = date
+    return children, dates
+
+
+def discover_dates(sources, workers=4, controller=None, wanted=None, use_lastmod=False):
+    """Follow sitemaps (and sitemap indexes) from `sources` and map URLs to dates.
+
+    Sitemaps are fetched concurrently, paced by `controller` if given.
+    Sitemaps that can't be fetched are reported and skipped.
+
+    Returns:
+        dict: {url_key: date} (see url_key)
+    """
+    queue = deque(sources)
+    seen = set(queue)
+    dates = {}
+    read = failed = 0
+    pending = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while queue or pending:
+            while queue and len(pending) < workers:
+                source = queue.popleft()
+                if controller:
+                    controller.acquire()
+                pending[executor.submit(read_sitemap, source, controller, wanted,
+                                        use_lastmod)] = source
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = pending.pop(future)
+                if controller:
+                    controller.release()
+                try:
+                    children, found = future.result()
+                except Exception as e:
+                    print(f"  Error reading sitemap {source}: {e}")
+                    failed += 1
+                    continue
+                read += 1
+                dates.update(found)
+                for child in children:
+                    if child not in seen:
+                        seen.add(child)
+                        queue.append(child)
+                if read % 50 == 0:
+                    print(f"Read {read:,} sitemaps ({len(dates):,} dated URLs)...")
+
+    print(f"Read {read:,} sitemaps, {len(dates):,} dated URLs"
+          + (f" ({failed:,} sitemaps failed)" if failed else ""))
+    return dates
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read dates from sitemaps')
+    parser.add_argument('sources', nargs='*', default=[DEFAULT_SITEMAP],
+                        help=f'Sitemap URLs or files (default: {DEFAULT_SITEMAP})')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Concurrent sitemap downloads (default: 4)')
+    parser.add_argument('--rate', type=float, default=5.0,
+                        help='Request rate in requests/sec (default: 5)')
+    parser.add_argument('--lastmod', action='store_true',
+                        help='Use <lastmod> for entries without a <news:publication_date>')
+    args = parser.parse_args()
+
+    controller = RateController(rate=args.rate, max_rate=args.rate,
+                                concurrency=args.workers, max_concurrency=args.workers)
+    dates = discover_dates(args.sources, args.workers, controller,
+                           use_lastmod=args.lastmod)
+    years = {}
+    for date in dates.values():
+        years[date[:4]] = years.get(date[:4], 0) + 1
+    for year, count in sorted(years.items()):
+        print(f"  {year}: {count:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Incremental stage runner for `main.py update`.
+
+The nightly pipeline is fetch -> optimize -> dates -> neardup -> export ->
+archetypes. Each stage records what it saw in a manifest (data/pipeline.json):
+content hashes of its inputs and outputs and a watermark, so the next run can
+tell what changed.
+Filtering runs before dates are fetched, as in the fused pipeline
+(pipeline.py), so excluded articles never cost a request.
+
+fetch
+    Always runs, since only the site knows what is new, but crawls with
+    --since-last-run: each section stops at the first pages it already has.
+optimize
+    Skipped when the archive and filters.toml are unchanged. Dropped
+    records go to the excluded side file (see filters.py), whose URLs fetch
+    counts as known. New articles
+    are appended after the watermark, the number of articles the last run
+    left. If the articles before the watermark are still exactly what
+    optimize kept last time, only the new ones are deduplicated and
+    filtered. Otherwise the whole archive is cleaned again.
+dates
+    Fetches dates only for articles that are undated and weren't already
+    tried last time. Articles left undated (no date on the page, or in the
+    dead-letter queue) are remembered, and `fetch_dates.py --retry-failed`
+    deals with those. Skipped when nothing new is undated.
+neardup
+    Merges near-duplicate headlines across the whole archive, since a
+    repost can match a headline from any earlier run (see neardup.py). It
+    runs after dates so tonight's articles have theirs: a rerun of an old
+    headline is only told apart from a repost by its date, and undated
+    records are never merged away. Skipped when headlines and dates are
+    unchanged.
+export
+    Skipped when the dated headlines are unchanged. Otherwise export.py
+    runs, which rewrites only the day files whose content changed.
+archetypes
+    Skipped when headlines, tags and dates are unchanged. Otherwise
+    archetypes.py runs, which tokenizes only headlines it hasn't seen and
+    rewrites only the archetypes whose statistics changed.
+
+`--force` ignores the manifest and runs every selected stage in full.
+
+Usage:
+    uv run python main.py update
+    uv run python main.py update --stages optimize export   # Offline stages only
+    uv run python main.py update --force
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import archetypes
+import export
+import fetch
+import fetch_dates
+from filters import RULES_PATH, excluded_path, load_rules
+from neardup import canonical_url
+from optimize import clean_headlines, load_data, merge_near_duplicates, record_dropped, save_data
+from store import DEFAULT_PATHS, open_store
+
+STAGES = ['fetch', 'optimize', 'dates', 'neardup', 'export', 'archetypes']
+DEFAULT_MANIFEST = Path('data') / 'pipeline.json'
+
+# Fields each stage's result depends on
+FILTER_FIELDS = ['url', 'headline', 'tag']
+EXPORT_FIELDS = ['url', 'headline', 'tag', 'date']
+
+
+def records_hash(articles, fields):
+    """Content hash of the given fields of each article, in order."""
+    digest = hashlib.sha256()
+    for article in articles:
+        digest.update(json.dumps([article.get(f) for f in fields], ensure_ascii=False).encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def load_manifest(path):
+    if not Path(path).exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        print(f"  Warning: {path} is unreadable; running every stage in full")
+        return {}
+
+
+def save_manifest(manifest, path):
+    """Write the manifest, replacing the file atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def count_articles(store_kind, path):
+    store = open_store(store_kind, path)
+    count = store.count()
+    store.close()
+    return count
+
+
+def run_fetch(state, force, store_kind, path, workers, rate, parse_workers, **_):
+    before = count_articles(store_kind, path)
+    fetch.scrape_all_sections(workers=workers, rate=rate, output_file=path,
+                              store_kind=store_kind, since_last_run=True,
+                              parse_workers=parse_workers)
+    after = count_articles(store_kind, path)
+    return {'articles': after, 'added': after - before}
+
+
+def run_dates(state, force, store_kind, path, workers, rate, parse_workers, **_):
+    undated = {a.get('url') for a in load_data(store_kind, path) if not a.get('date')}
+    tried = set() if force else set(state.get('undated', []))
+    new = undated - tried
+    if not new:
+        return None
+    if len(undated) > len(new):
+        print(f"Skipping {len(undated) - len(new):,} articles left undated by earlier runs")
+    fetch_dates.fetch_dates_for_articles(input_file=path, workers=workers, rate=rate,
+                                         store_kind=store_kind, parse_workers=parse_workers,
+                                         skip_urls=tried)
+    remaining = sorted(a.get('url') for a in load_data(store_kind, path) if not a.get('date'))
+    return {'undated': remaining, 'dated': len(new - set(remaining))}
+
+
+def run_optimize(state, force, store_kind, path, **_):
+    articles = load_data(store_kind, path)
+    rules = file_hash(RULES_PATH)
+    tags, patterns = load_rules()
+    watermark = state.get('watermark', 0)
+
+    if (not force and state.get('rules') == rules and watermark <= len(articles)
+            and records_hash(articles[:watermark], FILTER_FIELDS) == state.get('clean')):
+        if watermark == len(articles):
+            return None
+        clean, new = articles[:watermark], articles[watermark:]
+        print(f"Cleaning {len(new):,} articles added since the last run")
+    else:
+        clean, new = [], articles
+        print(f"Cleaning all {len(new):,} articles")
+
+    known = {canonical_url(a.get('url') or '') for a in clean}
+    unseen = [a for a in new if canonical_url(a.get('url') or '') not in known]
+    kept, dup_count, removed = clean_headlines(unseen, 'vectorized', tags, patterns)
+    dup_count += len(new) - len(unseen)
+    result = clean + kept
+    if len(result) != len(articles):
+        # Remembered so the next fetch counts the dropped URLs as known
+        record_dropped(articles, {a.get('url') for a in result}, excluded_path(path), tags, patterns)
+        save_data(result, store_kind, path)
+
+    excluded = sum(removed['by_tag'].values()) + sum(removed['by_pattern'].values())
+    print(f"Kept {len(kept):,} of {len(new):,}: {dup_count:,} duplicates, {excluded:,} excluded")
+    return {'watermark': len(result), 'clean': records_hash(result, FILTER_FIELDS),
+            'rules': rules}
+
+
+def run_neardup(state, force, store_kind, path, stages, **_):
+    articles = load_data(store_kind, path)
+    digest = records_hash(articles, EXPORT_FIELDS)
+    if not force and state.get('input') == digest:
+        return None
+    result, _, _ = merge_near_duplicates(articles)
+    merged = len(articles) - len(result)
+    if merged:
+        record_dropped(articles, {a.get('url') for a in result}, excluded_path(path))
+        save_data(result, store_kind, path)
+        optimize = stages.get('optimize', {})
+        if optimize.get('watermark') == len(articles):
+            # Still all cleaned, so optimize needn't clean everything again
+            optimize.update(watermark=len(result), clean=records_hash(result, FILTER_FIELDS))
+    print(f"Merged {merged:,} near-duplicate headlines")
+    return {'input': records_hash(result, EXPORT_FIELDS), 'merged': merged}
+
+
+def run_export(state, force, store_kind, path, **_):
+    articles = load_data(store_kind, path)
+    dated = [a for a in articles if a.get('date')]
+    digest = records_hash(dated, EXPORT_FIELDS)
+    if not force and state.get('input') == digest:
+        return None
+    stats = export.export_days(articles, force=force)
+    print(f"Exported {stats['headlines']:,} headlines on {stats['days']} days; "
+          f"{stats['written']} day files changed")
+    return {'input': digest, 'headlines': stats['headlines']}
+
+
+def run_archetypes(state, force, store_kind, path, **_):
+    articles = load_data(store_kind, path)
+    # Undated headlines count toward archetype totals, so all articles are hashed
+    digest = records_hash(articles, EXPORT_FIELDS)
+    if not force and state.get('input') == digest:
+        return None
+    stats = archetypes.build_archetypes(articles, force=force)
+    print(f"Tokenized {stats['tokenized']:,} new headlines; {stats['archetypes']:,} archetypes, "
+          f"{stats['written']} files changed")
+    return {'input': digest, 'archetypes': stats['archetypes']}
+
+
+RUNNERS = {
+    'fetch': run_fetch,
+    'optimize': run_optimize,
+    'dates': run_dates,
+    'neardup': run_neardup,
+    'export': run_export,
+    'archetypes': run_archetypes,
+}
+
+
+def update(stages=None, force=False, store_kind='json', output_file=None,
+           manifest_file=DEFAULT_MANIFEST, workers=4, rate=5.0, date_workers=10,
+           date_rate=20.0, parse_workers=None):
+    """Run the selected stages in pipeline order, skipping those with nothing to do.
+
+    The manifest is saved after each stage, so an interrupted run resumes
+    with the stage it was in.
+    """
+    stages = [s for s in STAGES if s in (stages or STAGES)]
+    path = Path(output_file) if output_file else DEFAULT_PATHS[store_kind]
+    manifest = load_manifest(manifest_file)
+    if manifest.get('store') != str(path):
+        # Hashes and watermarks describe another archive
+        manifest = {'store': str(path), 'stages': {}}
+
+    for stage in stages:
+        state = manifest['stages'].get(stage, {})
+        print(f"\n=== {stage} ===")
+        start = time.monotonic()
+        if stage == 'dates':
+            pace = {'workers': date_workers, 'rate': date_rate}
+        else:
+            pace = {'workers': workers, 'rate': rate}
+        result = RUNNERS[stage](state, force, store_kind, path, parse_workers=parse_workers,
+                                stages=manifest['stages'], **pace)
+        elapsed = time.monotonic() - start
+        if result is None:
+            print(f"Skipped {stage}: nothing changed since the last run ({elapsed:.1f}s)")
+            continue
+        print(f"Finished {stage} in {elapsed:,.1f}s")
+        manifest['stages'][stage] = {
+            **result,
+            'ran_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'seconds': round(elapsed, 2),
+        }
+        save_manifest(manifest, manifest_file)
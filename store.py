@@ -0,0 +1,591 @@
+"""
+Article storage shared by fetch.py, fetch_dates.py and optimize.py.
+
+Three backends share one interface (see open_store):
+
+json (default)
+    data/headlines.json as a snapshot plus an append-only JSONL log of changes
+    next to it (data/headlines.log.jsonl), held in memory. Checkpoints append
+    to the log, so their cost is proportional to the new work rather than to
+    the size of the archive. Compaction folds the log into a fresh snapshot
+    and empties it; after a clean run the snapshot alone is complete.
+
+parquet
+    As json, but the snapshot is data/headlines.parquet, a columnar file
+    several times smaller that loads without parsing JSON (see columnar.py).
+    The change log is data/headlines.parquet.log.jsonl. Needs pyarrow.
+
+sqlite
+    data/headlines.db with indexes on url, (section, page), date and tag.
+    Lookups are queries, so startup time and memory stay flat as the archive
+    grows. Writes are batched into transactions committed at each checkpoint.
+
+Snapshots are written to a temporary file, fsynced and renamed into place,
+with their checksum and the last few snapshots before them kept under
+data/checkpoints/ (see checkpoints.py). A snapshot that doesn't parse is
+replaced by its newest good backup when loading; a store never silently
+starts empty. One that parses but doesn't match its checksum (edited by
+hand, say) is loaded with a warning.
+
+All backends also keep a dead-letter queue of requests that failed after
+every retry (see ratelimit.py): data/headlines.failed.json for json, a
+failures table for sqlite (parquet shares the json file). Each entry records the stage ('listing' or
+'date'), URL, last error and total attempts; `--retry-failed` in fetch.py and
+fetch_dates.py reprocesses just those URLs.
+
+Log records for the json backend, one JSON object per line:
+    {"op": "add", "article": {...}}        new article
+    {"op": "date", "url": ..., "date": ...} date found for an existing article
+    {"op": "reset"}                        drop everything before this line (--fresh)
+
+Usage:
+    uv run python store.py import data/headlines.json data/headlines.db
+    uv run python store.py export data/headlines.db data/headlines.json
+    uv run python store.py convert data/headlines.json data/headlines.parquet
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+import columnar
+from checkpoints import CorruptSnapshot, Snapshots
+
+STORES = ['json', 'parquet', 'sqlite']
+DEFAULT_PATHS = {
+    'json': Path('data') / 'headlines.json',
+    'parquet': Path('data') / 'headlines.parquet',
+    'sqlite': Path('data') / 'headlines.db',
+}
+SUFFIXES = {'.json': 'json', '.parquet': 'parquet', '.db': 'sqlite'}
+FIELDS = ['headline', 'url', 'tag', 'section', 'page', 'date']
+FAILURE_FIELDS = ['stage', 'url', 'error', 'attempts', 'section', 'page', 'failed_at']
+
+
+def load_articles(path):
+    """Load a JSON snapshot (a list of article dicts)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_articles(articles, path):
+    """Write a JSON snapshot, replacing the file atomically."""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(articles, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def failure_record(stage, url, error, attempts, section=None, page=None):
+    """Build a dead-letter entry for a request that failed after `attempts` tries."""
+    record = {'stage': stage, 'url': url, 'error': str(error), 'attempts': attempts,
+              'section': section, 'page': page,
+              'failed_at': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+    return {k: v for k, v in record.items() if v is not None}
+
+
+def check_store(kind):
+    """Raise ValueError if a store kind is unknown or its dependencies are missing."""
+    if kind not in STORES:
+        raise ValueError(f"Unknown store: {kind}. Choose from: {', '.join(STORES)}")
+    if kind == 'parquet':
+        columnar.require_pyarrow()
+
+
+def open_store(kind='json', path=None):
+    """Open an article store of the given kind ('json', 'parquet' or 'sqlite')."""
+    check_store(kind)
+    path = Path(path) if path else DEFAULT_PATHS[kind]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if kind == 'sqlite':
+        return SqliteStore(path)
+    if kind == 'parquet':
+        return ParquetStore(path)
+    return JsonStore(path)
+
+
+def store_kind(path):
+    """Guess a store kind from a file name (.json, .parquet or .db)."""
+    kind = SUFFIXES.get(Path(path).suffix)
+    if kind is None:
+        raise ValueError(f"Can't tell the store kind of {path}: "
+                         f"use one of {', '.join(SUFFIXES)}")
+    return kind
+
+
+class JsonStore:
+    """A JSON snapshot plus an append-only change log, held in memory.
+
+    Not thread-safe: callers that share a store across threads must hold
+    their own lock around writes.
+    """
+
+    kind = 'json'
+
+    def __init__(self, path, compact_ratio=0.5):
+        self.path = Path(path)
+        self.log_path = self.path.with_name(self.path.stem + '.log.jsonl')
+        self.failures_path = self.path.with_name(self.path.stem + '.failed.json')
+        self.snapshots = Snapshots(self.path)
+        self.compact_ratio = compact_ratio
+        self._log = None
+        self._failures = None
+        self._failures_dirty = False
+        self._articles = None
+        self._url_to_index = None
+
+    # Reading
+
+    def load(self):
+        """Return the snapshot with the log replayed on top of it.
+        
+        Raises CorruptSnapshot if the snapshot is damaged and has no good
+        backup to fall back on.
+        """
+        articles = self._load_snapshot() if self.path.exists() else []
+        self._set_articles(articles)
+
+        if self.log_path.exists():
+            replayed = 0
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash mid-write
+                        continue
+                    op = record.get('op')
+                    if op == 'reset':
+                        self._set_articles([])
+                    elif op == 'add':
+                        # Adds can already be in the snapshot if a compaction
+                        # was interrupted before the log was cleared
+                        self._append(record['article'])
+                    elif op == 'date':
+                        self._update_date(record['url'], record['date'])
+                    replayed += 1
+            if replayed:
+                print(f"Replayed {replayed:,} changes from {self.log_path}")
+
+        return self._articles
+
+    @property
+    def articles(self):
+        if self._articles is None:
+            self.load()
+        return self._articles
+
+    def count(self):
+        return len(self.articles)
+
+    def existing_urls(self):
+        return {a.get('url') for a in self.articles if a.get('url')}
+
+    def last_page(self, section):
+        return max((a.get('page', 0) for a in self.articles if a.get('section') == section),
+                   default=0)
+
+    def undated(self):
+        return (a for a in self.articles if not a.get('date'))
+
+    def count_undated(self):
+        return sum(1 for a in self.articles if not a.get('date'))
+
+    def failures(self, stage=None):
+        """Dead-letter entries, optionally for one stage, oldest first."""
+        return [f for f in self._load_failures().values()
+                if stage is None or f['stage'] == stage]
+
+    # Writing
+
+    def reset(self):
+        """Discard everything stored so far."""
+        self._set_articles([])
+        self._write({'op': 'reset'})
+        self._failures = {}
+        self._failures_dirty = True
+
+    def add(self, articles):
+        """Add new articles; URLs already stored are skipped."""
+        for article in articles:
+            if self._append(article):
+                self._write({'op': 'add', 'article': article})
+
+    def set_date(self, url, date):
+        """Set the date of a stored article. Returns False if the URL is unknown."""
+        if not self._update_date(url, date):
+            return False
+        self._write({'op': 'date', 'url': url, 'date': date})
+        return True
+
+    def record_failure(self, stage, url, error, attempts, section=None, page=None):
+        """Add a request to the dead-letter queue, or update it if already there."""
+        failures = self._load_failures()
+        previous = failures.get((stage, url))
+        if previous:
+            attempts += previous['attempts']
+        failures[(stage, url)] = failure_record(stage, url, error, attempts, section, page)
+        self._failures_dirty = True
+
+    def resolve_failure(self, stage, url):
+        """Drop a request from the dead-letter queue once it has succeeded."""
+        if self._load_failures().pop((stage, url), None):
+            self._failures_dirty = True
+
+    def replace_all(self, articles):
+        """Replace the whole archive and write it out as a new snapshot."""
+        self._set_articles(articles)
+        self.compact()
+
+    def checkpoint(self):
+        """Flush the log, and compact once it has grown large relative to the snapshot."""
+        if self._log:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        self._save_failures()
+        if self._needs_compaction():
+            print(f"Compacting {self.log_path} into {self.path}...")
+            self.compact()
+
+    def compact(self):
+        """Write the current state as the snapshot and clear the log."""
+        self._close_log()
+        self._write_snapshot(self.articles)
+        self.log_path.unlink(missing_ok=True)
+
+    def close(self):
+        """Final save: fold any logged changes into the snapshot."""
+        if self._articles is not None and (self._log or self.log_path.exists()
+                                           or not self.path.exists()):
+            self.compact()
+        self._close_log()
+        self._save_failures()
+
+    # Internals
+
+    def _load_snapshot(self):
+        """Read the snapshot, or its newest good backup if it doesn't parse."""
+        try:
+            articles = self._read_snapshot(self.path)
+        except (ValueError, OSError) as e:
+            problem = str(e)
+        else:
+            if not self.snapshots.verify():
+                print(f"  Warning: {self.path} doesn't match the checksum recorded in "
+                      f"{self.snapshots.manifest_path}; it was changed outside the scrapers "
+                      f"(edited, checked out or restored?). Using it as it is; earlier "
+                      f"snapshots are still in {self.snapshots.dir}")
+                self.snapshots.adopt()
+            return articles
+
+        damaged = self.snapshots.set_aside()
+        print(f"  Warning: {self.path} is damaged ({problem}); moved it to {damaged}")
+        for backup, entry in self.snapshots.backups():
+            try:
+                articles = self._read_snapshot(backup)
+            except (ValueError, OSError):
+                continue
+            print(f"  Loaded the backup from {entry['written_at']} ({backup}); changes "
+                  f"saved after it are lost unless they are still in {self.log_path}")
+            return articles
+        raise CorruptSnapshot(f"{self.path} is damaged ({problem}) and there is no good backup "
+                              f"in {self.snapshots.dir}. The damaged file was kept as {damaged}.")
+
+    def _read_snapshot(self, path):
+        return load_articles(path)
+
+    def _write_snapshot(self, articles):
+        tmp = self.path.with_name(self.path.name + '.new')
+        self._dump_snapshot(articles, tmp)
+        self.snapshots.commit(tmp)
+
+    def _dump_snapshot(self, articles, path):
+        save_articles(articles, path)
+
+    def _set_articles(self, articles):
+        self._articles = articles
+        self._url_to_index = {a.get('url'): i for i, a in enumerate(articles)}
+
+    def _append(self, article):
+        if self._articles is None:
+            self.load()
+        if article.get('url') in self._url_to_index:
+            return False
+        self._url_to_index[article.get('url')] = len(self._articles)
+        self._articles.append(article)
+        return True
+
+    def _update_date(self, url, date):
+        if self._articles is None:
+            self.load()
+        idx = self._url_to_index.get(url)
+        if idx is None:
+            return False
+        self._articles[idx]['date'] = date
+        return True
+
+    def _load_failures(self):
+        if self._failures is None:
+            entries = load_articles(self.failures_path) if self.failures_path.exists() else []
+            self._failures = {(f['stage'], f['url']): f for f in entries}
+        return self._failures
+
+    def _save_failures(self):
+        if not self._failures_dirty:
+            return
+        if self._failures:
+            save_articles(list(self._failures.values()), self.failures_path)
+        else:
+            self.failures_path.unlink(missing_ok=True)
+        self._failures_dirty = False
+
+    def _needs_compaction(self):
+        if not self.log_path.exists():
+            return False
+        snapshot_size = self.path.stat().st_size if self.path.exists() else 0
+        return self.log_path.stat().st_size > snapshot_size * self.compact_ratio
+
+    def _close_log(self):
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def _ends_with_newline(self):
+        with open(self.log_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _write(self, record):
+        if self._log is None:
+            self._log = open(self.log_path, 'a', encoding='utf-8')
+            if self._log.tell() and not self._ends_with_newline():
+                # Terminate a record cut short by a crash so it stays one bad line
+                self._log.write('\n')
+        self._log.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+class ParquetStore(JsonStore):
+    """JsonStore with a Parquet snapshot (see columnar.py)."""
+
+    kind = 'parquet'
+
+    def __init__(self, path, compact_ratio=0.5):
+        super().__init__(path, compact_ratio)
+        self.log_path = self.path.with_name(self.path.name + '.log.jsonl')
+
+    def replace_table(self, table):
+        """Replace the whole archive with an Arrow table, as a new snapshot."""
+        self._close_log()
+        tmp = self.path.with_name(self.path.name + '.new')
+        columnar.write_table(table, tmp)
+        self.snapshots.commit(tmp)
+        self.log_path.unlink(missing_ok=True)
+        self._articles = None
+
+    def _read_snapshot(self, path):
+        return columnar.read_articles(path)
+
+    def _dump_snapshot(self, articles, path):
+        columnar.write_articles(articles, path)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    headline TEXT,
+    tag TEXT,
+    section TEXT,
+    page INTEGER,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_articles_section_page ON articles (section, page);
+CREATE INDEX IF NOT EXISTS idx_articles_date ON articles (date);
+CREATE INDEX IF NOT EXISTS idx_articles_tag ON articles (tag);
+CREATE TABLE IF NOT EXISTS failures (
+    stage TEXT,
+    url TEXT,
+    error TEXT,
+    attempts INTEGER,
+    section TEXT,
+    page INTEGER,
+    failed_at TEXT,
+    PRIMARY KEY (stage, url)
+);
+"""
+
+UPSERT = """
+INSERT INTO articles (headline, url, tag, section, page, date)
+VALUES (:headline, :url, :tag, :section, :page, :date)
+ON CONFLICT (url) DO UPDATE SET date = COALESCE(articles.date, excluded.date)
+"""
+
+RECORD_FAILURE = """
+INSERT INTO failures (stage, url, error, attempts, section, page, failed_at)
+VALUES (:stage, :url, :error, :attempts, :section, :page, :failed_at)
+ON CONFLICT (stage, url) DO UPDATE SET
+    error = excluded.error,
+    attempts = failures.attempts + excluded.attempts,
+    failed_at = excluded.failed_at
+"""
+
+
+class SqliteUrlSet:
+    """Set-like view of stored URLs, backed by the url index.
+
+    URLs added here but not yet written to the store are kept in memory.
+    """
+
+    def __init__(self, db):
+        self._db = db
+        self._pending = set()
+
+    def __contains__(self, url):
+        if url in self._pending:
+            return True
+        return self._db.execute('SELECT 1 FROM articles WHERE url = ?', (url,)).fetchone() is not None
+
+    def add(self, url):
+        self._pending.add(url)
+
+
+class SqliteStore:
+    """Articles in an indexed SQLite table.
+
+    One connection is shared; callers that use it from several threads must
+    hold their own lock around writes, as with JsonStore.
+    """
+
+    kind = 'sqlite'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        self.db.executescript(SCHEMA)
+
+    # Reading
+
+    def iter_articles(self, where='', params=()):
+        """Yield article dicts in insertion order."""
+        cursor = self.db.execute(
+            f'SELECT {", ".join(FIELDS)} FROM articles {where} ORDER BY rowid', params)
+        for row in cursor:
+            yield {k: v for k, v in zip(FIELDS, row) if v is not None}
+
+    @property
+    def articles(self):
+        return list(self.iter_articles())
+
+    def count(self):
+        return self.db.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+    def existing_urls(self):
+        return SqliteUrlSet(self.db)
+
+    def last_page(self, section):
+        row = self.db.execute('SELECT MAX(page) FROM articles WHERE section = ?',
+                              (section,)).fetchone()
+        return row[0] or 0
+
+    def undated(self, batch_size=1000):
+        """Yield undated articles a batch at a time.
+
+        Pages by rowid rather than holding one cursor open, so dates can be
+        written while iterating.
+        """
+        last_rowid = 0
+        while True:
+            rows = self.db.execute(
+                f'SELECT rowid, {", ".join(FIELDS)} FROM articles '
+                "WHERE rowid > ? AND (date IS NULL OR date = '') ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield {k: v for k, v in zip(FIELDS, row[1:]) if v is not None}
+            last_rowid = rows[-1][0]
+
+    def count_undated(self):
+        return self.db.execute(
+            "SELECT COUNT(*) FROM articles WHERE date IS NULL OR date = ''").fetchone()[0]
+
+    def failures(self, stage=None):
+        where, params = ('WHERE stage = ?', (stage,)) if stage else ('', ())
+        cursor = self.db.execute(
+            f'SELECT {", ".join(FAILURE_FIELDS)} FROM failures {where} ORDER BY rowid', params)
+        return [{k: v for k, v in zip(FAILURE_FIELDS, row) if v is not None} for row in cursor]
+
+    # Writing (committed at the next checkpoint)
+
+    def reset(self):
+        self.db.execute('DELETE FROM articles')
+        self.db.execute('DELETE FROM failures')
+
+    def add(self, articles):
+        self.db.executemany(UPSERT, ({k: a.get(k) for k in FIELDS} for a in articles))
+
+    def set_date(self, url, date):
+        cursor = self.db.execute('UPDATE articles SET date = ? WHERE url = ?', (date, url))
+        return cursor.rowcount > 0
+
+    def record_failure(self, stage, url, error, attempts, section=None, page=None):
+        record = dict.fromkeys(FAILURE_FIELDS)
+        record.update(failure_record(stage, url, error, attempts, section, page))
+        self.db.execute(RECORD_FAILURE, record)
+
+    def resolve_failure(self, stage, url):
+        self.db.execute('DELETE FROM failures WHERE stage = ? AND url = ?', (stage, url))
+
+    def replace_all(self, articles):
+        with self.db:
+            self.db.execute('DELETE FROM articles')
+            self.add(articles)
+
+    def checkpoint(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert between JSON, Parquet and SQLite article stores')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in [('import', 'Load a JSON archive into a SQLite store'),
+                            ('export', 'Write a SQLite store out as JSON (for web preprocessing)'),
+                            ('convert', 'Convert between any two stores, by file extension '
+                                        '(.json, .parquet, .db)')]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('source', type=Path)
+        sub.add_argument('dest', type=Path)
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        source, dest = open_store('json', args.source), open_store('sqlite', args.dest)
+    elif args.command == 'export':
+        source, dest = open_store('sqlite', args.source), open_store('json', args.dest)
+    else:
+        try:
+            source = open_store(store_kind(args.source), args.source)
+            dest = open_store(store_kind(args.dest), args.dest)
+        except ValueError as e:
+            parser.error(str(e))
+
+    articles = source.articles
+    dest.replace_all(articles)
+    dest.close()
+    print(f"Wrote {len(articles):,} articles to {args.dest}")
+    if args.source.exists() and args.dest.exists():
+        print(f"  {args.source.stat().st_size / 1e6:,.1f} MB -> {args.dest.stat().st_size / 1e6:,.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import pytest
+
+import bench
+import fetch
+
+
+@pytest.fixture
+def bench_server(monkeypatch):
+    """Start bench.py's stand-in server and point the scrapers at it.
+
+    Call the fixture with ServerConfig arguments; returns the server, whose
+    RequestHandlerClass.stats counts requests by kind.
+    """
+    servers = []
+
+    def start(**config):
+        server, base_url = bench.start_server(bench.ServerConfig(**{
+            'latency': 1, 'jitter': 1, 'article_kb': 4, **config}))
+        servers.append(server)
+        monkeypatch.setattr(fetch, 'BASE_URL', base_url)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
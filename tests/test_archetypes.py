@@ -0,0 +1,105 @@
+import json
+
+import pandas as pd
+
+from archetypes import assign_subjects, build_archetypes, decode_subject, show, word_ids
+
+HEADLINES = [
+    # Area Man: the undated and the later ones come first, but the earliest dated one is first
+    {'headline': 'Area Man Unsure Why He Still Has Blender', 'tag': 'News', 'url': 'u1'},
+    {'headline': 'Area Man Passionate Defender Of Constitution', 'tag': 'News', 'url': 'u2',
+     'date': '2020-03-01T12:00:00+00:00'},
+    {'headline': "Area Man's Dream Deferred Again", 'tag': 'Local', 'url': 'u3',
+     'date': '2014-06-02T12:00:00+00:00'},
+    {'headline': 'Area Man Wins Lottery', 'tag': 'News', 'url': 'u4',
+     'date': '2014-09-30T12:00:00+00:00'},
+    # Nation: each second word once, so the subject is the one word
+    {'headline': 'Nation Shudders At Large Block Of Text', 'tag': 'Politics', 'url': 'u5',
+     'date': '2010-01-05T12:00:00+00:00'},
+    {'headline': 'Nation Somehow Makes It Through Another Week', 'tag': 'Politics', 'url': 'u6',
+     'date': '2010-07-05T12:00:00+00:00'},
+    {'headline': 'Nation Finally Ready To Talk', 'tag': 'Politics', 'url': 'u7',
+     'date': '2011-02-05T12:00:00+00:00'},
+    # Common enough, but a subject can't start with a function word
+    {'headline': 'To Be Continued', 'tag': 'News', 'url': 'u8'},
+    {'headline': 'To Be Announced', 'tag': 'News', 'url': 'u9'},
+    {'headline': 'To Be Determined', 'tag': 'News', 'url': 'u10'},
+    {'headline': 'Study Finds Nothing', 'tag': 'Science', 'url': 'u11'},
+]
+
+
+def build(tmp_path, headlines, **kwargs):
+    return build_archetypes(headlines, tmp_path / 'out', tmp_path / 'state.npz', min_count=3,
+                            **kwargs)
+
+
+def read(tmp_path, name):
+    return json.loads((tmp_path / 'out' / name).read_text(encoding='utf-8'))
+
+
+def test_assign_subjects():
+    headlines = pd.Series([h['headline'] for h in HEADLINES])
+    words, vocab, tokenized = word_ids(headlines, state_path=None)
+    subject = assign_subjects(words, vocab, min_count=3)
+    assert tokenized == len(HEADLINES)
+    names = [' '.join(decode_subject(int(code), vocab)) if code >= 0 else None for code in subject]
+    assert names == ['area man'] * 4 + ['nation'] * 3 + [None] * 4
+
+
+def test_subject_statistics(tmp_path):
+    stats = build(tmp_path, HEADLINES)
+    assert (stats['archetypes'], stats['written']) == (2, 2)
+    manifest = read(tmp_path, 'manifest.json')['archetypes']
+    assert list(manifest) == ['area-man', 'nation']
+
+    area_man = manifest['area-man']
+    assert area_man['name'] == 'Area Man'
+    assert area_man['count'] == 4
+    assert area_man['first'] == {'date': '2014-06-02', 'headline': "Area Man's Dream Deferred Again",
+                                 'url': 'u3'}
+    assert area_man['peak_years'] == [2014, 2020]
+    assert area_man['top_tags'] == [['News', 3], ['Local', 1]]
+    assert read(tmp_path, 'area-man.json') == {
+        'name': 'Area Man', 'count': 4, 'undated': 1, 'years': [2014, 2020],
+        'tags': ['Local', 'News'], 'counts': [[1, 1], [0, 1]]}
+
+    nation = manifest['nation']
+    assert (nation['count'], nation['peak_years'], nation['first']['url']) == (3, [2010, 2011], 'u5')
+
+    # By name as written, possessive and all, or by slug
+    assert show(tmp_path / 'out', "Area Man's")['count'] == 4
+    assert show(tmp_path / 'out', 'nation')['years'] == [2010, 2011]
+    assert show(tmp_path / 'out', 'Local Teen') is None
+
+
+def test_rerun_rewrites_only_changed_subjects(tmp_path):
+    build(tmp_path, HEADLINES)
+    area_man = tmp_path / 'out' / 'area-man.json'
+    before = area_man.stat().st_mtime_ns
+
+    stats = build(tmp_path, HEADLINES + [
+        {'headline': 'Nation Braces For Weekend', 'tag': 'News', 'url': 'u12',
+         'date': '2012-04-01T12:00:00+00:00'}])
+    assert (stats['tokenized'], stats['written']) == (1, 1)
+    assert area_man.stat().st_mtime_ns == before
+    assert read(tmp_path, 'nation.json')['years'] == [2010, 2011, 2012]
+
+
+def test_small_and_empty_archives(tmp_path):
+    # No leading phrase reaches --min-count
+    stats = build(tmp_path, HEADLINES[:2])
+    assert stats['archetypes'] == 0
+    assert read(tmp_path, 'manifest.json')['archetypes'] == {}
+    # A subject that no longer qualifies is removed
+    build(tmp_path, HEADLINES)
+    assert build(tmp_path, [])['removed'] == 2
+    assert not (tmp_path / 'out' / 'area-man.json').exists()
+
+
+def test_state_is_reused(tmp_path):
+    headlines = pd.Series([h['headline'] for h in HEADLINES])
+    first, vocab, _ = word_ids(headlines, tmp_path / 'state.npz')
+    again, vocab_again, tokenized = word_ids(headlines[::-1].reset_index(drop=True),
+                                             tmp_path / 'state.npz')
+    assert tokenized == 0
+    assert (vocab_again[again] == vocab[first][::-1]).all()
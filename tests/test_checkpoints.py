@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from checkpoints import CorruptSnapshot
+from store import JsonStore
+
+
+def article(i):
+    return {'headline': f'Headline {i}', 'url': f'https://theonion.com/{i}', 'tag': 'News',
+            'section': 'news', 'page': 1}
+
+
+def save(path, articles):
+    store = JsonStore(path)
+    store.replace_all(articles)
+    store.close()
+
+
+def test_hand_edited_snapshot_is_kept(tmp_path, capsys):
+    path = tmp_path / 'headlines.json'
+    save(path, [article(1)])
+    save(path, [article(1), article(2)])
+
+    edited = [article(1), article(2), article(3)]
+    path.write_text(json.dumps(edited))
+    assert JsonStore(path).articles == edited
+    assert 'changed outside the scrapers' in capsys.readouterr().out
+    assert not path.with_name('headlines.json.damaged').exists()
+
+    # The new checksum was recorded, so the next load doesn't warn again
+    assert JsonStore(path).articles == edited
+    assert 'changed outside' not in capsys.readouterr().out
+
+
+def test_unparseable_snapshot_falls_back_to_backup(tmp_path):
+    path = tmp_path / 'headlines.json'
+    save(path, [article(1)])
+    save(path, [article(1), article(2)])
+
+    path.write_text(path.read_text()[:-10])
+    assert JsonStore(path).articles == [article(1)]
+    assert path.with_name('headlines.json.damaged').exists()
+
+
+def test_unparseable_snapshot_without_backup_raises(tmp_path):
+    path = tmp_path / 'headlines.json'
+    save(path, [article(1)])
+    path.write_text('[{"headline": ')
+    with pytest.raises(CorruptSnapshot):
+        JsonStore(path).load()
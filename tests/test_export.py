@@ -0,0 +1,46 @@
+import json
+
+from export import export_days
+
+
+def old_numbering(headlines):
+    """The numbering of web/scripts/preprocess.ts + by-day.json: days in the
+    order first seen, newest year first within a day (a stable sort)."""
+    by_day = {}
+    for h in headlines:
+        if h.get('date'):
+            by_day.setdefault(h['date'][5:10], []).append(h)
+    return [h['url'] for day in by_day.values()
+            for h in sorted(day, key=lambda h: -int(h['date'][:4]))]
+
+
+def new_numbering(output_dir):
+    manifest = json.loads((output_dir / 'manifest.json').read_text())
+    urls = []
+    for day, info in manifest['days'].items():
+        data = json.loads((output_dir / f'{day}.json').read_text())
+        assert data['count'] == info['count'] == len(data['headlines'])
+        urls.extend(h['url'] for h in data['headlines'])
+    assert manifest['total'] == len(urls)
+    return urls
+
+
+def test_share_link_numbering_matches_by_day_json(tmp_path):
+    dates = ['2009-11-14T00:00:00-06:00', '2001-03-02T10:00:00-06:00', '2015-11-14T08:00:00+00:00',
+             '', '2001-11-14T00:00:00-06:00', '1999-01-31T00:00:00-06:00', '2009-03-02T00:00:00-06:00',
+             None, '2015-11-14T09:00:00+00:00', '2020-01-31T00:00:00-05:00']
+    headlines = [{'headline': f'Headline {i}', 'url': f'https://theonion.com/{i}', 'tag': 'News',
+                  'date': date} for i, date in enumerate(dates)]
+    export_days(headlines, tmp_path)
+    manifest = json.loads((tmp_path / 'manifest.json').read_text())
+    assert list(manifest['days']) == ['11-14', '03-02', '01-31']
+    assert new_numbering(tmp_path) == old_numbering(headlines)
+
+
+def test_unchanged_days_are_not_rewritten(tmp_path):
+    headlines = [{'headline': 'A', 'url': 'https://theonion.com/a', 'date': '2010-05-01T00:00:00Z'},
+                 {'headline': 'B', 'url': 'https://theonion.com/b', 'date': '2011-06-01T00:00:00Z'}]
+    assert export_days(headlines, tmp_path)['written'] == 2
+    headlines.append({'headline': 'C', 'url': 'https://theonion.com/c', 'date': '2012-06-01T00:00:00Z'})
+    stats = export_days(headlines, tmp_path)
+    assert stats['written'] == 1 and stats['headlines'] == 3
@@ -0,0 +1,31 @@
+import json
+import time
+
+import fetch
+from fetch_async import AsyncEngine
+
+
+def test_requests_in_flight_complete_during_run_blocking(bench_server):
+    bench_server(latency=200, jitter=0)
+    engine = AsyncEngine()
+    try:
+        task = engine._runner.get_loop().create_task(engine.scrape_page('news', 1))
+        engine.run_blocking(time.sleep, 0.6)
+        assert task.done()
+        assert len(task.result()) == 20
+    finally:
+        engine.close()
+
+
+def test_engines_store_the_same_articles(bench_server, tmp_path):
+    bench_server(pages=12, per_page=10)
+    stored = {}
+    for engine in ['threads', 'async']:
+        path = tmp_path / f'{engine}.json'
+        # Saved every page or so, so the async engine saves while requests are in flight
+        fetch.scrape_all_sections(['news', 'local'], workers=4, rate=50.0, save_interval=10,
+                                  output_file=path, engine=engine, parse_workers=0)
+        # Sections interleave in the order their pages happen to complete
+        stored[engine] = sorted(json.loads(path.read_text()), key=lambda a: a['section'])
+    assert len(stored['async']) == 2 * 12 * 10
+    assert stored['async'] == stored['threads']
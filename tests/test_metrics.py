@@ -0,0 +1,72 @@
+import json
+
+from metrics import BUCKETS, Histogram, Metrics, MetricsWriter
+
+# On a bucket bound, inside two buckets, and past the last bound
+LATENCIES = [0.0005, 0.003, 0.003, 0.2, 100.0]
+
+
+def recorded():
+    metrics = Metrics()
+    for seconds in LATENCIES:
+        metrics.response('listing', 'news', 200, seconds, 1000)
+    metrics.error('listing', 'news')
+    metrics.count('retries_total', stage='date', section='a "quoted" name')
+    return metrics
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram()
+    assert histogram.quantile(0.5) is None
+    for seconds in LATENCIES:
+        histogram.observe(seconds)
+    # A value equal to a bound is counted in that bucket ("le")
+    assert histogram.counts[BUCKETS.index(0.0005)] == 1
+    assert histogram.counts[BUCKETS.index(0.005)] == 2
+    assert histogram.counts[BUCKETS.index(0.25)] == 1
+    assert histogram.counts[-1] == 1
+    assert sum(histogram.counts) == histogram.count == 5
+    # Rank 2.5 falls 1.5 values into the 0.0025-0.005 bucket, which holds two
+    assert histogram.quantile(0.5) == 0.0025 + 0.0025 * 1.5 / 2
+    # Past the last bound only the bound is known
+    assert histogram.quantile(0.99) == BUCKETS[-1]
+
+
+def test_prometheus_text_format():
+    lines = recorded().prometheus().splitlines()
+    labels = 'section="news",stage="listing"'
+    assert '# HELP onion_request_seconds HTTP request time, to the last byte read' in lines
+    assert '# TYPE onion_request_seconds histogram' in lines
+    assert '# TYPE onion_responses_total counter' in lines
+    assert f'onion_responses_total{{{labels},status="200"}} 5' in lines
+    assert f'onion_responses_total{{{labels},status="error"}} 1' in lines
+    assert f'onion_bytes_total{{{labels}}} 5000' in lines
+    assert 'onion_retries_total{section="a \\"quoted\\" name",stage="date"} 1' in lines
+
+    buckets = [line for line in lines if line.startswith('onion_request_seconds_bucket')]
+    expected = {0.0005: 1, 0.001: 1, 0.0025: 1, 0.005: 3, 0.1: 3, 0.25: 4, 60.0: 4, '+Inf': 5}
+    for bound, count in expected.items():
+        assert f'onion_request_seconds_bucket{{{labels},le="{bound}"}} {count}' in buckets
+    assert len(buckets) == len(BUCKETS) + 1
+    assert f'onion_request_seconds_sum{{{labels}}} {sum(LATENCIES)}' in lines
+    assert f'onion_request_seconds_count{{{labels}}} 5' in lines
+    # One HELP and TYPE per metric, right before its samples
+    assert sum(line.startswith('# TYPE ') for line in lines) == 4
+
+
+def test_json_snapshot(tmp_path):
+    metrics = recorded()
+    writer = MetricsWriter(metrics, tmp_path, 'fetch', interval=3600)
+    writer.close()
+    snapshots = [json.loads(line) for line in (tmp_path / 'fetch.jsonl').read_text().splitlines()]
+    assert len(snapshots) == 1
+    assert (tmp_path / 'fetch.prom').read_text() == metrics.prometheus()
+
+    snapshot = snapshots[0]
+    assert snapshot['histograms'] == [{
+        'name': 'request_seconds', 'labels': {'section': 'news', 'stage': 'listing'},
+        'count': 5, 'sum': round(sum(LATENCIES), 6),
+        'p50': round(0.0025 + 0.0025 * 1.5 / 2, 6), 'p90': 60.0, 'p99': 60.0}]
+    counters = {(c['name'], c['labels'].get('status')): c['value'] for c in snapshot['counters']}
+    assert counters == {('bytes_total', None): 5000, ('responses_total', '200'): 5,
+                        ('responses_total', 'error'): 1, ('retries_total', None): 1}
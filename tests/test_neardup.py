@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from neardup import find_near_duplicates, shingle_hashes
+
+# Real headlines, plus a few one-word-apart siblings of them
+HEADLINES = [line for line in (Path(__file__).parent / 'fixtures' / 'headlines.txt')
+             .read_text(encoding='utf-8').splitlines() if line]
+NO_WAY = "'No Way To Prevent This,' Says Only Nation Where This Regularly Happens"
+
+
+def near_duplicates(headlines, days):
+    return find_near_duplicates(pd.Series(headlines), np.asarray(days, dtype=np.int64))
+
+
+def test_distinct_headlines_are_not_merged():
+    # All on one day, so any cluster would cost a headline
+    keep, labels = near_duplicates(HEADLINES, [100] * len(HEADLINES))
+    merged = [h for h, label in zip(HEADLINES, labels) if label >= 0]
+    assert merged == []
+    assert keep.all()
+
+
+def test_formulaic_synthetic_headlines_are_not_merged():
+    headlines = [f'Area Man Benchmarks Headline {section}-{page}-{i}'
+                 for section in ('news', 'local') for page in range(1, 21) for i in range(20)]
+    keep, _ = near_duplicates(headlines, [100] * len(headlines))
+    assert keep.all()
+
+
+def test_reposts_on_the_same_day_are_merged():
+    reposts = [h.upper() for h in HEADLINES] + [h.replace(' ', '  ') + '!' for h in HEADLINES]
+    headlines = HEADLINES + reposts
+    days = list(range(len(HEADLINES))) * 3
+    keep, labels = near_duplicates(headlines, days)
+    assert keep[:len(HEADLINES)].all()
+    assert not keep[len(HEADLINES):].any()
+    assert (labels[:len(HEADLINES)] == labels[len(HEADLINES):2 * len(HEADLINES)]).all()
+
+
+def test_reruns_on_other_days_are_kept():
+    headlines = [NO_WAY, NO_WAY, NO_WAY.replace(',', ''), NO_WAY, NO_WAY]
+    days = [16000, 17000, 17000, 18000, -1]
+    keep, labels = near_duplicates(headlines, days)
+    # One per day, the earliest record of it; the undated copy may be a
+    # rerun whose date isn't known yet
+    assert keep.tolist() == [True, True, False, True, True]
+    assert len(set(labels.tolist())) == 1
+
+
+def test_undated_records_are_never_merged_away():
+    keep, _ = near_duplicates([NO_WAY] * 3, [-1, -1, -1])
+    assert keep.all()
+
+
+def test_word_pair_shingles():
+    hashes, owners = shingle_hashes(['area man wins lottery', 'lottery', '', 'area man'])
+    assert owners.tolist() == [0, 0, 0, 1, 3]
+    assert hashes[0] == hashes[4]  # "area man"
+    assert len(set(hashes[:3].tolist())) == 3
+    assert hashes.max() < 1 << 32
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+import columnar
+from optimize import ENGINES, clean_headlines, clean_table
+
+TAGS = ['News', 'Local', 'Politics', 'American Voices', 'Video', 'Sports', '', None]
+WORDS = ['Area', 'Man', 'Nation', 'Report', 'Horoscope', 'Artist Profile', 'Editorial Cartoon',
+         'Congress', 'Local', 'Dad', 'Unsure', 'Why', 'He', 'Still', 'Has', 'Blender']
+
+
+def variant(url, rng):
+    """The same page under another spelling: scheme, www., trailing slash, query string."""
+    url = url.replace('https://', rng.choice(['https://', 'http://', 'https://www.', 'http://www.']))
+    if rng.random() < 0.5:
+        url = url.rstrip('/')
+    if rng.random() < 0.3:
+        url += '?utm_source=feed'
+    return url
+
+
+def sample_headlines(n=3000, seed=0):
+    rng = random.Random(seed)
+    pages = [f'https://theonion.com/story-{i}/' for i in range(n // 2)]
+    headlines = []
+    for i in range(n):
+        url = variant(rng.choice(pages), rng)
+        article = {
+            'headline': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 9))),
+            'url': url,
+            'tag': rng.choice(TAGS),
+            'section': rng.choice(['news', 'local']),
+            'page': rng.randint(1, 40),
+        }
+        if rng.random() < 0.6:
+            article['date'] = f'20{rng.randint(10, 24)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:00:00+00:00'
+        if rng.random() < 0.01:
+            article['url'] = rng.choice(['', None])
+        if rng.random() < 0.01:
+            article['headline'] = None
+        headlines.append(article)
+    return headlines
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_engines_agree(seed):
+    headlines = sample_headlines(seed=seed)
+    results = {engine: clean_headlines(headlines, engine) for engine in ENGINES}
+    kept, dup_count, removed = results['python']
+    assert kept and dup_count and removed['by_tag'] and removed['by_pattern']
+    for engine in ENGINES:
+        assert results[engine][0] == kept, engine
+        assert results[engine][1] == dup_count, engine
+        assert results[engine][2] == removed, engine
+
+
+def test_table_engine_agrees():
+    pytest.importorskip('pyarrow')
+    headlines = [h for h in sample_headlines(seed=3) if h.get('url')]
+    kept, dup_count, removed = clean_headlines(headlines, 'python')
+    table, table_dups, table_removed = clean_table(columnar.to_table(headlines))
+    assert [a['url'] for a in columnar.from_table(table)] == [a['url'] for a in kept]
+    assert (table_dups, table_removed) == (dup_count, removed)
@@ -0,0 +1,25 @@
+import json
+
+import pipeline
+from filters import excluded_path, load_excluded_urls
+
+
+def test_catch_up_treats_excluded_urls_as_known(bench_server, tmp_path):
+    server = bench_server(pages=8, per_page=10)
+    stats = server.RequestHandlerClass.stats
+    path = tmp_path / 'headlines.json'
+
+    pipeline.run(sections=['news', 'local'], output_file=path, since_last_run=True,
+                 parse_workers=0)
+    excluded = load_excluded_urls(excluded_path(path))
+    stored = {a['url'] for a in json.loads(path.read_text())}
+    assert excluded, "the stand-in server lists American Voices articles"
+    assert stored and not stored & excluded
+
+    # Nothing new on the site: each section stops after its first known pages
+    stats.clear()
+    pipeline.run(sections=['news', 'local'], output_file=path, since_last_run=True,
+                 parse_workers=0)
+    assert stats.get('listing', 0) <= 2 * 4
+    assert stats.get('article', 0) == 0
+    assert load_excluded_urls(excluded_path(path)) == excluded
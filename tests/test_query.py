@@ -0,0 +1,92 @@
+import random
+
+import numpy as np
+
+from query import Archive, tokenize
+
+ARTICLES = [
+    {'headline': 'Area Man Wins Lottery', 'tag': 'Local', 'section': 'local',
+     'date': '1996-11-14T12:00:00+00:00'},
+    {'headline': 'Area Mayor Unsure What Area Man Wants', 'tag': 'Politics', 'section': 'news',
+     'date': '1998-11-14T12:00:00+00:00'},
+    {'headline': "Area Man's Dream Deferred", 'tag': 'Local', 'section': 'local',
+     'date': '2003-01-02T12:00:00+00:00'},
+    {'headline': 'Man Area Reversed', 'tag': 'Local', 'section': 'news',
+     'date': '1997-11-14T12:00:00+00:00'},
+    {'headline': 'Nation Shudders', 'tag': 'News', 'section': 'news'},
+    {'headline': 'Area Mandates Nothing', 'tag': 'Local', 'section': 'local',
+     'date': '1999-06-30T12:00:00+00:00'},
+    {'headline': None, 'tag': None},
+]
+
+
+def test_phrase_and_prefix_search():
+    archive = Archive(ARTICLES)
+    assert archive.search('area man').tolist() == [0, 1, 2]
+    assert archive.search('AREA  man!').tolist() == [0, 1, 2]
+    assert archive.search('man area').tolist() == [3]
+    assert archive.search('area ma', prefix=True).tolist() == [0, 1, 2, 5]
+    assert archive.search('area ma').tolist() == []
+    assert archive.search('area mand', prefix=True).tolist() == [5]
+    assert archive.search('unknown words').tolist() == []
+    assert archive.search('').tolist() == []
+
+
+def test_select_combines_filters():
+    archive = Archive(ARTICLES)
+    assert archive.select(month_day='11-14').tolist() == [0, 1, 3]
+    assert archive.select(month_day='11-14', tag='Local').tolist() == [0, 3]
+    assert archive.select(month_day='11-14', tag='Local', text='area man').tolist() == [0]
+    assert archive.select(year=(1996, 1998), section='news').tolist() == [1, 3]
+    assert archive.select(year=1999, text='area ma', prefix=True).tolist() == [5]
+    assert archive.select(tag='No Such Tag').tolist() == []
+    assert archive.select().tolist() == list(range(len(ARTICLES)))
+
+
+def test_select_agrees_with_a_scan():
+    rng = random.Random(0)
+    words = ['area', 'man', 'nation', 'local', 'woman', 'mayor', 'manhattan', 'report']
+    articles = [{'headline': ' '.join(rng.choice(words) for _ in range(rng.randint(0, 6))),
+                 'tag': rng.choice(['Local', 'News', 'Politics']),
+                 'section': rng.choice(['news', 'local']),
+                 'date': f'{rng.randint(1996, 2005)}-{rng.randint(1, 2):02}-{rng.randint(1, 3):02}'}
+                for _ in range(2000)]
+    archive = Archive(articles)
+
+    def contains(tokens, query, prefix):
+        for i in range(len(tokens) - len(query) + 1):
+            window = tokens[i:i + len(query)]
+            last = window[-1].startswith(query[-1]) if prefix else window[-1] == query[-1]
+            if window[:-1] == query[:-1] and last:
+                return True
+        return False
+
+    def scan(phrase, prefix, tag, years):
+        return [row for row, a in enumerate(articles)
+                if contains(tokenize(a['headline']), tokenize(phrase), prefix)
+                and a['tag'] == tag and years[0] <= int(a['date'][:4]) <= years[1]]
+
+    for phrase, prefix in [('area man', False), ('area man', True), ('man', True),
+                           ('local woman area', False), ('nation ma', True)]:
+        expected = scan(phrase, prefix, 'Local', (1998, 2001))
+        rows = archive.select(text=phrase, prefix=prefix, tag='Local', year=(1998, 2001))
+        assert rows.tolist() == expected, phrase
+
+
+def test_sample_is_seeded():
+    archive = Archive(ARTICLES)
+    first = archive.sample(2, seed=7, tag='Local')
+    assert len(set(first.tolist())) == 2
+    assert set(first.tolist()) <= {0, 2, 3, 5}
+    assert archive.sample(2, seed=7, tag='Local').tolist() == first.tolist()
+    assert sorted(archive.sample(10, seed=1, tag='Local').tolist()) == [0, 2, 3, 5]
+    assert archive.sample(3, seed=1, tag='No Such Tag').tolist() == []
+
+
+def test_empty_archive():
+    archive = Archive([])
+    assert len(archive) == 0
+    assert archive.search('area man', prefix=True).tolist() == []
+    assert archive.select(month_day='11-14', year=(1996, 1999), text='area').tolist() == []
+    assert archive.sample(5, seed=1).tolist() == []
+    assert isinstance(archive.select(), np.ndarray)
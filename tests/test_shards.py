@@ -0,0 +1,95 @@
+import contextlib
+import io
+import json
+import multiprocessing
+
+import fetch
+import fetch_dates
+from shards import PageShard, merge_shards, shard_path, url_shard
+from store import JsonStore
+
+SECTIONS = ['news', 'local']
+PAGES = 23
+PER_PAGE = 5
+BLOCK = 4
+
+
+def run_shard(base_url, name, kwargs):
+    fetch.BASE_URL = base_url
+    run = {'fetch': fetch.scrape_all_sections,
+           'dates': fetch_dates.fetch_dates_for_articles}[name]
+    with contextlib.redirect_stdout(io.StringIO()):
+        run(parse_workers=0, **kwargs)
+
+
+def run_shards(name, main, count, **kwargs):
+    """Run all `count` shards at once, each in a process of its own; returns their stores."""
+    paths = [shard_path(main, (i, count)) for i in range(1, count + 1)]
+    ctx = multiprocessing.get_context('spawn')
+    processes = [ctx.Process(target=run_shard, args=(
+        fetch.BASE_URL, name, {**kwargs, 'shard': (i, count), 'output_file': path}))
+        for i, path in enumerate(paths, 1)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+    assert [p.exitcode for p in processes] == [0] * count
+    return paths
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_sharded_crawl_merges_to_the_whole_archive(bench_server, tmp_path):
+    bench_server(pages=PAGES, per_page=PER_PAGE)
+    main = tmp_path / 'headlines.json'
+    count = 3
+    shards = run_shards('fetch', main, count, sections=SECTIONS, shard_block=BLOCK)
+
+    # Each shard crawled only its own pages, and together they cover every page
+    covered = []
+    for i, path in enumerate(shards, 1):
+        pages = PageShard(i, count, block=BLOCK)
+        assert all(pages.owns(a['page']) for a in read(path))
+        covered += [(a['section'], a['page']) for a in read(path)]
+    assert sorted(set(covered)) == [(s, p) for s in sorted(SECTIONS) for p in range(1, PAGES + 1)]
+
+    stats = merge_shards(shards, main, 'json', SECTIONS)
+    urls = [a['url'] for a in read(main)]
+    assert stats['total'] == len(SECTIONS) * PAGES * PER_PAGE
+    assert urls == [f'{fetch.BASE_URL}/articles/{s}-{p}-{i}/'
+                    for s in SECTIONS for p in range(1, PAGES + 1) for i in range(PER_PAGE)]
+
+    # Merging again changes nothing, and the order the shards are given in doesn't matter
+    merged = main.read_bytes()
+    assert merge_shards(shards, main, 'json', SECTIONS)['added'] == 0
+    assert main.read_bytes() == merged
+    other = tmp_path / 'other.json'
+    merge_shards(shards[::-1], other, 'json', SECTIONS)
+    assert other.read_bytes() == merged
+
+
+def test_sharded_dates_fill_in_the_main_store(bench_server, tmp_path):
+    bench_server()
+    main = tmp_path / 'headlines.json'
+    undated = [{'headline': f'Headline {i}', 'url': f'{fetch.BASE_URL}/articles/news-1-{i}/',
+                'tag': 'News', 'section': 'news', 'page': 1} for i in range(30)]
+    store = JsonStore(main)
+    store.replace_all(undated)
+    store.close()
+
+    count = 2
+    shards = run_shards('dates', main, count, input_file=main)
+    for i, path in enumerate(shards, 1):
+        assert {url_shard(a['url'], count) for a in read(path)} == {i}
+    assert read(main) == undated  # Only read by the shards
+
+    stats = merge_shards(shards, main, 'json', SECTIONS)
+    assert (stats['added'], stats['dated']) == (0, len(undated))
+    assert [a['url'] for a in read(main)] == [a['url'] for a in undated]
+    assert all(a.get('date') for a in read(main))
+    merged = main.read_bytes()
+    merge_shards(shards, main, 'json', SECTIONS)
+    assert main.read_bytes() == merged
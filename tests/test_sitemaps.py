@@ -0,0 +1,94 @@
+import functools
+import gzip
+import shutil
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from sitemaps import discover_dates, read_sitemap, url_key
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'sitemaps'
+
+CONSTITUTION = 'https://theonion.com/area-man-passionate-defender-of-what-he-imagines-constitution-to-be/'
+NO_WAY = 'https://theonion.com/no-way-to-prevent-this-says-only-nation-where-this-r-1819576527'
+MAJORITY = 'https://theonion.com/report-majority-of-americans-now-getting-news-from-1819571443'
+UNDATED = 'https://theonion.com/nation-shudders-at-large-block-of-uninterrupted-text-1819571366'
+
+
+@pytest.fixture
+def sitemap_dir(tmp_path):
+    """The fixtures, a gzipped copy of posts.xml, and an index pointing at both."""
+    shutil.copy(FIXTURES / 'news.xml', tmp_path / 'news.xml')
+    with open(FIXTURES / 'posts.xml', 'rb') as f, gzip.open(tmp_path / 'posts.xml.gz', 'wb') as out:
+        shutil.copyfileobj(f, out)
+    (tmp_path / 'index.xml').write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        f'  <sitemap><loc>{tmp_path / "news.xml"}</loc></sitemap>\n'
+        f'  <sitemap><loc>{tmp_path / "posts.xml.gz"}</loc></sitemap>\n'
+        '</sitemapindex>\n')
+    return tmp_path
+
+
+def test_publication_date_is_used_over_lastmod():
+    children, dates = read_sitemap(FIXTURES / 'news.xml')
+    assert children == []
+    assert dates == {url_key(CONSTITUTION): '2009-11-16T12:00:00+00:00',
+                     url_key(NO_WAY): '2014-05-27T15:30:00+00:00'}
+
+
+def test_lastmod_is_ignored_by_default():
+    _, dates = read_sitemap(FIXTURES / 'posts.xml')
+    assert dates == {}
+
+
+def test_lastmod_is_opt_in():
+    _, dates = read_sitemap(FIXTURES / 'posts.xml', use_lastmod=True)
+    assert dates == {url_key(MAJORITY): '2023-07-19T18:40:00+00:00'}
+    # A publication date still wins where there is one
+    _, dates = read_sitemap(FIXTURES / 'news.xml', use_lastmod=True)
+    assert dates[url_key(CONSTITUTION)] == '2009-11-16T12:00:00+00:00'
+
+
+def test_gzipped_sitemap(sitemap_dir):
+    _, dates = read_sitemap(sitemap_dir / 'posts.xml.gz', use_lastmod=True)
+    assert dates == {url_key(MAJORITY): '2023-07-19T18:40:00+00:00'}
+
+
+def test_index_is_followed(sitemap_dir):
+    children, dates = read_sitemap(sitemap_dir / 'index.xml')
+    assert children == [str(sitemap_dir / 'news.xml'), str(sitemap_dir / 'posts.xml.gz')]
+    assert dates == {}
+
+    dates = discover_dates([sitemap_dir / 'index.xml'], use_lastmod=True)
+    assert set(dates) == {url_key(CONSTITUTION), url_key(NO_WAY), url_key(MAJORITY)}
+
+
+def test_wanted_limits_the_result(sitemap_dir):
+    dates = discover_dates([sitemap_dir / 'index.xml'], wanted={url_key(NO_WAY)})
+    assert dates == {url_key(NO_WAY): '2014-05-27T15:30:00+00:00'}
+
+
+def test_url_key_matches_url_variants():
+    assert url_key('https://www.theonion.com/a-headline/') == url_key('http://theonion.com/a-headline')
+    assert url_key(UNDATED) != url_key(MAJORITY)
+
+
+def test_sitemaps_over_http(sitemap_dir):
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(sitemap_dir))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    (sitemap_dir / 'remote.xml').write_text(
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f'<sitemap><loc>{base}/news.xml</loc></sitemap>'
+        f'<sitemap><loc>{base}/posts.xml.gz</loc></sitemap>'
+        '</sitemapindex>')
+    try:
+        dates = discover_dates([f'{base}/remote.xml'])
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert set(dates) == {url_key(CONSTITUTION), url_key(NO_WAY)}
@@ -0,0 +1,85 @@
+import json
+from functools import partial
+
+import pytest
+
+import archetypes
+import export
+import optimize
+import stages
+from filters import excluded_path, load_excluded_urls
+
+
+@pytest.fixture(autouse=True)
+def public_dir(tmp_path, monkeypatch):
+    """Export and archetypes write under tmp_path instead of web/public."""
+    monkeypatch.setattr(export, 'export_days',
+                        partial(export.export_days, output_dir=tmp_path / 'days'))
+    monkeypatch.setattr(archetypes, 'build_archetypes',
+                        partial(archetypes.build_archetypes, output_dir=tmp_path / 'archetypes',
+                                state_path=tmp_path / 'archetypes.npz'))
+
+
+def update(tmp_path, **kwargs):
+    stages.update(output_file=tmp_path / 'headlines.json', manifest_file=tmp_path / 'pipeline.json',
+                  parse_workers=0, **kwargs)
+    return json.loads((tmp_path / 'headlines.json').read_text())
+
+
+def test_second_update_with_nothing_new_only_checks_the_first_pages(bench_server, tmp_path,
+                                                                      monkeypatch, capsys):
+    monkeypatch.setattr(stages.fetch, 'SECTIONS', ['news', 'local'])
+    server = bench_server(pages=10, per_page=10)
+    stats = server.RequestHandlerClass.stats
+
+    first = update(tmp_path)
+    dropped = load_excluded_urls(excluded_path(tmp_path / 'headlines.json'))
+    assert dropped, "optimize drops the stand-in server's American Voices articles"
+    assert not dropped & {a['url'] for a in first}
+    # Only excluded articles are dropped; the formulaic synthetic headlines
+    # are all distinct articles
+    assert len(first) + len(dropped) == 2 * 10 * 10
+    assert all(a['date'] for a in first)
+    # Every synthetic headline opens with the same subject
+    subjects = json.loads((tmp_path / 'archetypes' / 'manifest.json').read_text())['archetypes']
+    assert list(subjects) == ['area-man-benchmarks']
+    assert subjects['area-man-benchmarks']['count'] == len(first)
+    ran = json.loads((tmp_path / 'pipeline.json').read_text())['stages']
+    assert list(ran) == stages.STAGES
+
+    capsys.readouterr()
+    stats.clear()
+    second = update(tmp_path)
+    assert second == first
+    assert stats.get('listing', 0) <= 2 * 4
+    assert stats.get('article', 0) == 0
+    # Nothing changed, so none of the offline stages ran again
+    out = capsys.readouterr().out
+    for stage in ['optimize', 'dates', 'neardup', 'export', 'archetypes']:
+        assert f'Skipped {stage}:' in out
+
+
+def test_neardup_keeps_reruns_that_are_not_dated_yet(tmp_path):
+    path = tmp_path / 'headlines.json'
+    headline = "'No Way To Prevent This,' Says Only Nation Where This Regularly Happens"
+    articles = [
+        {'headline': headline, 'url': 'https://theonion.com/a', 'tag': 'News',
+         'date': '2014-05-27T15:30:00+00:00'},
+        # Tonight's rerun, not dated yet
+        {'headline': headline, 'url': 'https://theonion.com/b', 'tag': 'News'},
+    ]
+    optimize.save_data(articles, 'json', path)
+
+    def neardup():
+        stages.update(stages=['neardup'], output_file=path, manifest_file=tmp_path / 'pipeline.json')
+        return [a['url'] for a in optimize.load_data('json', path)]
+
+    assert neardup() == ['https://theonion.com/a', 'https://theonion.com/b']
+
+    # Dated on another day it is a rerun; a repost on the same day is merged
+    articles[1]['date'] = '2022-05-24T18:00:00+00:00'
+    articles.append({'headline': headline.upper(), 'url': 'https://theonion.com/c', 'tag': 'News',
+                     'date': '2022-05-24T20:00:00+00:00'})
+    optimize.save_data(articles, 'json', path)
+    assert neardup() == ['https://theonion.com/a', 'https://theonion.com/b']
+    assert 'https://theonion.com/c' in load_excluded_urls(excluded_path(path))
@@ -5,7 +5,8 @@ import Link from "next/link";
 import { getTodaySlug, formatDisplayDate } from "@/lib/dates";
 import { Header } from "@/components/Header";
 import { Footer } from "@/components/Footer";
-import byDayData from "@/data/by-day.json";
+import manifestData from "@/public/days/manifest.json";
+import type { Manifest } from "@/lib/types";
 
 export default function Home() {
   const [todaySlug, setTodaySlug] = useState<string | null>(null);
@@ -17,16 +18,11 @@ export default function Home() {
     setTodayDisplay(formatDisplayDate(now.getMonth() + 1, now.getDate()));
   }, []);
 
-  const data = byDayData as Record<string, { count: number; years: number[] }>;
+  const manifest = manifestData as Manifest;
 
   // Calculate stats
-  const totalHeadlines = Object.values(data).reduce(
-    (sum, d) => sum + d.count,
-    0
-  );
-  const allYears = new Set<number>();
-  Object.values(data).forEach((d) => d.years.forEach((y) => allYears.add(y)));
-  const yearSpan = Math.max(...allYears) - Math.min(...allYears);
+  const totalHeadlines = manifest.total;
+  const yearSpan = Math.max(...manifest.years) - Math.min(...manifest.years);
 
   return (
     <>
@@ -4,34 +4,51 @@ import { useState, useEffect, useCallback } from "react";
 import { Header } from "@/components/Header";
 import { Footer } from "@/components/Footer";
 import { generateHeadlineSlug, parseHeadlineSlug } from "@/lib/slug";
-import byDayData from "@/data/by-day.json";
+import manifestData from "@/public/days/manifest.json";
+import type { DayData, Headline, Manifest } from "@/lib/types";
 
-interface Headline {
-  headline: string;
-  url: string;
-  tag: string;
-  year: number;
-}
+const manifest = manifestData as Manifest;
+const days = Object.keys(manifest.days);
+const allYears = manifest.years;
 
-type ByDayData = Record<
-  string,
-  { headlines: Headline[]; years: number[]; count: number }
->;
+// Headlines are numbered across the whole archive, day by day in manifest
+// order (the order days first appear in the archive, as in the old
+// by-day.json, so existing share links still resolve); dayStarts[i] is the
+// number of the first headline on days[i]
+const dayStarts: number[] = [];
+let totalHeadlines = 0;
+for (const day of days) {
+  dayStarts.push(totalHeadlines);
+  totalHeadlines += manifest.days[day].count;
+}
 
-const data = byDayData as ByDayData;
+const dayCache = new Map<string, Promise<DayData>>();
 
-// Flatten all headlines into one array
-const allHeadlines: Headline[] = Object.values(data).flatMap(
-  (d) => d.headlines
-);
+function loadDay(monthDay: string): Promise<DayData> {
+  if (!dayCache.has(monthDay)) {
+    dayCache.set(
+      monthDay,
+      fetch(`/days/${monthDay}.json`).then((r) => r.json() as Promise<DayData>)
+    );
+  }
+  return dayCache.get(monthDay)!;
+}
 
-// Get unique years
-const allYears = [...new Set(allHeadlines.map((h) => h.year))].sort(
-  (a, b) => a - b
-);
+async function fetchHeadline(index: number): Promise<Headline> {
+  // Last day starting at or before index
+  let lo = 0;
+  let hi = days.length - 1;
+  while (lo < hi) {
+    const mid = (lo + hi + 1) >> 1;
+    if (dayStarts[mid] <= index) lo = mid;
+    else hi = mid - 1;
+  }
+  const dayData = await loadDay(days[lo]);
+  return dayData.headlines[index - dayStarts[lo]];
+}
 
 function getRandomIndex(): number {
-  return Math.floor(Math.random() * allHeadlines.length);
+  return Math.floor(Math.random() * totalHeadlines);
 }
 
 function generateChoices(correctYear: number): number[] {
@@ -51,7 +68,7 @@ type Mode = "browse" | "game";
 
 export default function RandomPage() {
   const [mode, setMode] = useState<Mode>("browse");
-  const [headlineIndex, setHeadlineIndex] = useState<number | null>(null);
+  const [headline, setHeadline] = useState<Headline | null>(null);
   const [choices, setChoices] = useState<number[]>([]);
   const [selected, setSelected] = useState<number | null>(null);
   const [copied, setCopied] = useState(false);
@@ -60,13 +77,14 @@ export default function RandomPage() {
     total: 0,
   });
 
-  const loadHeadline = useCallback((index: number) => {
-    setHeadlineIndex(index);
-    setChoices(generateChoices(allHeadlines[index].year));
+  const loadHeadline = useCallback(async (index: number) => {
+    const next = await fetchHeadline(index);
+    setHeadline(next);
+    setChoices(generateChoices(next.year));
     setSelected(null);
     setCopied(false);
     // Update URL hash with semantic slug
-    const slug = generateHeadlineSlug(allHeadlines[index].headline, index);
+    const slug = generateHeadlineSlug(next.headline, index);
     window.history.replaceState(null, "", `/random#${slug}`);
   }, []);
 
@@ -79,7 +97,7 @@ export default function RandomPage() {
     const hash = window.location.hash.slice(1);
     if (hash) {
       const index = parseHeadlineSlug(hash);
-      if (index !== null && index >= 0 && index < allHeadlines.length) {
+      if (index !== null && index >= 0 && index < totalHeadlines) {
         loadHeadline(index);
         return;
       }
@@ -88,9 +106,8 @@ export default function RandomPage() {
   }, [loadHeadline, newHeadline]);
 
   const handleSelect = (year: number) => {
-    if (selected !== null || headlineIndex === null) return;
+    if (selected !== null || headline === null) return;
     setSelected(year);
-    const headline = allHeadlines[headlineIndex];
     if (year === headline.year) {
       setScore((s) => ({ correct: s.correct + 1, total: s.total + 1 }));
     } else {
@@ -111,9 +128,8 @@ export default function RandomPage() {
     setSelected(null);
   };
 
-  if (headlineIndex === null) return null;
+  if (headline === null) return null;
 
-  const headline = allHeadlines[headlineIndex];
   const isCorrect = selected === headline.year;
 
   return (
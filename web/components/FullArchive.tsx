@@ -2,7 +2,7 @@
 
 import { useState } from "react";
 import type { Headline } from "@/lib/types";
-import { groupByYear } from "@/lib/data";
+import { groupByYear } from "@/lib/group";
 
 interface FullArchiveProps {
   headlines: Headline[];
@@ -1,10 +1,18 @@
-import byDayData from "@/data/by-day.json";
-import type { ByDayData, DayData, Headline } from "./types";
+import fs from "fs";
+import path from "path";
+import manifestData from "@/public/days/manifest.json";
+import { groupByYear } from "./group";
+import type { DayData, Headline, Manifest } from "./types";
 
-const data = byDayData as ByDayData;
+const manifest = manifestData as Manifest;
+const DAYS_DIR = path.join(process.cwd(), "public", "days");
 
+// Reads just this day's file (written by export.py), so a page build only
+// holds one day of headlines
 export function getDayData(monthDay: string): DayData | null {
-  return data[monthDay] || null;
+  if (!manifest.days[monthDay]) return null;
+  const raw = fs.readFileSync(path.join(DAYS_DIR, `${monthDay}.json`), "utf-8");
+  return JSON.parse(raw) as DayData;
 }
 
 export function getHighlights(dayData: DayData): {
@@ -74,19 +82,6 @@ export function getHighlights(dayData: DayData): {
   return { newest, oldest, fromTheArchive };
 }
 
-export function groupByYear(headlines: Headline[]): Record<number, Headline[]> {
-  const groups: Record<number, Headline[]> = {};
-
-  for (const h of headlines) {
-    if (!groups[h.year]) {
-      groups[h.year] = [];
-    }
-    groups[h.year].push(h);
-  }
-
-  return groups;
-}
-
 export function getAllMonthDays(): string[] {
-  return Object.keys(data);
+  return Object.keys(manifest.days);
 }
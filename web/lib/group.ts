@@ -0,0 +1,14 @@
+import type { Headline } from "./types";
+
+export function groupByYear(headlines: Headline[]): Record<number, Headline[]> {
+  const groups: Record<number, Headline[]> = {};
+
+  for (const h of headlines) {
+    if (!groups[h.year]) {
+      groups[h.year] = [];
+    }
+    groups[h.year].push(h);
+  }
+
+  return groups;
+}
@@ -11,4 +11,42 @@ export interface DayData {
   count: number;
 }
 
-export type ByDayData = Record<string, DayData>;
+export interface DaySummary {
+  count: number;
+  years: number[];
+  hash: string;
+}
+
+// public/days/manifest.json, written by export.py
+export interface Manifest {
+  total: number;
+  years: number[];
+  days: Record<string, DaySummary>;
+}
+
+// public/archetypes/<slug>.json, written by archetypes.py
+export interface ArchetypeData {
+  name: string;
+  count: number;
+  undated: number;
+  years: number[];
+  tags: string[];
+  counts: number[][]; // counts[year index][tag index]
+}
+
+export interface ArchetypeSummary {
+  name: string;
+  count: number;
+  first: { date: string | null; headline: string; url: string };
+  peak_years: number[];
+  top_tags: [string, number][];
+  hash: string;
+}
+
+// public/archetypes/manifest.json, written by archetypes.py
+export interface ArchetypeManifest {
+  headlines: number;
+  min_count: number;
+  min_share: number;
+  archetypes: Record<string, ArchetypeSummary>;
+}